@@ -2,27 +2,46 @@ import logging
 
 from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from app.models import dev_init
+from app.modules.hasher import init_hasher
 from app.modules.jwt import jwt
-from app.modules.logger import console_handler, file_handler
+from app.modules.logger import init_logging
 from app.modules.scheduler import init_scheduler
 from app.modules.sql import db, migrate
+from app.modules.sql_monitor import init_sql_monitor
+from app.modules.tracing import init_tracing
+from app.utils.database import init_replica_routing
 from app.views import register_blueprints
 from config import Config
 
 
 def create_app() -> Flask:
     """创建app必要的操作"""
+    # 哈希进程池须在任何线程启动之前fork出子进程
+    init_hasher()
+
     app = Flask(__name__, static_folder=None)
     app.config.from_object(Config)
 
+    # 在反向代理之后时，remote_addr取自代理添加的X-Forwarded-For，限流等以此区分客户端
+    if Config.PROXY_TRUSTED_HOPS:
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app,
+            x_for=Config.PROXY_TRUSTED_HOPS,
+            x_proto=Config.PROXY_TRUSTED_HOPS,
+        )
+
     CORS(app)
 
     jwt.init_app(app)
 
     db.init_app(app)
     migrate.init_app(app, db)
+    init_sql_monitor(app)
+    init_replica_routing(app)
+    init_tracing(app)
 
     register_blueprints(app)
 
@@ -34,7 +53,6 @@ def create_app() -> Flask:
     init_scheduler(app)
 
     app.logger.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.addHandler(console_handler)
+    init_logging(app.logger)
 
     return app
@@ -1,11 +1,21 @@
+import enum
 import hashlib
 from subprocess import PIPE, Popen
+from typing import Any, Iterator
 
 from flask import current_app as app
 from sqlalchemy import inspect, text
 
-from app.modules.sql import db
+from app.modules.llm import get_completion_cache, retry_policy
+from app.modules.logger import log_stats
+from app.modules.mailer import mailer
+from app.modules.metrics import function_stats
+from app.modules.sms import sms_dispatcher
+from app.modules.sql import db, pool_stats
+from app.utils.database import CRUD
 from app.utils.logger import Log
+from app.utils.rate_limit import rate_limit_stats
+from config import Config
 
 
 class AdminService:
@@ -32,10 +42,35 @@ class AdminService:
                 tables = inspector.get_table_names()  # 获取所有表名
                 return tables
 
+            if operation == "pool":
+                return pool_stats()
+
+            if operation == "cache":
+                return CRUD.cache_stats()
+
+            if operation == "ratelimit":
+                return rate_limit_stats()
+
+            if operation == "mail":
+                return mailer.stats()
+
+            if operation == "sms":
+                return sms_dispatcher.stats()
+
+            if operation == "log":
+                return log_stats()
+
+            if operation == "functions":
+                return function_stats()
+
+            if operation == "llm_cache":
+                return get_completion_cache().stats()
+
+            if operation == "llm_retry":
+                return retry_policy.stats()
+
             if operation == "readall":
-                table_name = args[0]
-                result = db.session.execute(text(f"SELECT * FROM {table_name}"))
-                return [dict(zip(result.keys(), row)) for row in result]
+                return self.read_table(args[0])
 
             if operation == "insert":
                 table_name = args[2]
@@ -80,6 +115,37 @@ class AdminService:
 
         return "NOT PERMITTED!"
 
+    def read_table(self, table_name: str) -> Iterator[dict[str, Any]]:
+        """逐块读取表的所有行，由响应以流的方式输出，读取出错时抛出错误"""
+        for mapper in db.Model.registry.mappers:
+            if mapper.local_table.name != table_name:
+                continue
+            names = {
+                column.name: mapper.get_property_by_column(column).key
+                for column in mapper.local_table.columns
+            }
+            crud = CRUD(mapper.class_)
+            for rows in crud.iter_chunks():
+                for row in rows:
+                    record = {}
+                    for column, name in names.items():
+                        value = getattr(row, name)
+                        record[column] = (
+                            value.value if isinstance(value, enum.Enum) else value
+                        )
+                    yield record
+            if crud.error:  # iter_chunks出错时仅停止迭代，需交由响应输出错误
+                raise crud.error
+            return
+
+        # 未映射为模型的表，以流式游标读取
+        result = db.session.execute(
+            text(f"SELECT * FROM {table_name}"),
+            execution_options={"yield_per": Config.ITER_CHUNK_SIZE},
+        )
+        for row in result:
+            yield dict(zip(result.keys(), row))
+
     def get_command(self, args):
         """根据参数生成系统命令"""
         if args[0] == "restart":
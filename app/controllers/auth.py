@@ -1,15 +1,12 @@
 # 用户认证控制器
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-
 from flask import current_app as app
 from flask_jwt_extended import create_access_token
-from tencentcloud.common import credential
-from tencentcloud.sms.v20210111 import models, sms_client
 
 from app.models.member import Member
-from app.models.verification import Verification
+from app.modules.mailer import mailer
+from app.modules.sms import sms_dispatcher
+from app.utils.auth import identity_claims
+from app.utils.code_store import audit, get_code_store
 from app.utils.database import CRUD
 from app.utils.logger import Log
 from app.utils.response import Response
@@ -35,33 +32,48 @@ def login(
         Response: 返回具有空字符串或用户id的响应体实例
     """
     user_id = ""
+    member: Member | None = None
     wrong_password = False
     wrong_code = False
 
     # id与密码登陆的情况
     if is_value_valid(username, password):
-        if query := CRUD(Member, id=username).query_key():
-            user = query.first()
-            if user.check_password(password):  # id存在且密码校验正确
+        if user := CRUD(Member, id=username).query_once():
+            try:
+                password_matched = user.check_password(password)
+            except TimeoutError:
+                return Response(
+                    Response.r.ERR_TOO_MUCH_TIME, message="登录繁忙，请稍后再试"
+                )
+            if password_matched:  # id存在且密码校验正确
                 user_id = user.id
+                member = user
+                if user.password_needs_rehash():  # 以当前配置的cost重新生成哈希
+                    try:
+                        user.set_password(password)
+                    except TimeoutError:  # 重新生成并非必须，哈希繁忙时留待下次登录
+                        Log.warn("Login: password rehash skipped, hasher is busy.")
+                    else:
+                        with CRUD(Member) as m:
+                            m.update(user)
             else:
                 wrong_password = True
 
     # 手机与验证码登陆的情况
     if is_value_valid(phone, code):
-        if query := CRUD(Member, phone=phone).query_key():
-            user = query.first()
+        if user := CRUD(Member, phone=phone).query_once():
             if check_verify_code(code, phone=user.phone):  # 手机和验证码正确
                 user_id = user.id
+                member = user
             else:
                 wrong_code = True
 
     # 邮箱与验证码登陆的情况
     if is_value_valid(email, code):
-        if query := CRUD(Member, email=email).query_key():
-            user = query.first()
+        if user := CRUD(Member, email=email).query_once():
             if check_verify_code(code, email=user.email):  # 邮箱和验证码正确
                 user_id = user.id
+                member = user
             else:
                 wrong_code = True
 
@@ -73,7 +85,9 @@ def login(
         else:
             return Response(Response.r.ERR_INVALID_ARGUMENT)
 
-    access_token = create_access_token(user_id)
+    access_token = create_access_token(
+        user_id, additional_claims=identity_claims(member)
+    )
     return Response(Response.r.OK, data=access_token)
 
 
@@ -91,40 +105,30 @@ def send_verification_code(email: str = "", phone: str = "") -> Response:
     if phone:
         contact_type = "phone"
         value = phone
+    if not value:
+        return Response(Response.r.ERR_INVALID_ARGUMENT)
 
-    code = ""
-    with CRUD(Verification, type=contact_type, value=value) as v:
-        if query := v.query_key():
-            res = query.first()
-            if (
-                res.is_generate_in_minutes(app.config["CODE_INTERVAL"])
-                and not res.verified
-            ):
-                return Response(Response.r.ERR_TOO_MUCH_TIME)
-            code = res.generate_code()
-            v.need_update()
-        else:
-            instance: Verification = v.create_instance()
-            code = instance.generate_code()
-            v.add()
-
-        stauts = 0
-        if code and phone:
-            stauts = send_sms_code(phone, code)
-        if code and email:
-            stauts = send_email_code(email, code)
+    store = get_code_store()
+    if not (code := store.issue(contact_type, value)):
+        return Response(Response.r.ERR_TOO_MUCH_TIME)
 
-        if stauts != Response.r.OK:
-            v.do_not_update()
+    stauts = 0
+    if phone:
+        stauts = send_sms_code(phone, code)
+    if email:
+        stauts = send_email_code(email, code)
 
-        return Response(Response.r.OK)
+    if stauts != Response.r.OK:
+        store.discard(contact_type, value, code)
+    else:
+        audit(contact_type, value, code)
 
-    return Response(Response.r.ERR_INVALID_ARGUMENT)
+    return Response(Response.r.OK)
 
 
 @Log.track_execution(when_error=False)
 def check_verify_code(code: str, email: str = "", phone: str = "") -> bool:
-    """检查联系方式与其验证码是否正确
+    """检查联系方式与其验证码是否正确，验证成功后该验证码失效
     Args:
         code (str): 验证码
         email (str, optional): 邮箱
@@ -139,63 +143,33 @@ def check_verify_code(code: str, email: str = "", phone: str = "") -> bool:
     elif is_value_valid(code, phone):
         contact_type = "phone"
         value = phone
-    with CRUD(Verification, type=contact_type, value=value, code=code) as v:
-        if query := v.query_key():
-            v.need_update()
-            return query.first().check_code_valid(code)
+    if not contact_type:
+        return False
 
+    if get_code_store().verify(contact_type, value, code):
+        audit(contact_type, value, code, verified=True)
+        return True
     return False
 
 
 @Log.track_execution(when_error=Response.r.ERR_INTERNAL)
 def send_sms_code(phone: str, code: str) -> Response.r:
-    """使用手机短信发送验证代码"""
-    cred = credential.Credential(
-        app.config["TENCENTCLOUD_SECRET_ID"], app.config["TENCENTCLOUD_SECRET_KEY"]
-    )
-    client = sms_client.SmsClient(cred, "ap-guangzhou")
-    req = models.SendSmsRequest()
-
-    req.SmsSdkAppId = app.config["SMS_SDK_APP_ID"]
-    req.SignName = app.config["SIGN_NAME"]
-    req.TemplateId = app.config["TEMPLATE_ID"]
-    req.TemplateParamSet = [code]  # 模板参数
-    req.PhoneNumberSet = [phone]  # 下发手机号码
+    """使用手机短信发送验证代码，并发的请求由发送队列合并"""
+    status = sms_dispatcher.send(phone, [code])
 
-    resp = client.SendSms(req)
-
-    for status in resp.SendStatusSet:
-        if status.Code == "Ok":
-            return Response.r.OK
-        if "LimitExceeded" in status.Code:
-            return Response.r.ERR_TOO_MUCH_TIME
+    if status == "Ok":
+        return Response.r.OK
+    if "LimitExceeded" in status:
+        return Response.r.ERR_TOO_MUCH_TIME
 
     return Response.r.ERR_INTERNAL
 
 
 def send_email_code(to_email: str, code: str) -> Response.r:
-    """使用邮箱发送验证代码"""
-    try:
-        from_email = app.config["EMAIL_ACCOUNT"]
-        email_password = app.config["EMAIL_PASSWORD"]
-
-        msg = MIMEMultipart()
-        msg["From"] = from_email
-        msg["To"] = to_email
-        msg["Subject"] = app.config["EMAIL_SUBJECT"]
-
-        body = app.config["EMAIL_TEXT"] + code
-        msg.attach(MIMEText(body, "plain"))
-
-        server = smtplib.SMTP(app.config["EMAIL_SMTP"], app.config["EMAIL_SMTP_PORT"])
-        server.starttls()
-        server.login(from_email, email_password)
-
-        server.sendmail(from_email, to_email, msg.as_string())
-
+    """使用邮箱发送验证代码，邮件放入后台队列后即返回"""
+    if mailer.send(
+        to_email, app.config["EMAIL_SUBJECT"], app.config["EMAIL_TEXT"] + code
+    ):
         return Response.r.OK
-    except Exception as e:
-        Log.error(e)
-        return Response.r.ERR_INTERNAL
-    finally:
-        server.quit()
+    Log.warn("Mail queue is full.")
+    return Response.r.ERR_TOO_MUCH_TIME
@@ -0,0 +1,66 @@
+# 监控指标控制器
+from app.modules.llm import get_completion_cache, retry_policy
+from app.modules.logger import log_stats
+from app.modules.metrics import render_counter, render_gauges, render_histograms
+from app.modules.pool import pool_executor_stats
+from app.modules.sql import pool_stats
+from app.modules.tracing import exporter
+from app.utils.database import CRUD
+from app.utils.rate_limit import rate_limit_stats
+from app.utils.response import Response
+
+
+def metrics() -> Response:
+    """以Prometheus文本格式返回函数耗时、线程池、数据库连接池、缓存、日志队列、LLM回复缓存与重试、追踪导出器与限流的指标
+    Returns:
+        Response: 返回text/plain的响应体实例
+    """
+    lines = list(render_histograms())
+    lines += render_gauges("pool", pool_executor_stats(), "Thread pool state.")
+    lines += render_gauges(
+        "db_pool",
+        pool_stats(),
+        "Database connection pool state.",
+        ("checkout_count", "wait_count", "wait_time"),
+    )
+    lines += render_gauges(
+        "crud_cache", CRUD.cache_stats(), "CRUD lookup cache.", ("hits", "misses")
+    )
+    lines += render_gauges("log", log_stats(), "Logging queue state.", ("dropped",))
+    lines += render_gauges(
+        "llm_cache",
+        get_completion_cache().stats(),
+        "LLM completion cache.",
+        ("hits", "misses", "stores", "evictions"),
+    )
+    lines += render_gauges(
+        "llm_retry",
+        retry_policy.stats(),
+        "LLM retries and breaker.",
+        ("calls", "retries", "failures", "breaker_trips", "breaker_rejected"),
+    )
+    lines += render_gauges(
+        "trace", exporter.stats(), "Span exporter state.", ("exported", "dropped")
+    )
+
+    endpoints = rate_limit_stats()["endpoints"]
+    lines += render_counter(
+        "rate_limit_allowed",
+        "Requests allowed by rate limits.",
+        (({"endpoint": e}, c["allowed"]) for e, c in endpoints.items()),
+    )
+    lines += render_counter(
+        "rate_limit_rejected",
+        "Requests rejected by rate limits.",
+        (
+            ({"endpoint": e, "dimension": d}, n)
+            for e, c in endpoints.items()
+            for d, n in c["rejected_by"].items()
+        ),
+    )
+
+    return Response(
+        Response.r.OK,
+        data=("\n".join(lines) + "\n").encode(),
+        mime_type="text/plain; version=0.0.4",
+    )
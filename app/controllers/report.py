@@ -1,15 +1,19 @@
 # 日报控制器
 import os
 from datetime import datetime
+from typing import Any
 from uuid import uuid4
 
+from openai import AsyncOpenAI
 from PIL import Image
 from werkzeug.datastructures import FileStorage
 
 from app.models.daily_report import DailyReport
 from app.models.period_task import PeriodTask
-from app.modules.llm import create_completion
+from app.modules.llm import acreate_completion, create_completion, fan_out
 from app.modules.pool import submit_task
+from app.modules.tracing import traced
+from app.utils.async_database import AsyncCRUD
 from app.utils.constant import LLMPrompt as LLM
 from app.utils.constant import LLMStructure as LLMS
 from app.utils.constant import LocalPath as Local
@@ -63,6 +67,7 @@ def update_report(
     return True
 
 
+@traced("save_pictures")
 def save_pictures(pictures: list[FileStorage]) -> tuple[list, list]:
     """使用uuid作为文件名将网络图片保存至本地
 
@@ -89,9 +94,46 @@ def save_pictures(pictures: list[FileStorage]) -> tuple[list, list]:
     return picture_urls, picture_paths
 
 
+_REPORT_NOT_FOUND = "report generate_report_review: 无法找到指定用户的日报记录。"
+_TASK_NOT_FOUND = "task generate_report_review: 无法找到指定用户的任务记录。"
+
+
+def _task_period(report: DailyReport) -> tuple:
+    """日报所属任务的查询条件：日报创建于任务的起止时间之间"""
+    return (
+        PeriodTask.start_time < report.created_at,
+        PeriodTask.end_time > report.created_at,
+    )
+
+
+def _review_prompt(report: DailyReport, task: PeriodTask) -> str:
+    """构建日报评价的提示词"""
+    return LLM.DAILY_REPORT_REVIEW_JSON(
+        task.basic_task_requirements,
+        (task.end_time - task.start_time).days,
+        (datetime.now() - task.start_time).days,
+        task.completed_task_description,
+        report.daily_task,
+        report.report_text,
+    )
+
+
+def _review_fields(report_id: str, review: str | dict) -> dict[str, Any]:
+    """由LLM的评价得到需写回日报的字段，评价为空时抛出错误"""
+    if not review:
+        raise ValueError(f"generate_report_review: 无法生成日报 {report_id} 的评价。")
+    return {
+        "report_review": review,
+        "basic_score": review["basic"]["score"],
+        "excess_score": review["excess"]["score"],
+        "extra_score": review["extra"]["score"],
+        "generating": False,
+    }
+
+
 @Log.track_execution()
 def generate_report_review(report_id: str, picture_path: list[str]) -> None:
-    """生成日报评价并传入至数据库中
+    """生成日报评价并传入至数据库中，失败时清除日报的生成中标记
 
     Args:
         report_id (str): 日报id
@@ -100,48 +142,76 @@ def generate_report_review(report_id: str, picture_path: list[str]) -> None:
     Raises:
         所有错误最终会被写入至日志
     """
-    if not (q_report := CRUD(DailyReport, report_id=report_id).query_key()):
-        raise FileNotFoundError(
-            "report generate_report_review: 无法找到指定用户的日报记录。"
+    try:
+        if not (report := CRUD(DailyReport, report_id=report_id).query_once()):
+            raise FileNotFoundError(_REPORT_NOT_FOUND)
+
+        with CRUD(PeriodTask, assignee_id=report.user_id) as i_task:
+            if not (task := i_task.query_once(*_task_period(report))):
+                raise FileNotFoundError(_TASK_NOT_FOUND)
+
+        review = create_completion(
+            _review_prompt(report, task),
+            report.user_id,
+            "report",
+            picture_path,
+            dictionary_like=True,
+            response_format=LLMS.DailyReport,
         )
-    report: DailyReport = q_report.first()
-
-    with CRUD(PeriodTask, assignee_id=report.user_id) as i_task:
-        if not (
-            q_task := i_task.query_key(
-                i_task.model.start_time < report.created_at,
-                i_task.model.end_time > report.created_at,
-            )
-        ):
-            raise FileNotFoundError(
-                "task generate_report_review: 无法找到指定用户的任务记录。"
-            )
-    task: PeriodTask = q_task.first()
-
-    task_days = (task.end_time - task.start_time).day
-    elapsed_days = datetime.now() - task.start_time
-    previous_task_describe = task.completed_task_description
-    daily_task = report.daily_task
-    daily_report = report.report_text
-
-    review_prompt = LLM.DAILY_REPORT_REVIEW_JSON(
-        daily_task, task_days, elapsed_days, previous_task_describe, daily_report
-    )
-
-    review = create_completion(
-        review_prompt,
+        fields = _review_fields(report_id, review)
+    except Exception:
+        _write_reviews([{"report_id": report_id, "generating": False}])
+        raise
+
+    _write_reviews([{"report_id": report_id, **fields}])
+
+
+async def _review_report(
+    async_client: AsyncOpenAI, item: tuple[str, list[str]]
+) -> dict[str, Any]:
+    """generate_report_review的异步版本，返回需写回日报的字段"""
+    report_id, picture_path = item
+    async with AsyncCRUD(DailyReport, report_id=report_id) as r:
+        if not (report := await r.query_once()):
+            raise FileNotFoundError(_REPORT_NOT_FOUND)
+
+    async with AsyncCRUD(PeriodTask, assignee_id=report.user_id) as i_task:
+        if not (task := await i_task.query_once(*_task_period(report))):
+            raise FileNotFoundError(_TASK_NOT_FOUND)
+
+    review = await acreate_completion(
+        async_client,
+        _review_prompt(report, task),
         report.user_id,
         "report",
         picture_path,
         dictionary_like=True,
         response_format=LLMS.DailyReport,
     )
+    return _review_fields(report_id, review)
 
-    with CRUD(DailyReport, report_id=report_id) as s:
-        s.update(
-            report_review=review,
-            basic_score=review["basic"]["score"],
-            excess_score=review["excess"]["score"],
-            extra_score=review["extra"]["score"],
-            generating=False,
-        )
+
+def _write_reviews(rows: list[dict[str, Any]]) -> None:
+    """以一次批量更新写回评价，评价失败的日报仅清除生成中标记，以便下次检查时重新生成"""
+    with CRUD(DailyReport) as r:
+        if not r.bulk_update(rows):
+            Log.error(f"generate_report_review: 写回评价失败: {r.error}")
+
+
+@Log.track_execution()
+def generate_report_reviews(reports: list[tuple[str, list[str]]]) -> None:
+    """并发生成多份日报的评价，同时进行的请求数由Config.LLM_CONCURRENCY限制
+
+    Args:
+        reports (list[tuple[str, list[str]]]): 日报id与其图片本地路径
+
+    Raises:
+        单份日报的错误会被写入至日志，不影响其他日报
+    """
+    rows = []
+    for (report_id, _), result in zip(reports, fan_out(reports, _review_report)):
+        if isinstance(result, Exception):
+            Log.error(f"generate_report_reviews: 日报 {report_id} 失败: {result}")
+            result = {"generating": False}
+        rows.append({"report_id": report_id, **result})
+    _write_reviews(rows)
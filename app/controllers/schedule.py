@@ -2,10 +2,12 @@
 import os
 from datetime import datetime
 
-from app.controllers.report import generate_report_review
+from openai import AsyncOpenAI
+
+from app.controllers.report import generate_report_reviews
 from app.models.daily_report import DailyReport
 from app.models.period_task import PeriodTask
-from app.modules.llm import create_completion
+from app.modules.llm import acreate_completion, fan_out
 from app.modules.pool import submit_task
 from app.utils.constant import LLMPrompt as LLM
 from app.utils.constant import LLMStructure as LLMS
@@ -29,88 +31,122 @@ def check_daily_report() -> Response:
         Config.TIMEZONE, day=yesterday_date, hour=23, minute=59, second=59
     )
 
+    pending: list[tuple[str, list[str]]] = []
     with CRUD(DailyReport) as report:
-        if not (
-            query := report.query_key(
-                report.model.created_at > today_start,
-                report.model.created_at < today_end,
-                report.model.report_review == None,
-            )
+        for reports in report.iter_chunks(
+            report.model.created_at > today_start,
+            report.model.created_at < today_end,
+            report.model.report_review == None,
+            order_by=report.model.created_at,
         ):
-            Log.info("检查日报已中止，因为并未找到任何项")
-            return Response(Response.r.OK)
-        delay = 0
-        for rep in query.all():
-            image_path = [
-                os.path.join(Local.REPORT_PICTURE, pic.split("/")[-1])
-                for pic in rep.report_picture
+            # 提交前先取出所需的值，避免提交后逐条刷新实例
+            chunk = [
+                (
+                    rep.report_id,
+                    [
+                        os.path.join(Local.REPORT_PICTURE, pic.split("/")[-1])
+                        for pic in rep.report_picture
+                    ],
+                )
+                for rep in reports
             ]
-            submit_task(
-                generate_report_review,
-                rep.report_id,
-                image_path,
-                delay=Timer(minutes=delay),
-            )
-            delay += 1
+            # 将该块中待评价的日报一次性标记为生成中，失败的块不进行评价，之前已标记的块照常评价
+            if not report.bulk_update(
+                [{"report_id": report_id, "generating": True} for report_id, _ in chunk]
+            ):
+                Log.error(report.error)
+                continue
+            pending += chunk
+
+    if not pending:
+        Log.info("检查日报已中止，因为并未找到任何项")
+        return Response(Response.r.OK)
+
+    # 在线程池中并发生成评价，同时进行的请求数由Config.LLM_CONCURRENCY限制
+    submit_task(generate_report_reviews, pending)
 
     return Response(Response.r.OK)
 
 
+async def _summarize_task(async_client: AsyncOpenAI, item: tuple) -> dict:
+    """生成单个任务的进度总结与次日任务"""
+    task_id, assignee_id, prompt = item
+    reply = await acreate_completion(
+        async_client,
+        prompt,
+        assignee_id,
+        "task",
+        dictionary_like=True,
+        response_format=LLMS.DailySummary,
+    )
+    if not reply:
+        raise ValueError(f"daily_generation: 无法生成任务 {task_id} 的总结。")
+    return reply
+
+
 @Log.track_execution(when_error=Response(Response.r.ERR_INTERNAL))
 def daily_generation() -> Response:
     """生成每日任务，以及任务进度报告"""
-    with CRUD(PeriodTask) as task:
-        if not (query := task.query_key(task.model.end_time >= Timer.utc_now())):
-            Log.info("生成任务已中止，因为并未找到任何项")
-            return Response(Response.r.ERR_NOT_FOUND)
-        task.need_update()
-        tasks: list[PeriodTask] = query.all()
-        # 对每个任务进行处理
+    found = failed = False
+    now = Timer.utc_now().replace(tzinfo=None)  # 数据库中的时间为不含时区的UTC时间
+    for tasks in CRUD(PeriodTask).iter_chunks(PeriodTask.end_time >= now):
+        found = True
+        items: list[tuple] = []
+        # 获取LLM需要使用的必要元数据
         for t in tasks:
-            # 获取LLM需要使用的必要元数据
-            basic = t.basic_task_requirements
-            detail = t.detail_task_requirements
-            completed = t.completed_task_description
-            days = (t.end_time - t.start_time).day
-            elapsed = (Timer.utc_now() - t.start_time).day
-            remaining = (t.end_time - Timer.utc_now()).day
+            days = (t.end_time - t.start_time).days
+            elapsed = (now - t.start_time).days
+            remaining = (t.end_time - now).days
 
             daily_task, daily_review = None, None
 
             with CRUD(DailyReport, user_id=t.assignee_id) as r:
-                if q_report := r.query_key():
-                    report = q_report.order_by(r.model.created_at.desc()).first()
+                if report := r.query_once(order_by=r.model.created_at.desc()):
                     daily_task = report.daily_task
                     daily_review = report.report_review
 
             prompt = LLM.DAILY_SUMMARY(
-                basic,
-                detail,
+                t.basic_task_requirements,
+                t.detail_task_requirements,
                 days,
                 elapsed,
                 remaining,
-                completed,
+                t.completed_task_description,
                 daily_task,
                 daily_review,
             )
+            items.append((t.task_id, t.assignee_id, prompt))
 
-            # 操作LLM
-            reply = create_completion(
-                prompt,
-                t.assignee_id,
-                "task",
-                dictionary_like=True,
-                response_format=LLMS.DailySummary,
+        # 并发操作LLM，该块的结果以批量语句写回
+        task_rows: list[dict] = []
+        report_rows: list[dict] = []
+        for item, result in zip(items, fan_out(items, _summarize_task)):
+            task_id, assignee_id, _ = item
+            if isinstance(result, Exception):
+                Log.error(f"daily_generation: 任务 {task_id} 失败: {result}")
+                continue
+            task_rows.append(
+                {
+                    "task_id": task_id,
+                    "completed_task_description": result.get("completion_status"),
+                }
+            )
+            report_rows.append(
+                {"user_id": assignee_id, "daily_task": result.get("next_task")}
             )
 
-            completion = reply.get("completion_status")
-            next_task = reply.get("next_task")
+        # 任务进度与次日日报在同一事务中写入，失败时该块整体回滚，其余块照常写入
+        with CRUD(PeriodTask) as t, CRUD(DailyReport) as r:
+            if not (
+                t.bulk_update(task_rows, commit=False)
+                and r.bulk_add(report_rows, commit=False)
+            ):
+                failed = True
 
-            # 将内容存入各自的模型中
-            t.completed_task_description = completion
-            with CRUD(DailyReport) as r:
-                if not r.add(user_id=t.assignee_id, daily_task=next_task):
-                    Log.error(r.error)
-                    return Response(Response.r.ERR_SQL)
+    if not found:
+        Log.info("生成任务已中止，因为并未找到任何项")
+        return Response(Response.r.ERR_NOT_FOUND)
+    if failed:
+        return Response(Response.r.ERR_SQL)
 
     return Response(Response.r.OK)
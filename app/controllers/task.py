@@ -33,8 +33,8 @@ def create_task(
     end_date = Timer.js_to_utc(end_time)
 
     # 获取双方信息
-    assigner_info = CRUD(Member, id=assigner_id).query_key().first()
-    assignee_info = CRUD(Member, id=assignee_id).query_key().first()
+    assigner_info = CRUD(Member, id=assigner_id).query_once()
+    assignee_info = CRUD(Member, id=assignee_id).query_once()
 
     # 如果组别不匹配，则返回冲突错误
     if assignee_info.department_id != assigner_info.department_id:
@@ -75,7 +75,7 @@ def modify_task(
     start_date = Timer.js_to_utc(start_time)
     end_date = Timer.js_to_utc(end_time)
 
-    updater_info = CRUD(Member, id=updater_id).query_key().first()
+    updater_info = CRUD(Member, id=updater_id).query_once()
 
     with CRUD(PeriodTask, task_id=task_id) as t:
         updated = t.update(
@@ -106,11 +106,10 @@ def generate_task(
     Returns:
         Response: 返回错误或LLM回复
     """
-    if not (q_assignee := CRUD(Member, id=assignee_id).query_key()):
+    q_assignee = CRUD(Member, id=assignee_id).with_profile("profile")
+    if not (assignee := q_assignee.query_once()):
         return Response(Response.r.ERR_NOT_FOUND)
 
-    assignee: Member = q_assignee.first()
-
     department = assignee.department.name
     if parent_department := assignee.department.parent.name:
         department = f"{parent_department}-{department}"
@@ -25,8 +25,8 @@ def info(user_id: str) -> Response:
     Returns:
         (dict | None): 用户信息字典或None
     """
-    if query := CRUD(Member, id=user_id).query_key():
-        return Response(Response.r.OK, data=query.first().to_dict())
+    if user := CRUD(Member, id=user_id).with_profile("profile").query_once():
+        return Response(Response.r.OK, data=user.to_dict())
 
     return Response(Response.r.ERR_NOT_FOUND)
 
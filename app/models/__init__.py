@@ -1,3 +1,4 @@
+from alembic.script import ScriptDirectory
 from flask import Flask
 from flask_migrate import revision, upgrade
 
@@ -10,11 +11,27 @@ from .department import Department
 from .member import Member
 
 
+def _single_head(app: Flask) -> bool:
+    """检查迁移是否只有一个head
+    在仓库提供迁移之前自动生成过迁移的环境中，两者各自为根，需执行一次flask db merge heads后才能生成新的迁移
+    """
+    config = app.extensions["migrate"].migrate.get_config()
+    heads = ScriptDirectory.from_config(config).get_heads()
+    if len(heads) > 1:
+        Log.warn(
+            f"Migrations have multiple heads {heads}, "
+            "run `flask db merge heads` once to merge them."
+        )
+        return False
+    return True
+
+
 def dev_init(app: Flask) -> None:
     try:
         with app.app_context():
-            upgrade(revision="head")  # 更新db结构
-            revision(message="init", autogenerate=True)
+            upgrade(revision="heads")  # 更新db结构，存在多个分支时均更新
+            if _single_head(app):
+                revision(message="init", autogenerate=True)
 
             with CRUD(Department, name="开发组") as d:
                 if not d.query_key():
@@ -10,6 +10,7 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -47,5 +48,10 @@ class DailyReport(db.Model):
     # 更新时间，UTC
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        # 按用户查询并按创建时间排序
+        Index("ix_daily_reports_user_id_created_at", "user_id", "created_at"),
+    )
+
     def __repr__(self) -> str:
         return f"<DailyReport report_id={self.report_id}, user_id={self.user_id}>"
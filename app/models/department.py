@@ -20,5 +20,7 @@ class Department(db.Model):
     # 自关联，查询父部门
     parent = relationship("Department", remote_side=[id], backref="subdepartments")
 
+    cache_lookups = True  # 允许CRUD缓存键值查询
+
     def __repr__(self):
         return f"<Department {self.name}, Parent: {self.parent_id}>"
@@ -4,7 +4,17 @@
 
 import uuid
 
-from sqlalchemy import JSON, Column, DateTime, Enum, ForeignKey, String, Text, func
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    String,
+    Text,
+    func,
+)
 
 from app.modules.sql import db
 
@@ -24,6 +34,8 @@ class LLMRecord(db.Model):
     request_images = Column(JSON, default=[])
     # 返回的文本
     received_text = Column(Text, nullable=False)
+    # 回复来自缓存，未实际调用模型
+    cached = Column(Boolean, nullable=False, default=False, server_default="0")
     # 调用时间，UTC
     created_at = Column(DateTime, default=func.now())
 
@@ -4,9 +4,8 @@
 """
 
 import enum
-from typing import Any
+from typing import Any, Callable
 
-from flask_bcrypt import Bcrypt
 from sqlalchemy import (
     Column,
     DateTime,
@@ -17,10 +16,16 @@ from sqlalchemy import (
     UniqueConstraint,
     func,
 )
+from sqlalchemy.orm import joinedload
 
+from app.modules.hasher import (
+    check_password_hash,
+    generate_password_hash,
+    needs_rehash,
+)
 from app.modules.sql import db
 
-bcrypt = Bcrypt()
+from .department import Department
 
 
 class Role(enum.Enum):
@@ -57,6 +62,16 @@ class Member(db.Model):
         UniqueConstraint("id", "email"),
     )
 
+    cache_lookups = True  # 允许CRUD缓存键值查询
+
+    # 加载配置，供CRUD.with_profile使用，关联属性在映射完成后才可用，因此以函数提供
+    load_profiles: dict[str, Callable[[], list]] = {
+        # to_dict所需的部门与上级部门
+        "profile": lambda: [
+            joinedload(Member.department).joinedload(Department.parent)
+        ],
+    }
+
     def __repr__(self) -> str:
         return f"<Member id={self.id}>"
 
@@ -64,14 +79,18 @@ class Member(db.Model):
         """为该实例设置密码"""
         if not password:
             password = self.id[-3:] + "123456"
-        self.password = bcrypt.generate_password_hash(password).decode()
+        self.password = generate_password_hash(password)
 
     def check_password(self, password: str) -> bool:
-        """检查明文密码是否匹配该实例的密码"""
+        """检查明文密码是否匹配该实例的密码，哈希计算在进程池中进行"""
         if self.password:
-            return bcrypt.check_password_hash(self.password, password)
+            return check_password_hash(self.password, password)
         return False
 
+    def password_needs_rehash(self) -> bool:
+        """密码哈希的cost是否与当前配置不一致"""
+        return bool(self.password) and needs_rehash(self.password)
+
     def to_dict(self) -> dict[str, Any]:
         """将实例信息输出为不包含敏感字符与特别效果的字典"""
         department = ""
@@ -4,7 +4,7 @@
 
 import uuid
 
-from sqlalchemy import Column, DateTime, ForeignKey, String, Text, func
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String, Text, func
 from sqlalchemy.orm import relationship
 
 from app.modules.sql import db
@@ -46,5 +46,15 @@ class PeriodTask(db.Model):
     )
     updater = relationship("Member", foreign_keys=[updated_by], backref="updated_tasks")
 
+    __table_args__ = (
+        # 按需完成者查询任务时间范围
+        Index(
+            "ix_period_tasks_assignee_id_end_time_start_time",
+            "assignee_id",
+            "end_time",
+            "start_time",
+        ),
+    )
+
     def __repr__(self) -> str:
         return f"<PeriodTask task_id={self.task_id}, assigner_id={self.assigner_id}, assignee_id={self.assignee_id}>"
@@ -9,7 +9,7 @@ from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
 from flask import current_app as app
-from sqlalchemy import Boolean, Column, DateTime, Enum, String, func
+from sqlalchemy import Boolean, Column, DateTime, Enum, Index, String, func
 
 from app.modules.sql import db
 
@@ -31,6 +31,10 @@ class Verification(db.Model):
     sent_at = Column(DateTime, nullable=False, default=func.now())  # 发送时间
     verified = Column(Boolean, default=False)  # 该码已验证
 
+    __table_args__ = (
+        Index("ix_verifications_type_value_code", "type", "value", "code"),
+    )
+
     def __repr__(self) -> str:
         return f"<Verification id={self.request_id}>"
 
@@ -0,0 +1,107 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+
+from flask_bcrypt import Bcrypt
+
+from config.development import Config
+
+bcrypt = Bcrypt()
+hasher_logger = logging.getLogger("app.hasher")  # 传递至app.logger的处理器
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+# 同时进行中（执行中与排队中）的哈希计算数上限
+_slots = threading.BoundedSemaphore(Config.BCRYPT_MAX_PENDING)
+
+
+def _create_executor() -> ProcessPoolExecutor:
+    """创建进程池
+    fork出的子进程仅复制调用线程，其他线程持有的锁在子进程中永远不会释放，
+    因此仅在进程内只有主线程时使用fork，并立即启动全部子进程；
+    已有其他线程时改用forkserver或spawn，子进程会重新导入主模块
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods and threading.active_count() == 1:
+        executor = ProcessPoolExecutor(
+            max_workers=Config.BCRYPT_WORKERS,
+            mp_context=multiprocessing.get_context("fork"),
+        )
+        # fork方式下首次提交任务时一次性启动全部子进程，之后不会再fork
+        executor.submit(int).result()
+        return executor
+    method = "forkserver" if "forkserver" in methods else "spawn"
+    hasher_logger.warning(
+        f"Hasher: threads already running, starting workers with {method}"
+    )
+    return ProcessPoolExecutor(
+        max_workers=Config.BCRYPT_WORKERS,
+        mp_context=multiprocessing.get_context(method),
+    )
+
+
+def init_hasher() -> None:
+    """在启动任何线程之前创建进程池，应在create_app的最开始调用
+    run.py在导入时即创建app，spawn方式会在子进程中重复创建，因此优先在此以fork方式启动子进程
+    """
+    global _executor
+    if Config.BCRYPT_WORKERS <= 0:
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = _create_executor()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """返回进程池，未经init_hasher创建时在首次使用时创建"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = _create_executor()
+    return _executor
+
+
+def _run(fn: Callable, *args) -> Any:
+    """在进程池中执行哈希计算，等待空位超过BCRYPT_QUEUE_TIMEOUT秒时抛出TimeoutError"""
+    if Config.BCRYPT_WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(timeout=Config.BCRYPT_QUEUE_TIMEOUT):
+        raise TimeoutError("Password hashing queue is full.")
+    try:
+        return _get_executor().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def _check(pw_hash: str, password: str) -> bool:
+    return bcrypt.check_password_hash(pw_hash, password)
+
+
+def _generate(password: str, rounds: int) -> str:
+    return bcrypt.generate_password_hash(password, rounds).decode()
+
+
+def check_password_hash(pw_hash: str, password: str) -> bool:
+    """在进程池中检查明文密码是否与哈希匹配
+    Args:
+        pw_hash (str): bcrypt哈希
+        password (str): 明文密码
+    Returns:
+        bool: 是否匹配
+    """
+    return _run(_check, pw_hash, password)
+
+
+def generate_password_hash(password: str) -> str:
+    """在进程池中以Config.BCRYPT_LOG_ROUNDS生成密码的哈希"""
+    return _run(_generate, password, Config.BCRYPT_LOG_ROUNDS)
+
+
+def needs_rehash(pw_hash: str) -> bool:
+    """哈希的cost与Config.BCRYPT_LOG_ROUNDS不一致时需要重新生成"""
+    try:
+        return int(pw_hash.split("$")[2]) != Config.BCRYPT_LOG_ROUNDS
+    except (IndexError, ValueError):
+        return True
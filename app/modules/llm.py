@@ -1,17 +1,243 @@
+import asyncio
+import hashlib
 import json
+import threading
+import time
 from base64 import b64encode
-from typing import Callable, Literal
+from typing import Any, Awaitable, Callable, Iterable, Literal
 
-from openai import OpenAI
+from openai import (
+    APIConnectionError,
+    AsyncOpenAI,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
 
 from app.models.llm_record import LLMRecord
+from app.utils.async_database import AsyncCRUD, dispose_async_engine
+from app.utils.cache import SharedSQLite
 from app.utils.database import CRUD
 from app.utils.logger import Log
 from config import Config
 
+from .retry import CircuitBreaker, RetryPolicy
+from .tracing import span
+
 api_key = Config.OPENAI_API_KEY
 
-client = OpenAI(api_key=api_key)
+# 重试由retry_policy负责，关闭客户端自带的重试
+client = OpenAI(
+    api_key=api_key,
+    base_url=Config.OPENAI_BASE_URL,
+    max_retries=0,
+    timeout=Config.LLM_TIMEOUT,
+)
+
+
+class EmptyReplyError(Exception):
+    """模型返回了空回复"""
+
+
+# 网络错误、超时、429与5xx说明服务异常，计入熔断器
+SERVICE_ERRORS = (APIConnectionError, RateLimitError, InternalServerError)
+breaker = CircuitBreaker("openai")
+retry_policy = RetryPolicy(
+    SERVICE_ERRORS + (EmptyReplyError, json.JSONDecodeError),
+    "openai",
+    breaker,
+    trip_on=SERVICE_ERRORS,
+)
+
+
+class CompletionCache:
+    """以请求内容的哈希为键的LLM回复缓存，存储于同一主机的工作进程共享的SQLite文件
+    - 键由模型、文本、图片内容的哈希、response_format的JSON Schema与其余参数计算
+    - 回复在LLM_CACHE_TTL秒后过期，条目超出LLM_CACHE_SIZE时淘汰最久未使用的回复
+    """
+
+    def __init__(self, path: str = "") -> None:
+        self.db = SharedSQLite(
+            path or Config.LLM_CACHE_PATH,
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, reply TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)",
+        )
+        self.db.connection().execute(
+            "CREATE INDEX IF NOT EXISTS ix_completions_accessed_at "
+            "ON completions (accessed_at)"
+        )
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    @staticmethod
+    def key(
+        model: str, send_text: str, images: list[bytes], kwargs: dict[str, Any]
+    ) -> str:
+        """计算请求的键
+        Args:
+            model (str): 模型名
+            send_text (str): 发送的文本
+            images (list[bytes]): 发送的图片内容
+            kwargs (dict[str, Any]): 其余参数，response_format为pydantic模型时取其JSON Schema
+        Returns:
+            str: sha256十六进制摘要
+        """
+        params = dict(kwargs)
+        if hasattr(
+            response_format := params.get("response_format"), "model_json_schema"
+        ):
+            params["response_format"] = response_format.model_json_schema()
+        content = {
+            "model": model,
+            "text": send_text,
+            "images": [hashlib.sha256(image).hexdigest() for image in images],
+            "params": params,
+        }
+        return hashlib.sha256(
+            json.dumps(
+                content, sort_keys=True, ensure_ascii=False, default=str
+            ).encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> str | dict | None:
+        """取出未过期的回复并刷新其使用时间，不存在时返回None"""
+        now = time.time()
+        conn = self.db.connection()
+        row = conn.execute(
+            "SELECT reply FROM completions WHERE key = ? AND created_at > ?",
+            (key, now - Config.LLM_CACHE_TTL),
+        ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return json.loads(row[0])
+
+    def set(self, key: str, reply: str | dict) -> None:
+        """保存回复，并清除过期与超出数量上限的条目"""
+        now = time.time()
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, reply, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(reply, ensure_ascii=False), now, now),
+            )
+            evicted = conn.execute(
+                "DELETE FROM completions WHERE created_at <= ?",
+                (now - Config.LLM_CACHE_TTL,),
+            ).rowcount
+            (entries,) = conn.execute("SELECT COUNT(*) FROM completions").fetchone()
+            if entries > Config.LLM_CACHE_SIZE:
+                evicted += conn.execute(
+                    "DELETE FROM completions WHERE key IN ("
+                    "SELECT key FROM completions ORDER BY accessed_at LIMIT ?)",
+                    (entries - Config.LLM_CACHE_SIZE,),
+                ).rowcount
+        self._count("stores")
+        self._count("evictions", evicted)
+
+    def stats(self) -> dict[str, Any]:
+        """返回本进程的命中统计与缓存的条目数"""
+        (entries,) = (
+            self.db.connection().execute("SELECT COUNT(*) FROM completions").fetchone()
+        )
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "entries": entries,
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: CompletionCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> CompletionCache:
+    """获取本进程的LLM回复缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CompletionCache()
+    return _cache
+
+
+def _cache_key(
+    model: str, send_text: str, images: list[bytes], use_cache: bool, kwargs: dict
+) -> str | None:
+    """返回请求的缓存键，不使用缓存时返回None"""
+    if not (use_cache and Config.LLM_CACHE_ENABLED):
+        return None
+    return CompletionCache.key(model, send_text, images, kwargs)
+
+
+def _record(
+    user_id: str,
+    method: str,
+    send_text: str,
+    reply: str | dict,
+    send_images: list[str],
+    cached: bool,
+) -> dict[str, Any]:
+    """LLMRecord的字段，字典回复以JSON保存"""
+    return {
+        "user_id": user_id,
+        "method": method,
+        "request_text": send_text,
+        "received_text": (
+            json.dumps(reply, ensure_ascii=False) if isinstance(reply, dict) else reply
+        ),
+        "request_images": send_images,
+        "cached": cached,
+    }
+
+
+def _attempt(
+    chat_call: Callable, dictionary_like: bool, method: str, request: dict
+) -> str | dict:
+    """发送一次请求并解析回复，空回复或无法解析的回复视为失败"""
+    with span("llm.create_completion", model=request["model"], method=method):
+        response = chat_call(**request)
+    return _parse_reply(response, dictionary_like)
+
+
+async def _aattempt(
+    chat_call: Callable, dictionary_like: bool, method: str, request: dict
+) -> str | dict:
+    """_attempt的异步版本"""
+    with span("llm.acreate_completion", model=request["model"], method=method):
+        response = await chat_call(**request)
+    return _parse_reply(response, dictionary_like)
+
+
+def _parse_reply(response: Any, dictionary_like: bool) -> str | dict:
+    if not (reply := response.choices[0].message.content):
+        raise EmptyReplyError("llm returned an empty reply")
+    return json.loads(reply) if dictionary_like else reply
+
+
+def _build_request(
+    model_type: str, send_text: str, images: list[bytes], kwargs: dict
+) -> dict[str, Any]:
+    """构建请求参数，每次重试使用同一份参数"""
+    return {
+        "model": "gpt-4o-2024-08-06" if model_type == "4o" else "gpt-4",
+        "messages": [
+            {
+                "role": "user",
+                "content": [{"type": "text", "text": send_text}] + openai_image(images),
+            }
+        ],
+        **kwargs,
+    }
 
 
 def create_completion(
@@ -21,10 +247,10 @@ def create_completion(
     send_images: list[str] | None = None,
     model_type: Literal["4o", "gpt4"] = "4o",
     dictionary_like: bool = False,
-    retries: int = 0,
+    use_cache: bool = True,
     **kwargs,
 ) -> str | dict:
-    """向GPT发送对话请求，每次请求会被记录
+    """向GPT发送对话请求，每次请求会被记录，相同的请求复用缓存的回复
     Args:
         send_text (str): 要发送的文本。
         user_id (str): 调用者id。
@@ -32,76 +258,158 @@ def create_completion(
         send_images (list[str] | None, optional): 需要发送的图片的本地路径，可选。
         model_type (Literal[&quot;4o&quot;, &quot;gpt4&quot;], optional): 模型类型，GPT-4或GPT-4o，默认GPT-4o。
         dictionary_like (bool, optional): 是否以字典形式输出回复，当该选项为True时，需要传入response_format参数，传入的json模型须为pydantic的BaseModel。
+        use_cache (bool, optional): 是否使用缓存，需要每次获得不同回复时设为False。
         **kwargs: GPT的参数调整
     Returns:
-        (str | dict): 返回的回复，字符串或字典
+        (str | dict): 返回的回复，字符串或字典，重试后仍失败或熔断时返回空字符串，并以空回复记录
+    失败的请求按retry_policy退避重试，服务持续出错时由熔断器直接拒绝，避免占用线程池。
     """
-    reply = ""
-    err = None
-    try:
-        if not send_images:
-            send_images = []
-        model = "gpt-4o-2024-08-06" if model_type == "4o" else "gpt-4"
-
-        chat_call: Callable = (
-            client.beta.chat.completions.parse
-            if dictionary_like
-            else client.chat.completions.create
-        )
+    send_images = send_images or []
+    images = load_images(send_images)
+    request = _build_request(model_type, send_text, images, kwargs)
 
-        response = chat_call(
-            model=model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [{"type": "text", "text": send_text}]
-                    + openai_image(send_images),
-                }
-            ],
-            **kwargs,
-        )
-        reply = response.choices[0].message.content
-        reply = json.loads(reply) if dictionary_like else reply
+    cache_key = _cache_key(request["model"], send_text, images, use_cache, kwargs)
+    if cache_key and (cached := get_completion_cache().get(cache_key)):
+        with CRUD(LLMRecord) as insert:
+            insert.add(**_record(user_id, method, send_text, cached, send_images, True))
+        return cached
 
+    chat_call: Callable = (
+        client.beta.chat.completions.parse
+        if dictionary_like
+        else client.chat.completions.create
+    )
+    try:
+        reply = retry_policy.call(_attempt, chat_call, dictionary_like, method, request)
     except Exception as e:
-        err = e
         Log.error(f"Failed while get reply from llm: {e}")
+        reply = ""  # 失败的调用同样记录，回复为空
+    else:
+        if cache_key:
+            get_completion_cache().set(cache_key, reply)
+    with CRUD(LLMRecord) as insert:
+        insert.add(**_record(user_id, method, send_text, reply, send_images, False))
 
-    if err or ((not reply) and retries <= Config.LLM_MAX_RETRY_TIMES):
-        return create_completion(
-            send_text,
-            user_id,
-            method,
-            send_images,
-            model_type,
-            dictionary_like,
-            retries + 1,
-        )
+    return reply
 
-    with CRUD(LLMRecord) as insert:
-        insert.add(
-            user_id=user_id,
-            method=method,
-            request_text=send_text,
-            received_text=reply,
-            request_images=send_images,
+
+async def acreate_completion(
+    async_client: AsyncOpenAI,
+    send_text: str,
+    user_id: str,
+    method: Literal["report", "task"],
+    send_images: list[str] | None = None,
+    model_type: Literal["4o", "gpt4"] = "4o",
+    dictionary_like: bool = False,
+    use_cache: bool = True,
+    **kwargs,
+) -> str | dict:
+    """create_completion的异步版本，由fan_out提供客户端，每次请求会被记录
+    Args:
+        async_client (AsyncOpenAI): 异步客户端，绑定于当前事件循环
+        其余参数与create_completion一致
+    Returns:
+        (str | dict): 返回的回复，字符串或字典，重试后仍失败或熔断时返回空字符串
+    """
+    send_images = send_images or []
+    images = await asyncio.to_thread(load_images, send_images)
+    request = _build_request(model_type, send_text, images, kwargs)
+
+    cache_key = _cache_key(request["model"], send_text, images, use_cache, kwargs)
+    if cache_key and (
+        cached := await asyncio.to_thread(get_completion_cache().get, cache_key)
+    ):
+        async with AsyncCRUD(LLMRecord) as insert:
+            await insert.add(
+                **_record(user_id, method, send_text, cached, send_images, True)
+            )
+        return cached
+
+    chat_call: Callable = (
+        async_client.beta.chat.completions.parse
+        if dictionary_like
+        else async_client.chat.completions.create
+    )
+    try:
+        reply = await retry_policy.acall(
+            _aattempt, chat_call, dictionary_like, method, request
+        )
+    except Exception as e:
+        Log.error(f"Failed while get reply from llm: {e}")
+        reply = ""
+    else:
+        if cache_key:
+            await asyncio.to_thread(get_completion_cache().set, cache_key, reply)
+    async with AsyncCRUD(LLMRecord) as insert:
+        await insert.add(
+            **_record(user_id, method, send_text, reply, send_images, False)
         )
 
     return reply
 
 
-def openai_image(image_paths: list[str]) -> list:
-    """通过图片路径打开图片，并转为openaiAPI支持的格式"""
-    images = []
-    template = {"type": "image_url", "image_url": {}}
+def fan_out(
+    items: Iterable[Any],
+    handler: Callable[[AsyncOpenAI, Any], Awaitable[Any]],
+    limit: int = 0,
+) -> list[Any]:
+    """在新的事件循环中并发处理多个项，同时进行的处理数不超过limit
+    Args:
+        items (Iterable[Any]): 需要处理的项
+        handler (Callable[[AsyncOpenAI, Any], Awaitable[Any]]): 处理单个项的协程函数，应在完成后自行写回结果
+        limit (int, optional): 最大并发数，默认为Config.LLM_CONCURRENCY
+    Returns:
+        list[Any]: 与items顺序一致的结果，出错的项为其异常
+    需在没有运行中事件循环的线程中调用，如视图函数或线程池任务。\n
+    :Example:
+    .. code-block:: python
+        async def summarize(async_client, task):
+            reply = await acreate_completion(async_client, task.prompt, task.user_id, "task")
+            async with AsyncCRUD(PeriodTask) as t:
+                await t.update(task, completed_task_description=reply)
 
+        fan_out(tasks, summarize)
+    """
+
+    async def run_all() -> list[Any]:
+        semaphore = asyncio.Semaphore(limit or Config.LLM_CONCURRENCY)
+        async with AsyncOpenAI(
+            api_key=api_key,
+            base_url=Config.OPENAI_BASE_URL,
+            max_retries=0,
+            timeout=Config.LLM_TIMEOUT,
+        ) as async_client:
+
+            async def run(item: Any) -> Any:
+                async with semaphore:
+                    return await handler(async_client, item)
+
+            try:
+                return await asyncio.gather(
+                    *(run(item) for item in items), return_exceptions=True
+                )
+            finally:
+                await dispose_async_engine()
+
+    return asyncio.run(run_all())
+
+
+def load_images(image_paths: list[str]) -> list[bytes]:
+    """通过图片路径读取图片内容，无法读取的图片会被跳过"""
+    images = []
     for image_path in image_paths:
         try:
             with open(image_path, "rb") as image:
-                image_dict = template.copy()
-                image_dict["image_url"] = {"url": b64encode(image.read())}
-                images.append(image_dict)
+                images.append(image.read())
         except Exception as e:
             Log.error(e)
 
     return images
+
+
+def openai_image(images: list[bytes]) -> list:
+    """将图片内容转为openaiAPI支持的格式"""
+    return [
+        {"type": "image_url", "image_url": {"url": b64encode(image)}}
+        for image in images
+    ]
@@ -1,16 +1,135 @@
+import atexit
+import gzip
+import itertools
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any
+
+from config.development import Config
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+# 按轮转的顺序逐个压缩，连续轮转时较新的文件最后写入；退出前会等待压缩完成
+_gzip_executor = ThreadPoolExecutor(1, thread_name_prefix="log-gzip")
+_rotations = itertools.count()
+
+
+def _compress(pending: str, dest: str) -> None:
+    with open(pending, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(pending)
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    """将日志文件改名后在后台线程中压缩，不阻塞写日志的线程"""
+    pending = f"{dest}.{next(_rotations)}.tmp"  # 压缩完成前再次轮转时不会覆盖
+    os.replace(source, pending)
+    _gzip_executor.submit(_compress, pending, dest)
+
+
+_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+
+def _rotating_handler(filename: str) -> RotatingFileHandler:
+    """在Config.LOG_DIR中创建轮转的日志文件处理器"""
+    os.makedirs(Config.LOG_DIR, exist_ok=True)
+    handler = RotatingFileHandler(
+        os.path.join(Config.LOG_DIR, filename),
+        maxBytes=10000000,
+        backupCount=1,
+        encoding="utf8",
+    )
+    if Config.LOG_GZIP_ROTATED:
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    handler.setFormatter(_formatter)
+    return handler
 
-file_handler = RotatingFileHandler(
-    "app.log", maxBytes=10000000, backupCount=1, encoding="utf8"
-)
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(
-    logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-)
 
 console_handler = logging.StreamHandler()
 console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(
-    logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-)
+console_handler.setFormatter(_formatter)
+
+
+def _file_handlers() -> list[logging.Handler]:
+    """创建写入文件的处理器，在init_logging时才打开文件"""
+    file_handler = _rotating_handler("app.log")
+    file_handler.setLevel(logging.INFO)
+
+    slow_query_handler = _rotating_handler("slow_query.log")
+    slow_query_handler.setLevel(logging.WARNING)
+    slow_query_handler.addFilter(logging.Filter("app.sql.slow"))  # 仅记录慢查询
+    return [file_handler, slow_query_handler]
+
+
+_IMMUTABLE_ARGS = (str, int, float, bool, bytes, type(None))
+
+
+class DroppingQueueHandler(QueueHandler):
+    """将日志放入有界队列的处理器，队列已满时丢弃日志并计数，不阻塞调用者"""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 格式化留给后台线程，仅在参数可能被修改时提前生成消息
+        args = record.args
+        if args and not (
+            isinstance(args, tuple)
+            and all(isinstance(a, _IMMUTABLE_ARGS) for a in args)
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+log_queue: queue.Queue[logging.LogRecord] = queue.Queue(Config.LOG_QUEUE_SIZE)
+queue_handler = DroppingQueueHandler(log_queue)
+_listener: QueueListener | None = None
+_listener_lock = threading.Lock()
+
+
+def init_logging(logger: logging.Logger) -> None:
+    """将日志经由队列交给后台线程写入Config.LOG_DIR中的文件与控制台
+    Args:
+        logger (logging.Logger): app.logger，其子日志记录器（如app.sql.slow）的日志会传递至此
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = QueueListener(
+                log_queue,
+                console_handler,
+                *_file_handlers(),
+                respect_handler_level=True,
+            )
+            _listener.start()
+            atexit.register(_listener.stop)  # 退出前写完队列中的日志
+    if queue_handler not in logger.handlers:
+        logger.addHandler(queue_handler)
+
+
+def log_stats() -> dict[str, Any]:
+    """返回日志队列的统计"""
+    return {
+        "pending": log_queue.qsize(),
+        "maxsize": log_queue.maxsize,
+        "dropped": queue_handler.dropped,
+    }
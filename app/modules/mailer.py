@@ -0,0 +1,203 @@
+import logging
+import queue
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any
+
+from config.development import Config
+
+mail_logger = logging.getLogger("app.mail")  # 传递至app.logger的处理器
+
+
+class SMTPConnectionPool:
+    """已登录的SMTP连接池，空闲超过EMAIL_CONNECTION_IDLE秒的连接在取用时重建"""
+
+    def __init__(self, size: int = 0) -> None:
+        self._idle: queue.LifoQueue[tuple[float, smtplib.SMTP]] = queue.LifoQueue(
+            size or Config.EMAIL_POOL_SIZE
+        )
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(
+            Config.EMAIL_SMTP, Config.EMAIL_SMTP_PORT, timeout=Config.EMAIL_TIMEOUT
+        )
+        try:
+            if Config.EMAIL_STARTTLS:
+                server.starttls()
+            if Config.EMAIL_ACCOUNT and Config.EMAIL_PASSWORD:
+                server.login(Config.EMAIL_ACCOUNT, Config.EMAIL_PASSWORD)
+        except Exception:
+            self._close(server)
+            raise
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def acquire(self) -> smtplib.SMTP:
+        """取用空闲连接，没有可用连接时新建并登录"""
+        while True:
+            try:
+                released_at, server = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - released_at <= Config.EMAIL_CONNECTION_IDLE:
+                return server
+            self._close(server)
+
+    def release(self, server: smtplib.SMTP, broken: bool = False) -> None:
+        """归还连接，出错的连接或池已满时关闭"""
+        if broken:
+            server.close()
+            return
+        try:
+            self._idle.put_nowait((time.monotonic(), server))
+        except queue.Full:
+            self._close(server)
+
+    def close(self) -> None:
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                self._close(self._idle.get_nowait()[1])
+            except queue.Empty:
+                return
+
+
+class Mailer:
+    """后台发送邮件的队列
+    send仅将邮件放入队列，由后台线程成批通过连接池发送，失败的邮件以指数退避重试。\n
+    :Example:
+    .. code-block:: python
+        if not mailer.send("user@example.com", "主题", "正文"):
+            print("队列已满")
+    """
+
+    def __init__(self) -> None:
+        self.pool = SMTPConnectionPool()
+        self._queue: queue.Queue[tuple[str, str, int]] = queue.Queue(
+            Config.EMAIL_QUEUE_SIZE
+        )
+        self._workers: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stats = {"queued": 0, "sent": 0, "retried": 0, "failed": 0}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def _start(self) -> None:
+        """首次发送时启动后台线程"""
+        with self._lock:
+            if self._workers:
+                return
+            for index in range(Config.EMAIL_WORKERS):
+                worker = threading.Thread(
+                    target=self._run, name=f"mailer-{index}", daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    @staticmethod
+    def build_message(to_email: str, subject: str, body: str) -> str:
+        """构建纯文本邮件"""
+        msg = MIMEMultipart()
+        msg["From"] = Config.EMAIL_ACCOUNT
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "plain"))
+        return msg.as_string()
+
+    def send(self, to_email: str, subject: str, body: str) -> bool:
+        """将邮件放入发送队列
+        Args:
+            to_email (str): 收件人
+            subject (str): 主题
+            body (str): 正文
+        Returns:
+            bool: 是否已放入队列，队列已满时返回False
+        """
+        self._start()
+        try:
+            self._queue.put_nowait(
+                (to_email, self.build_message(to_email, subject, body), 0)
+            )
+        except queue.Full:
+            return False
+        self._count("queued")
+        return True
+
+    def _retry(self, item: tuple[str, str, int]) -> None:
+        """在退避时间后重新放入队列，超出EMAIL_MAX_RETRY次时放弃"""
+        to_email, message, attempt = item
+        if attempt >= Config.EMAIL_MAX_RETRY:
+            self._count("failed")
+            mail_logger.error(f"Mailer: gave up sending to {to_email}")
+            return
+
+        def requeue() -> None:
+            try:
+                self._queue.put_nowait((to_email, message, attempt + 1))
+            except queue.Full:
+                self._count("failed")
+                mail_logger.error(f"Mailer: queue full, dropped mail to {to_email}")
+
+        self._count("retried")
+        timer = threading.Timer(Config.EMAIL_RETRY_BACKOFF * 2**attempt, requeue)
+        timer.daemon = True
+        timer.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < Config.EMAIL_BATCH_SIZE:  # 合并短时间内的突发邮件
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._send_batch(batch)
+
+    def _send_batch(self, batch: list[tuple[str, str, int]]) -> None:
+        """通过同一连接发送一批邮件"""
+        try:
+            server = self.pool.acquire()
+        except Exception as e:
+            mail_logger.warning(f"Mailer: connect failed: {e}")
+            for item in batch:
+                self._retry(item)
+            return
+
+        broken = False
+        for index, item in enumerate(batch):
+            to_email, message, _ = item
+            try:
+                server.sendmail(Config.EMAIL_ACCOUNT, to_email, message)
+                self._count("sent")
+            except smtplib.SMTPRecipientsRefused as e:
+                self._count("failed")  # 收件人被拒绝，重试无意义
+                mail_logger.error(f"Mailer: recipient refused: {e}")
+            except Exception as e:
+                mail_logger.warning(f"Mailer: send to {to_email} failed: {e}")
+                # 服务器有响应的错误不影响连接，其余视为连接已断开
+                broken = not isinstance(e, smtplib.SMTPResponseException)
+                self._retry(item)
+                if broken:  # 连接已断开，剩余的邮件也需要重试
+                    for rest in batch[index + 1 :]:
+                        self._retry(rest)
+                    break
+        self.pool.release(server, broken)
+
+    def stats(self) -> dict[str, Any]:
+        """返回邮件队列的统计"""
+        with self._lock:
+            return {**self._stats, "pending": self._queue.qsize()}
+
+
+mailer = Mailer()
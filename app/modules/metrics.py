@@ -0,0 +1,202 @@
+import threading
+from bisect import bisect_left
+from typing import Any, Iterable, Iterator
+
+from config.development import Config
+
+# 直方图的桶上界，秒，最后一个桶为+Inf
+BUCKETS: tuple[float, ...] = tuple(Config.METRICS_BUCKETS) + (float("inf"),)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """函数耗时直方图
+    每个线程写入各自的分片，记录时不需要加锁，仅在线程首次记录与读取时合并分片。
+    分片的布局为[各桶计数..., 耗时总和, 错误数]。
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: list[tuple[threading.Thread, list]] = []
+        self._retired = self._new_shard()  # 已结束的线程的分片合并于此
+
+    @staticmethod
+    def _new_shard() -> list:
+        return [0] * len(BUCKETS) + [0.0, 0]
+
+    def _merge(self, target: list, shard: list) -> None:
+        for index, value in enumerate(shard):
+            target[index] += value
+
+    def _shard(self) -> list:
+        if (shard := getattr(self._local, "shard", None)) is None:
+            shard = self._local.shard = self._new_shard()
+            with self._lock:
+                # 顺便合并已结束线程的分片，避免每请求一个线程时分片无限增长
+                alive = []
+                for thread, old in self._shards:
+                    if thread.is_alive():
+                        alive.append((thread, old))
+                    else:
+                        self._merge(self._retired, old)
+                alive.append((threading.current_thread(), shard))
+                self._shards = alive
+        return shard
+
+    def observe(self, seconds: float, error: bool = False) -> None:
+        """记录一次调用的耗时"""
+        shard = self._shard()
+        shard[bisect_left(BUCKETS, seconds)] += 1
+        shard[-2] += seconds
+        if error:
+            shard[-1] += 1
+
+    def snapshot(self) -> tuple[list[int], float, int]:
+        """合并所有分片
+        Returns:
+            (tuple[list[int], float, int]): 各桶计数（非累计）、耗时总和与错误数
+        """
+        total = self._new_shard()
+        with self._lock:
+            self._merge(total, self._retired)
+            for _, shard in self._shards:
+                self._merge(total, shard)
+        return total[: len(BUCKETS)], total[-2], total[-1]
+
+    @staticmethod
+    def quantile(counts: list[int], q: float) -> float:
+        """由桶计数估算分位数，在桶内线性插值"""
+        if not (total := sum(counts)):
+            return 0.0
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                lower = BUCKETS[index - 1] if index else 0.0
+                upper = BUCKETS[index]
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return BUCKETS[-2]
+
+    def stats(self) -> dict[str, Any]:
+        """返回调用次数、错误数与分位数"""
+        counts, total_time, errors = self.snapshot()
+        return {
+            "count": sum(counts),
+            "errors": errors,
+            "sum": round(total_time, 6),
+            **{
+                f"p{int(q * 100)}": round(self.quantile(counts, q), 6)
+                for q in QUANTILES
+            },
+        }
+
+
+_histograms: dict[str, Histogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def get_histogram(name: str) -> Histogram:
+    """获取或创建指定名称的直方图，应在装饰时调用"""
+    with _histograms_lock:
+        if (histogram := _histograms.get(name)) is None:
+            histogram = _histograms[name] = Histogram(name)
+    return histogram
+
+
+def function_stats() -> dict[str, dict[str, Any]]:
+    """返回所有函数的耗时统计"""
+    with _histograms_lock:
+        histograms = list(_histograms.values())
+    return {h.name: h.stats() for h in histograms}
+
+
+def _label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _le(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def render_histograms() -> Iterator[str]:
+    """以Prometheus文本格式输出函数耗时直方图、错误数与分位数"""
+    with _histograms_lock:
+        histograms = sorted(_histograms.values(), key=lambda h: h.name)
+    snapshots = [(h, *h.snapshot()) for h in histograms]
+
+    name = "dcoa_function_duration_seconds"
+    yield f"# HELP {name} Execution time of functions decorated by track_execution."
+    yield f"# TYPE {name} histogram"
+    for h, counts, total_time, _ in snapshots:
+        function = _label(h.name)
+        cumulative = 0
+        for bound, count in zip(BUCKETS, counts):
+            cumulative += count
+            yield f'{name}_bucket{{function="{function}",le="{_le(bound)}"}} {cumulative}'
+        yield f'{name}_sum{{function="{function}"}} {total_time}'
+        yield f'{name}_count{{function="{function}"}} {cumulative}'
+
+    name = "dcoa_function_duration_quantile_seconds"
+    yield f"# HELP {name} Estimated execution time quantiles of functions."
+    yield f"# TYPE {name} gauge"
+    for h, counts, _, _ in snapshots:
+        for q in QUANTILES:
+            yield (
+                f'{name}{{function="{_label(h.name)}",quantile="{q}"}} '
+                f"{h.quantile(counts, q)}"
+            )
+
+    name = "dcoa_function_errors_total"
+    yield f"# HELP {name} Exceptions raised by functions decorated by track_execution."
+    yield f"# TYPE {name} counter"
+    for h, _, _, errors in snapshots:
+        yield f'{name}{{function="{_label(h.name)}"}} {errors}'
+
+
+def render_gauges(
+    prefix: str,
+    values: dict[str, Any],
+    help_text: str,
+    counters: tuple[str, ...] = (),
+) -> Iterator[str]:
+    """将统计字典中的数值以Prometheus文本格式输出，非数值的项会被忽略
+    Args:
+        prefix (str): 指标名的前缀，输出为dcoa_{prefix}_{key}
+        values (dict[str, Any]): 统计字典
+        help_text (str): 指标的说明
+        counters (tuple[str, ...], optional): 只增不减的项，以counter类型输出并添加_total后缀，
+            以_count结尾的项会去掉该结尾，如checkout_count输出为checkout_total
+    """
+    for key, value in values.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        name = f"dcoa_{prefix}_{key}"
+        kind = "gauge"
+        if key in counters:
+            name = f"{name.removesuffix('_count')}_total"
+            kind = "counter"
+        yield f"# HELP {name} {help_text}"
+        yield f"# TYPE {name} {kind}"
+        yield f"{name} {value}"
+
+
+def render_counter(
+    name: str, help_text: str, samples: Iterable[tuple[dict[str, Any], float]]
+) -> Iterator[str]:
+    """以Prometheus counter格式输出带标签的计数，指标名为dcoa_{name}_total
+    Args:
+        name (str): 指标名
+        help_text (str): 指标的说明
+        samples (Iterable[tuple[dict[str, Any], float]]): (标签, 计数)
+    """
+    name = f"dcoa_{name}_total"
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} counter"
+    for labels, value in samples:
+        label = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+        yield f"{name}{{{label}}} {value}"
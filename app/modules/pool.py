@@ -1,16 +1,30 @@
 from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any
+from uuid import uuid4
 
 from apscheduler.triggers.date import DateTrigger
+from flask import current_app, has_app_context
 
 from app.utils.utils import Timer
 from config.development import Config
 
 from .scheduler import scheduler
+from .sql_monitor import begin_scope, end_scope
+from .tracing import current_context, span
 
 pool_executor = ThreadPoolExecutor(max_workers=Config.WORK_NUMS)
 
 
+def pool_executor_stats() -> dict[str, Any]:
+    """返回线程池的工作线程数与排队中的任务数"""
+    return {
+        "workers": len(pool_executor._threads),
+        "max_workers": pool_executor._max_workers,
+        "queue_depth": pool_executor._work_queue.qsize(),
+        "scheduled_jobs": len(scheduler.get_jobs()) if scheduler.running else 0,
+    }
+
+
 def submit_task(func: Any, *args, delay: Timer = None, **kwargs) -> None:
     """提交任务至线程池中
 
@@ -21,9 +35,30 @@ def submit_task(func: Any, *args, delay: Timer = None, **kwargs) -> None:
         **kwargs: 需要向函数传递的位置参数
     """
 
+    app = current_app._get_current_object() if has_app_context() else None
+    name = f"job {getattr(func, '__name__', func)}"
+    parent = current_context()  # 任务延续提交者的追踪
+
+    def run_job() -> Any:
+        # 在提交者的应用上下文中执行，并统计该任务执行的SQL
+        token = begin_scope(name)
+        try:
+            with span(name, parent=parent):
+                if app is None:
+                    return func(*args, **kwargs)
+                with app.app_context():
+                    return func(*args, **kwargs)
+        finally:
+            end_scope(token)
+
     def submit_to_pool() -> Future[Any]:
-        return pool_executor.submit(func, *args, **kwargs)
+        return pool_executor.submit(run_job)
 
     if not delay:
-        delay = Timer.as_future(Timer())
-    scheduler.add_job(submit_to_pool, trigger=DateTrigger(run_date=delay.as_future()))
+        delay = Timer()
+    with span("submit_task", job=name):
+        scheduler.add_job(
+            str(uuid4()),
+            submit_to_pool,
+            trigger=DateTrigger(run_date=delay.as_future()),
+        )
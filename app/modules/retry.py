@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable
+
+from config.development import Config
+
+retry_logger = logging.getLogger("app.retry")  # 传递至app.logger的处理器
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求未被发送"""
+
+
+class CircuitBreaker:
+    """熔断器
+    连续失败LLM_BREAKER_THRESHOLD次后打开，打开期间的调用立即失败；
+    经过LLM_BREAKER_RECOVERY秒后进入半开状态，仅放行一次试探调用，成功则关闭，失败则再次打开。\n
+    :Example:
+    .. code-block:: python
+        breaker.before_call()  # 打开时抛出CircuitOpenError
+        try:
+            result = call()
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+    """
+
+    def __init__(self, name: str, threshold: int = 0, recovery: float = 0) -> None:
+        self.name = name
+        self.threshold = threshold or Config.LLM_BREAKER_THRESHOLD
+        self.recovery = recovery or Config.LLM_BREAKER_RECOVERY
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {"trips": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        """closed、open或half_open"""
+        return self._state
+
+    def before_call(self) -> None:
+        """调用前检查，熔断器打开或半开状态下已有试探调用时抛出CircuitOpenError"""
+        with self._lock:
+            if self._state == "open":
+                if time.monotonic() - self._opened_at >= self.recovery:
+                    self._state = "half_open"
+                else:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError(f"{self.name}: circuit open")
+            if self._state == "half_open":
+                if self._probing:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError(f"{self.name}: circuit half open")
+                self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == "half_open" or (
+                self._state == "closed" and self._failures >= self.threshold
+            ):
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._stats["trips"] += 1
+                retry_logger.warning(
+                    f"CircuitBreaker: {self.name} opened after "
+                    f"{self._failures} consecutive failures"
+                )
+
+    def release(self) -> None:
+        """调用被取消等未能得出结果时释放试探名额"""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> dict[str, Any]:
+        """返回熔断器的状态与统计"""
+        with self._lock:
+            return {
+                "state": self._state,
+                "open": int(self._state != "closed"),
+                "failures": self._failures,
+                **self._stats,
+            }
+
+
+def retry_after(error: BaseException) -> float | None:
+    """读取错误响应中的Retry-After或retry-after-ms头，返回需等待的秒数，没有时返回None"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if value := headers.get("retry-after-ms"):
+            return float(value) / 1000
+        if value := headers.get("retry-after"):
+            try:
+                return float(value)
+            except ValueError:  # HTTP日期格式
+                return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class RetryPolicy:
+    """带指数退避与随机抖动的重试策略，可与熔断器配合使用
+    Args:
+        retry_on (tuple[type[BaseException], ...]): 可重试的错误类型，其余错误立即抛出
+        name (str): 名称，用于日志
+        breaker (CircuitBreaker, optional): 熔断器
+        trip_on (tuple[type[BaseException], ...], optional): 计为熔断器失败的错误类型，默认同retry_on
+    - 第n次重试前等待[0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE * 2**n)]内的随机秒数
+    - 错误带有Retry-After时按其等待，超过LLM_RETRY_MAX_DELAY时不再重试
+    - 最多重试LLM_MAX_RETRY_TIMES次，每次重试使用相同的参数\n
+    :Example:
+    .. code-block:: python
+        policy = RetryPolicy((RateLimitError, APIConnectionError), "openai", breaker)
+        response = policy.call(client.chat.completions.create, model=model, messages=messages)
+    """
+
+    def __init__(
+        self,
+        retry_on: tuple[type[BaseException], ...],
+        name: str,
+        breaker: CircuitBreaker | None = None,
+        trip_on: tuple[type[BaseException], ...] | None = None,
+    ) -> None:
+        self.retry_on = retry_on
+        self.name = name
+        self.breaker = breaker
+        self.trip_on = retry_on if trip_on is None else trip_on
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "failures": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def delay(self, attempt: int, error: BaseException) -> float | None:
+        """返回第attempt次失败后需等待的秒数，不应重试时返回None"""
+        if attempt >= Config.LLM_MAX_RETRY_TIMES or not isinstance(
+            error, self.retry_on
+        ):
+            return None
+        if (wait := retry_after(error)) is not None:
+            return max(wait, 0.0) if wait <= Config.LLM_RETRY_MAX_DELAY else None
+        return random.uniform(
+            0, min(Config.LLM_RETRY_MAX_DELAY, Config.LLM_RETRY_BASE * 2**attempt)
+        )
+
+    def _attempt_failed(self, attempt: int, error: Exception) -> float:
+        """记录失败并返回等待秒数，不再重试时抛出该错误"""
+        if self.breaker:
+            if isinstance(error, self.trip_on):
+                self.breaker.record_failure()
+            else:  # 服务有响应，如参数错误或回复无法解析
+                self.breaker.record_success()
+        if (wait := self.delay(attempt, error)) is None:
+            self._count("failures")
+            raise error
+        self._count("retries")
+        retry_logger.warning(
+            f"RetryPolicy: {self.name} attempt {attempt + 1} failed: {error}, "
+            f"retrying in {wait:.2f}s"
+        )
+        return wait
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """调用fn，失败时按策略重试
+        Raises:
+            CircuitOpenError: 熔断器打开时
+            Exception: 不可重试或重试次数用尽时的最后一个错误
+        """
+        self._count("calls")
+        attempt = 0
+        while True:
+            if self.breaker:
+                self.breaker.before_call()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                time.sleep(self._attempt_failed(attempt, e))
+                attempt += 1
+                continue
+            except BaseException:
+                if self.breaker:
+                    self.breaker.release()
+                raise
+            if self.breaker:
+                self.breaker.record_success()
+            return result
+
+    async def acall(self, fn: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """call的异步版本，等待时不阻塞事件循环"""
+        self._count("calls")
+        attempt = 0
+        while True:
+            if self.breaker:
+                self.breaker.before_call()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                await asyncio.sleep(self._attempt_failed(attempt, e))
+                attempt += 1
+                continue
+            except BaseException:  # 包括任务被取消
+                if self.breaker:
+                    self.breaker.release()
+                raise
+            if self.breaker:
+                self.breaker.record_success()
+            return result
+
+    def stats(self) -> dict[str, Any]:
+        """返回重试的统计，包括熔断器的状态"""
+        with self._lock:
+            stats: dict[str, Any] = dict(self._stats)
+        if self.breaker:
+            stats.update({f"breaker_{k}": v for k, v in self.breaker.stats().items()})
+        return stats
@@ -0,0 +1,163 @@
+import logging
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any
+
+from tencentcloud.common import credential
+from tencentcloud.common.profile.client_profile import ClientProfile
+from tencentcloud.common.profile.http_profile import HttpProfile
+from tencentcloud.sms.v20210111 import models, sms_client
+
+from config.development import Config
+
+sms_logger = logging.getLogger("app.sms")  # 传递至app.logger的处理器
+
+_client: sms_client.SmsClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_sms_client() -> sms_client.SmsClient:
+    """获取本进程共用的短信客户端，使用长连接复用HTTPS连接"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            http_profile = HttpProfile(keepAlive=True, reqTimeout=Config.SMS_TIMEOUT)
+            if Config.SMS_ENDPOINT:  # 形如http://127.0.0.1:8080，用于本地测试
+                protocol, _, endpoint = Config.SMS_ENDPOINT.rpartition("://")
+                http_profile = HttpProfile(
+                    protocol=protocol or "https",
+                    endpoint=endpoint,
+                    keepAlive=True,
+                    reqTimeout=Config.SMS_TIMEOUT,
+                )
+            _client = sms_client.SmsClient(
+                credential.Credential(
+                    Config.TENCENTCLOUD_SECRET_ID, Config.TENCENTCLOUD_SECRET_KEY
+                ),
+                Config.SMS_REGION,
+                ClientProfile(httpProfile=http_profile),
+            )
+    return _client
+
+
+def normalize_phone(phone: str) -> str:
+    """将手机号转为E.164格式，未带国家码的号码视为中国大陆号码
+    :Example:
+    .. code-block:: python
+        normalize_phone("138 0000 0000")  # +8613800000000
+    """
+    number = re.sub(r"[\s\-()]", "", phone)
+    if number.startswith("+"):
+        return number
+    if number.startswith("00"):
+        return f"+{number[2:]}"
+    return f"+86{number}"
+
+
+class SmsDispatcher:
+    """合并并发短信请求的发送队列
+    模板参数相同的短信在SMS_BATCH_WINDOW秒内合并为一次SendSmsRequest，每次最多SMS_BATCH_SIZE个号码，
+    各号码的发送状态按E.164格式的号码精确匹配后返回给对应的调用者。\n
+    :Example:
+    .. code-block:: python
+        status = sms_dispatcher.send("13800000000", [code])
+        if status == "Ok":
+            ...
+    """
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue[tuple[str, tuple[str, ...], Future]] = queue.Queue()
+        self._workers: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "messages": 0, "errors": 0}
+
+    def _start(self) -> None:
+        """首次发送时启动后台线程"""
+        with self._lock:
+            if self._workers:
+                return
+            for index in range(Config.SMS_WORKERS):
+                worker = threading.Thread(
+                    target=self._run, name=f"sms-{index}", daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    def send(self, phone: str, params: list[str], timeout: float = 0) -> str:
+        """发送短信并等待结果
+        Args:
+            phone (str): 手机号
+            params (list[str]): 模板参数
+            timeout (float, optional): 等待结果的最长秒数，默认为Config.SMS_TIMEOUT
+        Returns:
+            str: 该号码的发送状态码，如Ok、LimitExceeded.PhoneNumberDailyLimit
+        Raises:
+            TencentCloudSDKException: 请求失败时
+            TimeoutError: 超时仍未得到结果时
+        """
+        self._start()
+        future: Future[str] = Future()
+        self._queue.put((phone, tuple(params), future))
+        return future.result(timeout or Config.SMS_TIMEOUT)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + Config.SMS_BATCH_WINDOW
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # 同一请求中的号码共用模板参数，因此按参数分组
+            groups: dict[tuple[str, ...], list[tuple[str, Future]]] = {}
+            for phone, params, future in batch:
+                groups.setdefault(params, []).append((phone, future))
+            for params, items in groups.items():
+                for i in range(0, len(items), Config.SMS_BATCH_SIZE):
+                    self._dispatch(params, items[i : i + Config.SMS_BATCH_SIZE])
+
+    def _dispatch(
+        self, params: tuple[str, ...], items: list[tuple[str, Future]]
+    ) -> None:
+        """发送一次请求，并按号码将状态交给对应的调用者"""
+        numbers = [normalize_phone(phone) for phone, _ in items]
+        req = models.SendSmsRequest()
+        req.SmsSdkAppId = Config.SMS_SDK_APP_ID
+        req.SignName = Config.SIGN_NAME
+        req.TemplateId = Config.TEMPLATE_ID
+        req.TemplateParamSet = list(params)  # 模板参数
+        req.PhoneNumberSet = list(dict.fromkeys(numbers))  # 下发手机号码
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["messages"] += len(req.PhoneNumberSet)
+        try:
+            resp = get_sms_client().SendSms(req)
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            sms_logger.error(f"SmsDispatcher: SendSms failed: {e}")
+            for _, future in items:
+                future.set_exception(e)
+            return
+
+        # 返回的号码为E.164格式，如+8613800000000
+        codes = {
+            normalize_phone(s.PhoneNumber or ""): s.Code
+            for s in resp.SendStatusSet or []
+        }
+        for number, (_, future) in zip(numbers, items):
+            future.set_result(codes.get(number, "InternalError.NoStatus"))
+
+    def stats(self) -> dict[str, Any]:
+        """返回短信队列的统计"""
+        with self._lock:
+            return {**self._stats, "pending": self._queue.qsize()}
+
+
+sms_dispatcher = SmsDispatcher()
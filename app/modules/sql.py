@@ -1,6 +1,66 @@
+import threading
+import time
+from typing import Any
+
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.pool import QueuePool
+
+
+class StatQueuePool(QueuePool):
+    """记录取用连接时等待情况的连接池"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkout_count = 0  # 取用连接的次数
+        self.wait_count = 0  # 因连接耗尽而等待的次数
+        self.wait_time = 0.0  # 等待连接的总时间，秒
+        self.max_wait_time = 0.0  # 单次等待连接的最长时间，秒
+
+    def _do_get(self) -> Any:
+        # 没有空闲连接且溢出已达上限时，调用者需要等待其他连接归还
+        will_wait = (
+            self._max_overflow > -1
+            and self.checkedin() == 0
+            and self.overflow() >= self._max_overflow
+        )
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkout_count += 1
+                if will_wait:
+                    self.wait_count += 1
+                    self.wait_time += elapsed
+                    self.max_wait_time = max(self.max_wait_time, elapsed)
+
+    def stats(self) -> dict[str, Any]:
+        """返回连接池的实时统计信息"""
+        with self._stats_lock:
+            return {
+                "size": self.size(),
+                "checked_in": self.checkedin(),
+                "checked_out": self.checkedout(),
+                "overflow": self.overflow(),
+                "checkout_count": self.checkout_count,
+                "wait_count": self.wait_count,
+                "wait_time": round(self.wait_time, 4),
+                "max_wait_time": round(self.max_wait_time, 4),
+            }
+
+
+def pool_stats() -> dict[str, Any]:
+    """获取当前数据库引擎连接池的统计信息，需在应用上下文中调用"""
+    pool = db.engine.pool
+    if isinstance(pool, StatQueuePool):
+        return pool.stats()
+    return {"status": pool.status()}
+
 
-db = SQLAlchemy()
+# 连接池的大小等参数由Config.SQLALCHEMY_ENGINE_OPTIONS提供
+db = SQLAlchemy(engine_options={"poolclass": StatQueuePool})
 
 migrate = Migrate()
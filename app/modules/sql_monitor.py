@@ -0,0 +1,131 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from typing import Any
+
+from flask import Flask, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+
+sql_logger = logging.getLogger("app.sql")  # 传递至app.logger的处理器
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+_SHAPE_PATTERN = re.compile(r"\((?:\s*(?:\?|%s|:\w+)\s*,?)+\)")
+
+
+class QueryStats:
+    """一次请求或线程池任务中执行的SQL统计"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.count = 0  # 执行的语句数
+        self.total_time = 0.0  # 执行语句的总时间，秒
+        self.slowest: list[tuple[float, str]] = []  # 最慢的语句，降序
+        self.shapes: Counter[str] = Counter()  # 语句结构与其执行次数
+
+    def record(self, statement: str, elapsed: float) -> None:
+        """记录一条已执行的语句"""
+        statement = " ".join(statement.split())
+        self.count += 1
+        self.total_time += elapsed
+        self.shapes[_SHAPE_PATTERN.sub("(?)", statement)] += 1
+
+        if len(self.slowest) < Config.SQL_SLOWEST_KEPT or elapsed > self.slowest[-1][0]:
+            self.slowest.append((elapsed, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[Config.SQL_SLOWEST_KEPT :]
+
+    def n_plus_one(self) -> list[tuple[str, int]]:
+        """执行次数超过阈值的语句结构，通常意味着N+1查询"""
+        return [
+            (shape, times)
+            for shape, times in self.shapes.most_common()
+            if times > Config.SQL_N_PLUS_ONE_THRESHOLD
+        ]
+
+    def snapshot(self) -> tuple[int, float]:
+        """返回当前的语句数与总时间"""
+        return self.count, self.total_time
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar(
+    "sql_query_stats", default=None
+)
+
+
+def current_stats() -> QueryStats | None:
+    """获取当前请求或任务的SQL统计，不在统计范围内时返回None"""
+    return _current_stats.get()
+
+
+def begin_scope(name: str) -> Token:
+    """开始统计一次请求或任务中执行的SQL"""
+    return _current_stats.set(QueryStats(name))
+
+
+def end_scope(token: Token) -> QueryStats | None:
+    """结束统计，记录统计摘要与疑似的N+1查询"""
+    stats = _current_stats.get()
+    _current_stats.reset(token)
+    if not stats or not stats.count:
+        return stats
+
+    slowest = "; ".join(f"{t:.4f}s {s}" for t, s in stats.slowest)
+    sql_logger.info(
+        f"SQL: {stats.name} executed {stats.count} queries in "
+        f"{stats.total_time:.4f} seconds, slowest: {slowest}"
+    )
+    for shape, times in stats.n_plus_one():
+        sql_logger.warning(
+            f"SQL: possible N+1 in {stats.name}, executed {times} times: {shape}"
+        )
+    return stats
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    conn.info.setdefault("sql_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    elapsed = time.perf_counter() - conn.info["sql_query_start"].pop()
+
+    if elapsed >= Config.SQL_SLOW_QUERY_SECONDS:
+        slow_query_logger.warning(
+            f"Slow query: {elapsed:.4f} seconds: {' '.join(statement.split())}"
+        )
+
+    if stats := _current_stats.get():
+        stats.record(statement, elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context: Any) -> None:
+    """语句执行失败时不会触发after_cursor_execute，在此移除其开始时间"""
+    conn = exception_context.connection
+    if conn is None or exception_context.execution_context is None:
+        return
+    if starts := conn.info.get("sql_query_start"):
+        starts.pop()
+
+
+def init_sql_monitor(app: Flask) -> None:
+    """为每个请求开启SQL统计"""
+
+    @app.before_request
+    def begin_request_scope() -> None:
+        g.sql_scope_token = begin_scope(f"{request.method} {request.path}")
+
+    @app.teardown_request
+    def end_request_scope(_: BaseException | None) -> None:
+        if token := g.pop("sql_scope_token", None):
+            end_scope(token)
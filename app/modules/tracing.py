@@ -0,0 +1,304 @@
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable
+
+from flask import Flask, g, request
+
+from config.development import Config
+
+trace_logger = logging.getLogger("app.trace")  # 传递至app.logger的处理器
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class SpanContext:
+    """跨线程传递的追踪上下文"""
+
+    __slots__ = ("trace_id", "span_id")
+
+    def __init__(self, trace_id: str, span_id: str) -> None:
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+
+class Span:
+    """追踪中的一个时间段，结束时交给导出器"""
+
+    __slots__ = (
+        "name",
+        "context",
+        "parent_id",
+        "attributes",
+        "start",
+        "end",
+        "error",
+    )
+
+    def __init__(
+        self, name: str, trace_id: str, parent_id: str | None, **attributes: Any
+    ) -> None:
+        self.name = name
+        self.context = SpanContext(trace_id, f"{random.getrandbits(64):016x}")
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time_ns()
+        self.end = 0
+        self.error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "duration": (self.end - self.start) / 1e9,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class span:
+    """在当前追踪中创建子时间段，当前没有被采样的追踪时不做任何事
+    Args:
+        name (str): 名称
+        parent (SpanContext, optional): 显式指定的父上下文，用于在线程池任务中延续提交者的追踪
+        **attributes: 附加的属性
+    :Example:
+    .. code-block:: python
+        with span("save_pictures", count=len(pictures)):
+            ...
+    """
+
+    __slots__ = ("name", "parent", "attributes", "_span", "_token")
+
+    def __init__(
+        self, name: str, parent: SpanContext | None = None, **attributes: Any
+    ) -> None:
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self._span: Span | None = None
+        self._token = None
+
+    def __enter__(self) -> Span | None:
+        if self.parent is not None:
+            trace_id, parent_id = self.parent.trace_id, self.parent.span_id
+        elif (current := _current_span.get()) is not None:
+            trace_id, parent_id = current.context.trace_id, current.context.span_id
+        else:
+            return None
+        self._span = Span(self.name, trace_id, parent_id, **self.attributes)
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._span is None:
+            return
+        _current_span.reset(self._token)
+        self._span.end = time.time_ns()
+        if exc_type is not None:
+            self._span.error = f"{exc_type.__name__}: {exc_val}"
+        exporter.export(self._span)
+
+
+def traced(name: str) -> Callable:
+    """装饰器，在当前追踪中为函数的每次调用创建时间段"""
+
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs) -> Any:
+            if _current_span.get() is None:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def current_context() -> SpanContext | None:
+    """返回当前时间段的上下文，供提交至其他线程的任务延续追踪"""
+    current = _current_span.get()
+    return current.context if current is not None else None
+
+
+def start_trace(name: str, traceparent: str = "", **attributes: Any) -> Any:
+    """按Config.TRACE_SAMPLE_RATE采样并开启新的追踪，返回用于end_trace的令牌，未采样时返回None
+    Args:
+        name (str): 根时间段的名称
+        traceparent (str, optional): W3C traceparent头，存在且已采样时延续调用方的追踪
+        **attributes: 附加的属性
+    """
+    if not Config.TRACE_EXPORTER:
+        return None
+    trace_id = parent_id = None
+    if match := _TRACEPARENT.match(traceparent):
+        trace_id, parent_id, flags = match.groups()
+        if not int(flags, 16) & 1:
+            return None
+    elif random.random() >= Config.TRACE_SAMPLE_RATE:
+        return None
+    root = Span(name, trace_id or f"{random.getrandbits(128):032x}", parent_id)
+    root.attributes = attributes
+    return root, _current_span.set(root)
+
+
+def end_trace(token: Any, error: BaseException | None = None) -> None:
+    """结束start_trace开启的追踪并导出根时间段"""
+    root, reset_token = token
+    _current_span.reset(reset_token)
+    root.end = time.time_ns()
+    if error is not None:
+        root.error = f"{type(error).__name__}: {error}"
+    exporter.export(root)
+
+
+class SpanExporter:
+    """在后台线程中批量导出时间段
+    TRACE_EXPORTER为file时以JSON行写入TRACE_FILE，为otlp时以OTLP/HTTP JSON格式发送至TRACE_OTLP_ENDPOINT。
+    队列已满时丢弃并计数。
+    """
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue[Span] = queue.Queue(Config.TRACE_QUEUE_SIZE)
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+
+    def export(self, span: Span) -> None:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._run, name="span-exporter", daemon=True
+                    )
+                    self._worker.start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + Config.TRACE_FLUSH_SECONDS
+            while len(batch) < Config.TRACE_BATCH_SIZE:
+                try:
+                    batch.append(
+                        self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    )
+                except queue.Empty:
+                    break
+            try:
+                if Config.TRACE_EXPORTER == "otlp":
+                    self._send_otlp(batch)
+                else:
+                    self._write_file(batch)
+                with self._lock:
+                    self.exported += len(batch)
+            except Exception as e:
+                with self._lock:
+                    self.dropped += len(batch)
+                trace_logger.warning(f"SpanExporter: export failed: {e}")
+
+    @staticmethod
+    def _write_file(batch: list[Span]) -> None:
+        with open(Config.TRACE_FILE, "a", encoding="utf8") as f:
+            for item in batch:
+                f.write(json.dumps(item.to_dict(), ensure_ascii=False, default=str))
+                f.write("\n")
+
+    @staticmethod
+    def _send_otlp(batch: list[Span]) -> None:
+        spans = []
+        for item in batch:
+            otlp_span = {
+                "traceId": item.context.trace_id,
+                "spanId": item.context.span_id,
+                "name": item.name,
+                "kind": 1,
+                "startTimeUnixNano": str(item.start),
+                "endTimeUnixNano": str(item.end),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(value)}}
+                    for key, value in item.attributes.items()
+                ],
+                "status": (
+                    {"code": 2, "message": item.error} if item.error else {"code": 1}
+                ),
+            }
+            if item.parent_id:
+                otlp_span["parentSpanId"] = item.parent_id
+            spans.append(otlp_span)
+
+        body = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": {"stringValue": "dcoa"}}
+                        ]
+                    },
+                    "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": spans}],
+                }
+            ]
+        }
+        req = urllib.request.Request(
+            Config.TRACE_OTLP_ENDPOINT,
+            data=json.dumps(body, default=str).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req, timeout=5):
+            pass
+
+    def stats(self) -> dict[str, Any]:
+        """返回导出器的统计"""
+        with self._lock:
+            return {
+                "pending": self._queue.qsize(),
+                "exported": self.exported,
+                "dropped": self.dropped,
+            }
+
+
+exporter = SpanExporter()
+
+
+def init_tracing(app: Flask) -> None:
+    """为每个请求开启追踪，响应头中返回trace id"""
+
+    @app.before_request
+    def begin_request_trace() -> None:
+        g.trace_token = start_trace(
+            f"{request.method} {request.path}",
+            request.headers.get("traceparent", ""),
+            method=request.method,
+            path=request.path,
+        )
+
+    @app.after_request
+    def add_trace_header(response: Any) -> Any:
+        if token := g.get("trace_token"):
+            response.headers["X-Trace-Id"] = token[0].context.trace_id
+        return response
+
+    @app.teardown_request
+    def end_request_trace(error: BaseException | None) -> None:
+        if token := g.pop("trace_token", None):
+            end_trace(token, error)
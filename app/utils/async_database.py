@@ -0,0 +1,265 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Literal
+from weakref import WeakKeyDictionary
+
+from flask_sqlalchemy.model import Model
+from sqlalchemy import delete, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.sql import Select
+
+from app.utils.constant import SQLStatus
+from config import Config
+
+from .logger import Log
+
+# 同步驱动与其对应的异步驱动
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# 异步连接绑定于创建它的事件循环，因此每个事件循环使用各自的引擎
+_engines: WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncEngine] = (
+    WeakKeyDictionary()
+)
+_engines_lock = threading.Lock()
+
+
+def async_database_url() -> str:
+    """返回异步驱动的数据库地址，未配置ASYNC_DATABASE_URL时由SQLALCHEMY_DATABASE_URI转换"""
+    if Config.ASYNC_DATABASE_URL:
+        return Config.ASYNC_DATABASE_URL
+    url = make_url(Config.SQLALCHEMY_DATABASE_URI)
+    backend = url.get_backend_name()
+    return url.set(
+        drivername=ASYNC_DRIVERS.get(backend, url.drivername)
+    ).render_as_string(hide_password=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    """获取当前事件循环的异步引擎，连接池参数与同步引擎一致"""
+    loop = asyncio.get_running_loop()
+    with _engines_lock:
+        if (engine := _engines.get(loop)) is None:
+            url = async_database_url()
+            options = {}
+            if not url.startswith("sqlite"):
+                options = dict(Config.SQLALCHEMY_ENGINE_OPTIONS)
+            engine = _engines[loop] = create_async_engine(url, **options)
+    return engine
+
+
+async def dispose_async_engine() -> None:
+    """关闭当前事件循环的异步引擎，应在事件循环结束前调用"""
+    loop = asyncio.get_running_loop()
+    with _engines_lock:
+        engine = _engines.pop(loop, None)
+    if engine is not None:
+        await engine.dispose()
+
+
+def async_session() -> AsyncSession:
+    """创建绑定于当前事件循环的异步会话，提交后实例不会过期"""
+    return async_sessionmaker(get_async_engine(), expire_on_commit=False)()
+
+
+class AsyncCRUD(SQLStatus):
+    """CRUD的异步版本，基于SQLAlchemy的asyncio扩展
+    Args:
+        model (Model, Option): 需要进行操作的模型。
+        **kwargs: 需要操作的键值对
+    与CRUD的用法一致，但所有数据库操作均需await。每个async with使用单独的会话，
+    在async with之外的查询使用临时会话，返回的实例已分离，关联需通过with_profile预先加载。\n
+    :Example:
+    .. code-block:: python
+        async with AsyncCRUD(Model, id=user_id) as r:
+            if res := await r.query_once():
+                await r.update(res, name="Kimu")
+            else:
+                await r.add(name="Kimu")
+        # 查询的示例
+        if result := await AsyncCRUD(Model, id=user_id).query_once():
+            print(result.id)
+    """
+
+    def __init__(self, model: Model = None, **kwargs) -> None:
+        self.model = model
+        self.instance: Model = None
+        self.kwargs = kwargs
+        self.error: Exception | None = None
+        self.status = self.OK
+        self.session: AsyncSession | None = None
+        self._need_commit: bool = False
+        self._options: list = []
+
+    async def __aenter__(self) -> "AsyncCRUD":
+        self.session = async_session()
+        return self
+
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[AsyncSession]:
+        """在async with中使用该实例的会话，否则使用临时会话"""
+        if self.session is not None:
+            yield self.session
+            return
+        async with async_session() as session:
+            yield session
+
+    def create_instance(self, no_attach: bool = False) -> Model:
+        """创建包含kwargs更改的模型的实例并附加到父类的实例对象中，与CRUD.create_instance一致"""
+        if no_attach:
+            return self.model(**self.kwargs)
+        if not self.instance:
+            self.instance = self.model(**self.kwargs)
+        return self.instance
+
+    def with_profile(self, profile: str) -> "AsyncCRUD":
+        """使用模型中load_profiles定义的加载配置，与CRUD.with_profile一致"""
+        self._options = list(self.model.load_profiles[profile]())
+        return self
+
+    def do_not_update(self) -> None:
+        """对该实例的更改并不需要应用到数据库中"""
+        self.error = AssertionError("User called rollback.")
+        self._need_commit = False
+
+    def need_update(self) -> None:
+        """对该实例的更改需要应用到数据库中"""
+        self._need_commit = True
+
+    def _build_statement(self, *args, **kwargs) -> Select:
+        """构建查询语句，参数规则与CRUD.query_key一致"""
+        kw = kwargs or self.kwargs
+
+        statement = select(self.model)
+        if args:
+            statement = statement.filter(*args)
+        if kw:
+            statement = statement.filter_by(**kw)
+        if self._options:
+            statement = statement.options(*self._options)
+        return statement
+
+    async def add(self, instance: Model = None, **kwargs) -> Model | None:
+        """添加条目，与CRUD.add一致，需在async with中使用"""
+        try:
+            instance = instance or self.create_instance()
+            for k, v in kwargs.items():
+                setattr(instance, k, v)
+            self.session.add(instance)
+            self._need_commit = True
+            return instance
+        except SQLAlchemyError as e:
+            self.error = e
+            self.status = self.SQL_ERR
+        except Exception as e:
+            self.error = e
+            self.status = self.INTERNAL_ERR
+        return None
+
+    async def query_key(self, *args, **kwargs) -> list[Model] | None:
+        """通过指定的条件查询条目，与CRUD.query_key的条件一致
+        Returns:
+            (list[Model] | None): 由于异步查询无法延迟执行，存在内容时直接返回所有条目，否则返回None。
+        """
+        result = await self.query_once(*args, mode="all", **kwargs)
+        return result or None
+
+    async def query_once(
+        self,
+        *args,
+        mode: Literal["first", "all", "scalar"] = "first",
+        order_by: Any = None,
+        **kwargs,
+    ) -> Any:
+        """通过指定的条件查询条目，仅执行一次查询，与CRUD.query_once一致"""
+        empty = [] if mode == "all" else None
+        try:
+            statement = self._build_statement(*args, **kwargs)
+            if order_by is not None:
+                statement = statement.order_by(order_by)
+
+            async with self._session() as session:
+                if mode == "all":
+                    result = (await session.scalars(statement)).all()
+                elif mode == "scalar":
+                    primary_key = self.model.__mapper__.primary_key[0]
+                    statement = statement.with_only_columns(primary_key).limit(1)
+                    result = await session.scalar(statement)
+                else:
+                    result = (await session.scalars(statement.limit(1))).first()
+
+            if result is None or result == []:
+                self.status = self.NOT_FOUND
+            return result
+        except SQLAlchemyError as e:
+            self.error = e
+            self.status = self.SQL_ERR
+        except Exception as e:
+            self.error = e
+            self.status = self.INTERNAL_ERR
+        return empty
+
+    async def update(self, instance: Model = None, **kwargs) -> Model | None:
+        """更新条目，与CRUD.update一致，需在async with中使用"""
+        try:
+            if not instance:
+                instance = await self.query_once()
+            for k, v in kwargs.items():
+                setattr(instance, k, v)
+            self._need_commit = True
+            return instance
+        except SQLAlchemyError as e:
+            self.error = e
+            self.status = self.SQL_ERR
+        except Exception as e:
+            self.error = e
+            self.status = self.INTERNAL_ERR
+        return None
+
+    async def delete(self, instance: Model = None, all_records=False, **kwargs) -> bool:
+        """删除条目，与CRUD.delete一致，需在async with中使用"""
+        try:
+            if instance is None and all_records:
+                kw = kwargs or self.kwargs
+                await self.session.execute(delete(self.model).filter_by(**kw))
+            else:
+                if (instance := instance or await self.query_once(**kwargs)) is None:
+                    return False
+                await self.session.delete(instance)
+            self._need_commit = True
+            return True
+        except SQLAlchemyError as e:
+            self.error = e
+            self.status = self.SQL_ERR
+        except Exception as e:
+            self.error = e
+            self.status = self.INTERNAL_ERR
+        return False
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        try:
+            if self.error or exc_type or exc_val or exc_tb:
+                Log.error(
+                    f"AsyncCRUD: <catch: {self.error}> <except: ({exc_type}: {exc_val})>"
+                )
+                if self.session is not None:
+                    await self.session.rollback()
+                self._need_commit = False  # 已回滚的更改不再提交
+
+            if self._need_commit and self.session is not None:
+                await self.session.commit()
+        finally:
+            self._need_commit = False
+            if self.session is not None:
+                await self.session.close()
+                self.session = None
@@ -1,13 +1,128 @@
 import inspect
+import secrets
+import threading
 from functools import wraps
 from typing import Any, Callable
 
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
 from jwt.exceptions import ExpiredSignatureError
 
 from app.models.member import Member
-from app.utils.database import CRUD
+from app.utils.cache import SharedSQLite, TTLCache
+from app.utils.database import CRUD, on_committed_change
 from app.utils.response import Response
+from config import Config
+
+# 用户身份（角色、id、身份版本）的缓存，以用户id为键
+identity_cache = TTLCache(
+    maxsize=Config.IDENTITY_CACHE_SIZE, ttl=Config.IDENTITY_CACHE_TTL
+)
+
+
+class IdentityVersions:
+    """同一主机的工作进程共享的身份版本，存储于WAL模式的SQLite文件
+    身份版本由全局代数与用户的变更次数组成，用户的角色、部门变更或被删除后其变更次数增加，
+    无法确定范围的批量更改使全局代数增加，此前签发的声明与各进程的缓存随即失效。
+    全局代数的初始值随机生成，存储文件被重建时此前的声明均会失效。
+    """
+
+    def __init__(self, path: str = "") -> None:
+        self.db = SharedSQLite(
+            path or Config.IDENTITY_STORE_PATH,
+            "CREATE TABLE IF NOT EXISTS identity_versions ("
+            "user_id TEXT PRIMARY KEY, version INTEGER NOT NULL)",
+        )
+        # 以空的用户id保存全局代数
+        self.db.connection().execute(
+            "INSERT OR IGNORE INTO identity_versions (user_id, version) VALUES ('', ?)",
+            (secrets.randbits(32),),
+        )
+
+    def get(self, user_id: str) -> str:
+        """获取用户当前的身份版本"""
+        versions = dict(
+            self.db.connection()
+            .execute(
+                "SELECT user_id, version FROM identity_versions WHERE user_id IN ('', ?)",
+                (user_id,),
+            )
+            .fetchall()
+        )
+        return f"{versions.get('', 0)}.{versions.get(user_id, 0)}"
+
+    def bump(self, user_ids: set[str] | None) -> None:
+        """增加用户的变更次数，为None时增加全局代数"""
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO identity_versions (user_id, version) VALUES (?, 1) "
+                "ON CONFLICT (user_id) DO UPDATE SET version = version + 1",
+                [("",)] if user_ids is None else [(u,) for u in user_ids if u],
+            )
+
+
+_versions: IdentityVersions | None = None
+_versions_lock = threading.Lock()
+
+
+def get_identity_versions() -> IdentityVersions:
+    """获取本进程使用的身份版本存储"""
+    global _versions
+    with _versions_lock:
+        if _versions is None:
+            _versions = IdentityVersions()
+    return _versions
+
+
+def identity_version(user_id: str) -> str:
+    """获取用户当前的身份版本"""
+    return get_identity_versions().get(user_id)
+
+
+def invalidate_identity(user_ids: set[str] | None) -> None:
+    """用户的角色、部门变更或被删除后，使其令牌中的声明与所有进程的身份缓存失效
+    Args:
+        user_ids (set[str] | None): 发生变更的用户id，为None时使所有用户失效
+    """
+    get_identity_versions().bump(user_ids)
+    if user_ids is None:
+        identity_cache.clear()
+        return
+    for user_id in user_ids:
+        identity_cache.pop(user_id)
+
+
+def identity_claims(member: Member) -> dict[str, Any]:
+    """签发令牌时附加的身份声明"""
+    return {
+        "role": member.role.value,
+        "department_id": member.department_id,
+        "identity_version": identity_version(member.id),
+    }
+
+
+def resolve_identity(user_id: str, claims: dict[str, Any]) -> tuple[str, str] | None:
+    """依次由令牌声明、身份缓存、数据库解析用户的角色与id
+    Returns:
+        (tuple[str, str] | None): 角色与id，用户不存在时返回None
+    """
+    version = identity_version(user_id)
+    if claims.get("role") and claims.get("identity_version") == version:
+        return claims["role"], user_id
+
+    if (identity := identity_cache.get(user_id)) and identity[2] == version:
+        return identity[0], identity[1]
+
+    # 在上下文中查询以绕过进程内的查询缓存与只读副本，避免读取到变更前的角色
+    with CRUD(Member, id=user_id) as q:
+        member = q.query_once()
+    if not member:
+        return None
+    identity_cache.set(user_id, (member.role.value, member.id, version))
+    return member.role.value, member.id
+
+
+# 变更在事务提交后生效，回滚的更改与新建的成员不影响身份
+on_committed_change(Member, ("role", "department_id"), invalidate_identity)
 
 
 def require_role(*roles: str) -> Callable:
@@ -36,32 +151,35 @@ def require_role(*roles: str) -> Callable:
         Returns:
             Callable: 包装后的视图函数
         """
+        # 在装饰时确定需要向视图函数传入的参数，避免每次请求都进行反射
+        func_params = inspect.signature(fn).parameters
+        inject_role = "role" in func_params
+        inject_user_id = "user_id" in func_params
 
         @wraps(fn)
-        @jwt_required()  # 验证jwt
         def decorated_view(*args, **kwargs) -> Response | Any:
             """视图函数
             Returns:
                 (Response | Any): 验证通过则执行原有函数，否则返回错误响应
             """
+            # 与jwt_required相同地验证jwt，错误交由flask_jwt_extended的处理器，不再额外包装一层
+            verify_jwt_in_request()
             try:
                 current_id = get_jwt_identity()
 
-                if not (query := CRUD(Member, id=current_id).query_key()):
+                if not (identity := resolve_identity(current_id, get_jwt())):
                     return Response(
                         Response.r.ERR_NOT_FOUND, message="该用户不存在", immediate=True
                     )
+                role, user_id = identity
 
-                res = query.first()
-
-                if roles and res.role.value not in roles:
+                if roles and role not in roles:
                     return Response(Response.r.AUTH_FAILED, immediate=True)
 
-                func_params = inspect.signature(fn).parameters
-                if "role" in func_params:
-                    kwargs["role"] = res.role.value  # 向原有函数传入键为role的参数
-                if "user_id" in func_params:
-                    kwargs["user_id"] = res.id  # 向原有函数传入键为user_id的参数
+                if inject_role:
+                    kwargs["role"] = role  # 向原有函数传入键为role的参数
+                if inject_user_id:
+                    kwargs["user_id"] = user_id  # 向原有函数传入键为user_id的参数
 
                 return fn(*args, **kwargs)
             except ExpiredSignatureError:
@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Iterator
+
+
+class TTLCache:
+    """线程安全的带过期时间的LRU缓存
+    Args:
+        maxsize (int): 最多保存的条目数，超出时淘汰最久未使用的条目
+        ttl (float): 条目的存活秒数
+    :Example:
+    .. code-block:: python
+        cache = TTLCache(maxsize=128, ttl=60)
+        if (value := cache.get(key)) is None:
+            value = load(key)
+            cache.set(key, value)
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """获取未过期的值，并将其标记为最近使用"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """写入值，ttl不指定时使用实例的ttl"""
+        expire_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expire_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """移除并返回值"""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """移除所有键满足条件的条目，返回移除的数量"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """返回缓存的命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class SharedSQLite:
+    """同一主机的多个工作进程共享的WAL模式SQLite文件
+    Args:
+        path (str): 数据库文件路径，各进程需指向同一文件
+        schema (str): 建表语句，初始化时执行
+    每个线程使用各自的连接，需要先读后写的操作应在transaction中进行。
+    """
+
+    def __init__(self, path: str, schema: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(schema)
+
+    def connection(self) -> sqlite3.Connection:
+        """获取当前线程的连接，处于自动提交模式"""
+        if (conn := getattr(self._local, "conn", None)) is None:
+            conn = self._local.conn = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None
+            )
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """以BEGIN IMMEDIATE开始的事务，保证跨进程的读写原子性"""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
@@ -0,0 +1,180 @@
+import secrets
+import string
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+from app.models.verification import Verification
+from app.modules.pool import submit_task
+from config import Config
+
+from .cache import SharedSQLite, TTLCache
+from .database import CRUD
+
+
+def generate_code(length: int = 6) -> str:
+    """生成数字验证码"""
+    return "".join(secrets.choice(string.digits) for _ in range(length))
+
+
+class CodeStore(ABC):
+    """验证码存储的基类，以(联系方式, 值)为键，每个键仅保留最近一次发送的验证码
+    - 距上次发送不足CODE_INTERVAL分钟且未验证时拒绝再次发送
+    - 验证码在CODE_VALID_TIME分钟内有效，验证成功后即失效
+    """
+
+    @property
+    def interval(self) -> float:
+        return Config.CODE_INTERVAL * 60
+
+    @property
+    def valid_time(self) -> float:
+        return Config.CODE_VALID_TIME * 60
+
+    @property
+    def ttl(self) -> float:
+        """条目的保留秒数，超过后既不影响发送间隔也无法验证"""
+        return max(self.interval, self.valid_time)
+
+    @abstractmethod
+    def issue(self, contact_type: str, value: str) -> str | None:
+        """生成并保存新的验证码
+        Args:
+            contact_type (str): 联系方式，email或phone
+            value (str): 联系方式的值
+        Returns:
+            (str | None): 新的验证码，发送过于频繁时返回None
+        """
+
+    @abstractmethod
+    def verify(self, contact_type: str, value: str, code: str) -> bool:
+        """验证并消费验证码，成功后该验证码失效"""
+
+    @abstractmethod
+    def discard(self, contact_type: str, value: str, code: str) -> None:
+        """移除未能成功发送的验证码，使用户可以立即重新发送"""
+
+
+class MemoryCodeStore(CodeStore):
+    """进程内的验证码存储，适用于单进程部署"""
+
+    def __init__(self) -> None:
+        self._codes = TTLCache(Config.VERIFICATION_STORE_SIZE, self.ttl)
+        self._lock = threading.Lock()  # 保证检查与写入的原子性
+
+    def issue(self, contact_type: str, value: str) -> str | None:
+        key = (contact_type, value)
+        now = time.monotonic()
+        with self._lock:
+            if entry := self._codes.get(key):
+                code, sent_at = entry
+                if code and now - sent_at <= self.interval:
+                    return None
+            code = generate_code()
+            self._codes.set(key, (code, now))
+        return code
+
+    def verify(self, contact_type: str, value: str, code: str) -> bool:
+        key = (contact_type, value)
+        with self._lock:
+            entry = self._codes.get(key)
+            if not entry or not code or entry[0] != code:
+                return False
+            if time.monotonic() - entry[1] > self.valid_time:
+                return False
+            self._codes.set(key, (None, entry[1]))  # 已验证，保留发送时间
+        return True
+
+    def discard(self, contact_type: str, value: str, code: str) -> None:
+        key = (contact_type, value)
+        with self._lock:
+            if (entry := self._codes.get(key)) and entry[0] == code:
+                self._codes.pop(key)
+
+
+class SQLiteCodeStore(CodeStore):
+    """基于WAL模式SQLite文件的验证码存储，同一主机的多个工作进程共享"""
+
+    def __init__(self, path: str = "") -> None:
+        self.db = SharedSQLite(
+            path or Config.VERIFICATION_STORE_PATH,
+            "CREATE TABLE IF NOT EXISTS codes ("
+            "type TEXT NOT NULL, value TEXT NOT NULL, code TEXT, "
+            "sent_at REAL NOT NULL, PRIMARY KEY (type, value))",
+        )
+
+    def issue(self, contact_type: str, value: str) -> str | None:
+        now = time.time()
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM codes WHERE sent_at < ?", (now - self.ttl,))
+            row = conn.execute(
+                "SELECT code, sent_at FROM codes WHERE type = ? AND value = ?",
+                (contact_type, value),
+            ).fetchone()
+            if row and row[0] and now - row[1] <= self.interval:
+                return None
+            code = generate_code()
+            conn.execute(
+                "INSERT OR REPLACE INTO codes (type, value, code, sent_at) "
+                "VALUES (?, ?, ?, ?)",
+                (contact_type, value, code, now),
+            )
+        return code
+
+    def verify(self, contact_type: str, value: str, code: str) -> bool:
+        if not code:
+            return False
+        cursor = self.db.connection().execute(
+            "UPDATE codes SET code = NULL "
+            "WHERE type = ? AND value = ? AND code = ? AND sent_at >= ?",
+            (contact_type, value, code, time.time() - self.valid_time),
+        )
+        return cursor.rowcount == 1
+
+    def discard(self, contact_type: str, value: str, code: str) -> None:
+        self.db.connection().execute(
+            "DELETE FROM codes WHERE type = ? AND value = ? AND code = ?",
+            (contact_type, value, code),
+        )
+
+
+# 可通过Config.VERIFICATION_STORE选择的存储
+CODE_STORES: dict[str, type[CodeStore]] = {
+    "memory": MemoryCodeStore,
+    "sqlite": SQLiteCodeStore,
+}
+
+_store: CodeStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_code_store() -> CodeStore:
+    """获取Config.VERIFICATION_STORE指定的验证码存储"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CODE_STORES[Config.VERIFICATION_STORE]()
+    return _store
+
+
+def _write_audit(contact_type: str, value: str, code: str, verified: bool) -> None:
+    if not verified:
+        with CRUD(Verification, type=contact_type, value=value, code=code) as v:
+            v.add(sent_at=datetime.now(timezone.utc))
+        return
+    with CRUD(Verification, type=contact_type, value=value, code=code) as v:
+        if record := v.query_once(order_by=Verification.sent_at.desc()):
+            v.update(record, code=None, verified=True)
+
+
+def audit(contact_type: str, value: str, code: str, verified: bool = False) -> None:
+    """在Config.VERIFICATION_AUDIT启用时，于线程池中将发送与验证记录写入verifications表
+    Args:
+        contact_type (str): 联系方式，email或phone
+        value (str): 联系方式的值
+        code (str): 验证码
+        verified (bool, optional): 为True时记录验证成功，否则记录发送
+    """
+    if Config.VERIFICATION_AUDIT:
+        submit_task(_write_audit, contact_type, value, code, verified)
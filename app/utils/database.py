@@ -1,13 +1,86 @@
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Iterator, Literal
+
+from flask import Flask, g, has_app_context, has_request_context, request
 from flask_sqlalchemy.model import Model
 from flask_sqlalchemy.query import Query
+from sqlalchemy import event, insert, inspect, tuple_, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.modules.sql import db
+from app.modules.tracing import current_context, span
+from app.utils.cache import SharedSQLite, TTLCache
 from app.utils.constant import SQLStatus
+from config import Config
 
 from .logger import Log
 
 
+class ModelGenerations:
+    """同一主机的工作进程共享的模型代数，存储于WAL模式的SQLite文件
+    开启了cache_lookups的模型的更改被提交后其代数增加，代数是查询缓存键的一部分，
+    因此任一进程提交的更改都会使所有进程中该模型的缓存条目失效。
+    """
+
+    def __init__(self, path: str = "") -> None:
+        self.db = SharedSQLite(
+            path or Config.CRUD_CACHE_STORE_PATH,
+            "CREATE TABLE IF NOT EXISTS model_generations ("
+            "model TEXT PRIMARY KEY, generation INTEGER NOT NULL)",
+        )
+
+    def get(self, model_name: str) -> int:
+        """获取模型当前的代数"""
+        row = (
+            self.db.connection()
+            .execute(
+                "SELECT generation FROM model_generations WHERE model = ?",
+                (model_name,),
+            )
+            .fetchone()
+        )
+        return row[0] if row else 0
+
+    def bump(self, model_names: set[str]) -> None:
+        """增加模型的代数"""
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO model_generations (model, generation) VALUES (?, 1) "
+                "ON CONFLICT (model) DO UPDATE SET generation = generation + 1",
+                [(name,) for name in model_names],
+            )
+
+
+_generations: ModelGenerations | None = None
+_generations_lock = threading.Lock()
+
+
+def get_model_generations() -> ModelGenerations:
+    """获取本进程使用的模型代数存储"""
+    global _generations
+    with _generations_lock:
+        if _generations is None:
+            _generations = ModelGenerations()
+    return _generations
+
+
+def _traced(fn: Callable) -> Callable:
+    """在当前追踪中为CRUD的数据库操作创建时间段，记录所操作的模型"""
+    name = f"CRUD.{fn.__name__}"
+
+    @wraps(fn)
+    def wrapper(self: "CRUD", *args, **kwargs) -> Any:
+        if current_context() is None:
+            return fn(self, *args, **kwargs)
+        with span(name, model=getattr(self.model, "__name__", "")):
+            return fn(self, *args, **kwargs)
+
+    return wrapper
+
+
 class CRUD(SQLStatus):
     """操作数据库模型的上下文管理器
     Args:
@@ -26,10 +99,25 @@ class CRUD(SQLStatus):
                 r.update(instance, name="Kimu")
                 r.add(instance)
         # 查询的示例
-        if query := CRUD(Model, id=user_id).query():
-            result = query.first()
+        if result := CRUD(Model, id=user_id).query_once():
+            print(result.id)
+        # 使用模型中定义的加载配置，一次查询中加载序列化所需的关联
+        if result := CRUD(Model, id=user_id).with_profile("profile").query_once():
+            print(result.to_dict())
+    在with之外使用query_once时，如果配置了名为replica的SQLALCHEMY_BINDS，查询会被发送至只读副本；
+    with中的查询以及写入后REPLICA_STICKY_SECONDS秒内的查询仍使用主库，粘滞时间由响应的cookie交给客户端，
+    因此请求被其他工作进程处理时同样有效。
+    模型的cache_lookups为True时，with之外仅以键值查询单条条目的query_once会经过进程内缓存，
+    任一工作进程提交该模型的更改后，所有进程中该模型的缓存随即失效。
     """
 
+    REPLICA_BIND = "replica"
+
+    STICKY_COOKIE = "dcoa_primary_until"  # 客户端携带的粘滞截止时间
+
+    # 以模型名、模型代数与查询键值为键，保存条目的列值
+    _lookup_cache = TTLCache(maxsize=Config.CRUD_CACHE_SIZE, ttl=Config.CRUD_CACHE_TTL)
+
     def __init__(self, model: Model = None, **kwargs) -> None:
         self.model = model
         self.instance: Model = None
@@ -37,10 +125,39 @@ class CRUD(SQLStatus):
         self.error: Exception | None = None
         self.status = self.OK
         self._need_commit: bool = False
+        self._in_context: bool = False
+        self._options: list = []
 
     def __enter__(self) -> "CRUD":
+        self._in_context = True
         return self
 
+    @classmethod
+    def _mark_write(cls) -> None:
+        """记录本次请求（应用上下文）已写入，之后的读取使用主库，并由响应的cookie延续至之后的请求"""
+        if has_app_context():
+            g.crud_wrote = True
+
+    @classmethod
+    def _read_sticky(cls) -> bool:
+        """本次请求已写入，或客户端携带的粘滞时间未过时，读取应使用主库"""
+        if has_app_context() and g.get("crud_wrote"):
+            return True
+        if has_request_context():
+            try:
+                return float(request.cookies.get(cls.STICKY_COOKIE, 0)) > time.time()
+            except ValueError:
+                return False
+        return False
+
+    def _read_bind_arguments(self) -> dict[str, Any]:
+        """选择读取使用的数据库，满足条件时使用只读副本"""
+        if self._in_context or self.REPLICA_BIND not in db.engines:
+            return {}
+        if self._read_sticky():
+            return {}
+        return {"bind": db.engines[self.REPLICA_BIND]}
+
     def create_instance(self, no_attach: bool = False) -> Model:
         """创建包含kwargs更改的模型的实例并附加到父类的实例对象中
         Args:
@@ -54,6 +171,16 @@ class CRUD(SQLStatus):
             self.instance = self.model(**self.kwargs)
         return self.instance
 
+    def with_profile(self, profile: str) -> "CRUD":
+        """使用模型中load_profiles定义的加载配置，对之后的查询应用joinedload或selectinload
+        Args:
+            profile (str): 加载配置的名称
+        Returns:
+            CRUD: 返回自身以便链式调用
+        """
+        self._options = list(self.model.load_profiles[profile]())
+        return self
+
     def do_not_update(self) -> None:
         """对该实例的更改并不需要应用到数据库中
         :Example:
@@ -102,12 +229,28 @@ class CRUD(SQLStatus):
             self.status = self.INTERNAL_ERR
         return None
 
+    def _build_query(self, *args, **kwargs) -> Query:
+        """构建查询对象但不执行，参数规则与query_key一致"""
+        kw = kwargs or self.kwargs
+
+        query = self.model.query
+        # 仅表达式的情况
+        if args:
+            query = query.filter(*args)
+        # 仅键值的情况或表达式与键值的情况
+        if kw:
+            query = query.filter_by(**kw)
+        if self._options:
+            query = query.options(*self._options)
+        return query
+
     def query_key(self, *args, **kwargs) -> Query | None:
         """通过指定的条件查询条目
         Args:
             *args: 可选参数，使用比较来过滤查询的内容
             **kwargs: 当提供kwargs或args时，会使用kwargs或args的值进行查询，否则使用创建实例时传入的kwargs进行查询
         **当args与kwargs皆传入时，将会同时查询两者均匹配的条件**
+        **注意**：该方法会先执行一次查询以确认条目存在，取值时会再次查询，仅需结果时请使用query_once。
         Returns:
             (Query | None): 如果查询存在内容，则返回Query对象。否则返回None。
         :Example:
@@ -117,15 +260,7 @@ class CRUD(SQLStatus):
                 q.query_key(func.date(q.model.datetime) == my_date)
         """
         try:
-            kw = kwargs or self.kwargs
-
-            query = self.model.query
-            # 仅表达式的情况
-            if args:
-                query = query.filter(*args)
-            # 仅键值的情况或表达式与键值的情况
-            if kw:
-                query = query.filter_by(**kw)
+            query = self._build_query(*args, **kwargs)
 
             if not query.first():
                 self.status = self.NOT_FOUND
@@ -139,6 +274,197 @@ class CRUD(SQLStatus):
             self.status = self.INTERNAL_ERR
         return None
 
+    @_traced
+    def query_once(
+        self,
+        *args,
+        mode: Literal["first", "all", "scalar"] = "first",
+        order_by: Any = None,
+        **kwargs,
+    ) -> Any:
+        """通过指定的条件查询条目，仅执行一次查询并直接返回结果，查询状态记录于status中
+        Args:
+            *args: 可选参数，使用比较来过滤查询的内容
+            mode (Literal[&quot;first&quot;, &quot;all&quot;, &quot;scalar&quot;], optional): 返回第一条条目、所有条目或第一条条目的主键值（仅确认存在时使用），默认为first。
+            order_by (Any, optional): 排序的表达式，可选。
+            **kwargs: 与query_key一致，不提供时使用创建实例时传入的kwargs进行查询
+        Returns:
+            (Any): 查询的结果。未找到或出错时返回None，mode为all时返回空列表。
+        :Example:
+        .. code-block:: python
+            # 查询指定用户最新的日报
+            with CRUD(DailyReport, user_id=user_id) as r:
+                report = r.query_once(order_by=r.model.created_at.desc())
+                if r.status == r.NOT_FOUND:
+                    ...
+        """
+        empty = [] if mode == "all" else None
+        try:
+            cache_key = None
+            if mode == "first" and not (args or order_by is not None):
+                cache_key = self._cache_key(kwargs or self.kwargs)
+            if cache_key and (values := self._lookup_cache.get(cache_key)):
+                return self._from_cache(values)
+
+            query = self._build_query(*args, **kwargs)
+            if order_by is not None:
+                query = query.order_by(order_by)
+
+            bind_arguments = self._read_bind_arguments()
+            if mode == "all":
+                result = (
+                    db.session.execute(query.statement, bind_arguments=bind_arguments)
+                    .scalars()
+                    .all()
+                )
+            elif mode == "scalar":
+                primary_key = self.model.__mapper__.primary_key[0]
+                query = query.with_entities(primary_key).limit(1)
+                result = db.session.execute(
+                    query.statement, bind_arguments=bind_arguments
+                ).scalar()
+            else:
+                result = (
+                    db.session.execute(
+                        query.limit(1).statement, bind_arguments=bind_arguments
+                    )
+                    .scalars()
+                    .first()
+                )
+
+            self._count_saved_round_trip()
+            if result is None or result == []:
+                self.status = self.NOT_FOUND
+            elif cache_key:
+                self._lookup_cache.set(cache_key, self._to_cache(result))
+            return result
+        except SQLAlchemyError as e:
+            self.error = e
+            self.status = self.SQL_ERR
+        except Exception as e:
+            self.error = e
+            self.status = self.INTERNAL_ERR
+        return empty
+
+    def _cache_key(self, kw: dict) -> tuple | None:
+        """生成包含模型当前代数的缓存键，模型未开启缓存或条件不适用时返回None"""
+        if not (
+            Config.CRUD_CACHE_ENABLED
+            and getattr(self.model, "cache_lookups", False)
+            and kw
+            and not self._in_context
+            and not self._options
+        ):
+            return None
+        try:
+            key = tuple(sorted(kw.items()))
+            hash(key)
+        except TypeError:
+            return None
+        # 在查询之前读取代数，查询期间其他进程提交的更改会使写入的条目无法命中
+        name = self.model.__name__
+        return name, get_model_generations().get(name), key
+
+    def _to_cache(self, instance: Model) -> dict[str, Any]:
+        """取出实例的列值以供缓存"""
+        return {
+            attr.key: getattr(instance, attr.key)
+            for attr in self.model.__mapper__.column_attrs
+        }
+
+    def _from_cache(self, values: dict[str, Any]) -> Model:
+        """由缓存的列值还原实例，并在不查询的情况下附加至当前会话"""
+        instance = self.model(**values)
+        make_transient_to_detached(instance)
+        return db.session.merge(instance, load=False)
+
+    @classmethod
+    def invalidate_cache(cls, *model_names: str) -> None:
+        """使指定模型的缓存失效，不指定时清空所有缓存"""
+        if not model_names:
+            cls._lookup_cache.clear()
+            return
+        cls._lookup_cache.invalidate(lambda key: key[0] in model_names)
+
+    @classmethod
+    def cache_stats(cls) -> dict[str, Any]:
+        """返回查询缓存的命中统计"""
+        return cls._lookup_cache.stats()
+
+    def iter_chunks(
+        self, *args, order_by: Any = None, size: int = 0, **kwargs
+    ) -> Iterator[list[Model]]:
+        """以键集分页逐块读取匹配的条目，每块单独查询，内存占用不随表的大小增长
+        Args:
+            *args: 与query_key一致，使用比较来过滤查询的内容
+            order_by (Any, optional): 升序排序的模型属性，默认为主键。非主键时会与主键组合以保证顺序唯一。
+            size (int, optional): 每块的条目数，默认使用Config.ITER_CHUNK_SIZE。
+            **kwargs: 与query_key一致，不提供时使用创建实例时传入的kwargs进行查询
+        Returns:
+            Iterator[list[Model]]: 每次返回一块条目，出错时停止并记录于error与status中
+        :Example:
+        .. code-block:: python
+            with CRUD(DailyReport, generating=True) as r:
+                for reports in r.iter_chunks(order_by=r.model.created_at):
+                    ...
+        """
+        size = size or Config.ITER_CHUNK_SIZE
+        mapper = self.model.__mapper__
+        primary_key = mapper.primary_key[0]
+        keys = [primary_key]
+        if order_by is not None and order_by.key != primary_key.key:
+            keys.insert(0, order_by)
+        names = [mapper.get_property_by_column(primary_key).key]
+        if len(keys) > 1:
+            names.insert(0, order_by.key)
+
+        last = None
+        while True:
+            try:
+                query = self._build_query(*args, **kwargs)
+                if last is not None:
+                    query = query.filter(tuple_(*keys) > tuple_(*last))
+                query = query.order_by(*keys).limit(size)
+                rows = (
+                    db.session.execute(
+                        query.statement,
+                        bind_arguments=self._read_bind_arguments(),
+                        execution_options={"yield_per": size},
+                    )
+                    .scalars()
+                    .all()
+                )
+                # 在交给调用者前记录键值，调用者提交后实例会过期
+                if rows:
+                    last = [getattr(rows[-1], name) for name in names]
+            except SQLAlchemyError as e:
+                self.error = e
+                self.status = self.SQL_ERR
+                return
+            except Exception as e:
+                self.error = e
+                self.status = self.INTERNAL_ERR
+                return
+
+            if not rows:
+                return
+            yield rows
+            if len(rows) < size:
+                return
+
+    @staticmethod
+    def _count_saved_round_trip() -> None:
+        """在本次请求（应用上下文）中记录一次节省的数据库往返"""
+        if has_app_context():
+            g.crud_saved_round_trips = g.get("crud_saved_round_trips", 0) + 1
+
+    @staticmethod
+    def saved_round_trips() -> int:
+        """获取本次请求（应用上下文）中通过query_once节省的数据库往返次数"""
+        if has_app_context():
+            return g.get("crud_saved_round_trips", 0)
+        return 0
+
     def update(self, instance: Model = None, **kwargs) -> Model | None:
         """更新条目
         Args:
@@ -148,10 +474,9 @@ class CRUD(SQLStatus):
             (Model | None): 当操作成功时返回实例对象。否则返回None。
         """
         try:
-            # 为了兼容add的操作，如果创建的实例在表内不存在，则直接进入setattr操作
-            if (query := self.query_key()) and not instance:
-                instance = query.first()
-                # raise LookupError(f"Cannot find row by specified keys: {self.kwargs}.")
+            # 为了兼容add的操作，传入实例时不再查询，直接进入setattr操作
+            if not instance:
+                instance = self.query_once()
             for k, v in kwargs.items():
                 setattr(instance, k, v)
             self._need_commit = True
@@ -164,6 +489,7 @@ class CRUD(SQLStatus):
             self.status = self.INTERNAL_ERR
         return None
 
+    @_traced
     def delete(self, instance: Model = None, all_records=False, **kwargs) -> bool:
         """删除条目
         Args:
@@ -173,12 +499,13 @@ class CRUD(SQLStatus):
             bool: 成功或失败
         """
         try:
-            query = self.query_key() or self.query_key(**kwargs)
-            if query:
-                query = query if all_records else query.first()
-                query.delete()
-
-            db.session.delete(instance)
+            if instance is None and all_records:
+                # 直接执行一次批量删除，不再逐条查询
+                self._build_query(**kwargs).delete()
+            else:
+                if (instance := instance or self.query_once(**kwargs)) is None:
+                    return False
+                db.session.delete(instance)
             self._need_commit = True
             return True
         except SQLAlchemyError as e:
@@ -189,10 +516,219 @@ class CRUD(SQLStatus):
             self.status = self.INTERNAL_ERR
         return False
 
+    @_traced
+    def bulk_add(
+        self, rows: list[dict], chunk_size: int = 0, commit: bool = True
+    ) -> bool:
+        """批量添加条目，以多行INSERT执行并在每个分块后提交一次
+        Args:
+            rows (list[dict]): 需要添加的条目，每个字典为一行的键值对。类传入的kwargs会作为每行的默认值。
+            chunk_size (int, optional): 每次执行的行数，默认使用Config.BULK_CHUNK_SIZE。
+            commit (bool, optional): 是否在每个分块后提交，为False时由with结束时一并提交或回滚。默认为True。
+        Returns:
+            bool: 成功或失败，失败时已提交的分块不会被回滚
+        :Example:
+        .. code-block:: python
+            with CRUD(DailyReport, daily_task="") as r:
+                r.bulk_add([{"user_id": "1"}, {"user_id": "2"}])
+            # 在同一事务中写入两个模型
+            with CRUD(PeriodTask) as t, CRUD(DailyReport) as r:
+                t.bulk_update(task_rows, commit=False) and r.bulk_add(report_rows, commit=False)
+        """
+        rows = [{**self.kwargs, **row} for row in rows]
+        return self._bulk_execute(insert(self.model), rows, chunk_size, commit)
+
+    @_traced
+    def bulk_update(
+        self, rows: list[dict], chunk_size: int = 0, commit: bool = True
+    ) -> bool:
+        """批量更新条目，以executemany按主键更新并在每个分块后提交一次
+        Args:
+            rows (list[dict]): 需要更新的条目，每个字典必须包含该模型的主键。
+            chunk_size (int, optional): 每次执行的行数，默认使用Config.BULK_CHUNK_SIZE。
+            commit (bool, optional): 是否在每个分块后提交，为False时由with结束时一并提交或回滚。默认为True。
+        Returns:
+            bool: 成功或失败，失败时已提交的分块不会被回滚
+        :Example:
+        .. code-block:: python
+            with CRUD(DailyReport) as r:
+                r.bulk_update([{"report_id": report_id, "generating": True}])
+        """
+        return self._bulk_execute(update(self.model), rows, chunk_size, commit)
+
+    def _bulk_execute(
+        self, statement: Any, rows: list[dict], chunk_size: int, commit: bool
+    ) -> bool:
+        """将语句按分块以executemany方式执行，commit为True时每个分块提交一次"""
+        chunk_size = chunk_size or Config.BULK_CHUNK_SIZE
+        try:
+            for start in range(0, len(rows), chunk_size):
+                db.session.execute(statement, rows[start : start + chunk_size])
+                if commit:
+                    db.session.commit()
+                    self._mark_write()
+            if not commit and rows:
+                self._need_commit = True
+            return True
+        except SQLAlchemyError as e:
+            self.error = e
+            self.status = self.SQL_ERR
+        except Exception as e:
+            self.error = e
+            self.status = self.INTERNAL_ERR
+        db.session.rollback()
+        return False
+
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         if self.error or exc_type or exc_val or exc_tb:
             Log.error(f"CRUD: <catch: {self.error}> <except: ({exc_type}: {exc_val})>")
             db.session.rollback()
 
         if self._need_commit:
-            db.session.commit()
+            with span("CRUD.commit", model=getattr(self.model, "__name__", "")):
+                db.session.commit()
+            self._mark_write()
+
+
+def init_replica_routing(app: Flask) -> None:
+    """写入过数据库的请求在响应中设置粘滞cookie，客户端之后的请求在粘滞时间内读取主库"""
+
+    @app.after_request
+    def set_sticky_cookie(response: Any) -> Any:
+        if g.get("crud_wrote") and CRUD.REPLICA_BIND in db.engines:
+            sticky = Config.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                CRUD.STICKY_COOKIE,
+                f"{time.time() + sticky:.3f}",
+                max_age=sticky,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def _changed_models(session: Any) -> set[str]:
+    """本次事务中发生更改且开启了查询缓存的模型名"""
+    return session.info.setdefault("crud_changed_models", set())
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_flushed_models(session: Any, flush_context: Any) -> None:
+    """记录被flush的实例所属的模型"""
+    changed = _changed_models(session)
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if getattr(type(instance), "cache_lookups", False):
+            changed.add(type(instance).__name__)
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _collect_bulk_models(orm_execute_state: Any) -> None:
+    """记录批量INSERT、UPDATE、DELETE所操作的模型"""
+    state = orm_execute_state
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    if state.bind_mapper and getattr(state.bind_mapper.class_, "cache_lookups", False):
+        _changed_models(state.session).add(state.bind_mapper.class_.__name__)
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalidate_committed_models(session: Any) -> None:
+    """提交后增加发生更改的模型的代数，使所有进程中的缓存失效"""
+    if changed := session.info.pop("crud_changed_models", None):
+        CRUD.invalidate_cache(*changed)
+        try:
+            get_model_generations().bump(changed)
+        except Exception as e:
+            Log.error(f"CRUD: failed to bump model generations: {e}")
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_changed_models(session: Any) -> None:
+    """回滚后丢弃记录的更改"""
+    session.info.pop("crud_changed_models", None)
+
+
+# 以模型为键的提交后回调，[(关注的列名, 回调)]
+_change_listeners: dict[type, list[tuple[frozenset[str], Callable]]] = {}
+
+
+def on_committed_change(
+    model: type, columns: tuple[str, ...], callback: Callable[[set | None], None]
+) -> None:
+    """注册回调，在指定模型的列被更改或条目被删除的事务提交后调用
+    Args:
+        model (type): 模型
+        columns (tuple[str, ...]): 关注的列名
+        callback (Callable[[set | None], None]): 以发生更改的主键集合调用；
+            无法确定范围的批量UPDATE或DELETE以None调用，此时应视为所有条目均已更改
+    回滚的更改不会触发回调。\n
+    :Example:
+    .. code-block:: python
+        on_committed_change(Member, ("role",), lambda ids: print(ids))
+    """
+    _change_listeners.setdefault(model, []).append((frozenset(columns), callback))
+
+
+def _row_changes(session: Any) -> dict[Callable, set | None]:
+    """本次事务中各回调对应的更改，值为None时表示范围未知"""
+    return session.info.setdefault("crud_row_changes", {})
+
+
+def _mark_changed(session: Any, callback: Callable, key: Any) -> None:
+    changes = _row_changes(session)
+    if key is None:
+        changes[callback] = None
+    elif changes.setdefault(callback, set()) is not None:
+        changes[callback].add(key)
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_row_changes(session: Any, flush_context: Any) -> None:
+    """由flush后的状态记录关注的列被更改或被删除的条目"""
+    instances = [(i, False) for i in session.dirty] + [
+        (i, True) for i in session.deleted
+    ]
+    for instance, deleted in instances:
+        if not (listeners := _change_listeners.get(type(instance))):
+            continue
+        state = inspect(instance)
+        for columns, callback in listeners:
+            if deleted or any(
+                state.attrs[column].history.has_changes() for column in columns
+            ):
+                _mark_changed(session, callback, state.identity[0])
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _collect_bulk_row_changes(orm_execute_state: Any) -> None:
+    """记录批量UPDATE、DELETE所涉及的条目，executemany的UPDATE以参数中的主键确定范围"""
+    state = orm_execute_state
+    if not (state.is_update or state.is_delete) or not state.bind_mapper:
+        return
+    if not (listeners := _change_listeners.get(state.bind_mapper.class_)):
+        return
+    primary_key = state.bind_mapper.primary_key[0].key
+    rows = state.parameters if isinstance(state.parameters, list) else None
+    for columns, callback in listeners:
+        if state.is_delete or not rows or any(primary_key not in r for r in rows):
+            _mark_changed(state.session, callback, None)
+            continue
+        for row in rows:
+            if columns.intersection(row):
+                _mark_changed(state.session, callback, row[primary_key])
+
+
+@event.listens_for(db.session, "after_commit")
+def _notify_row_changes(session: Any) -> None:
+    """提交后调用回调"""
+    for callback, keys in session.info.pop("crud_row_changes", {}).items():
+        try:
+            callback(keys)
+        except Exception as e:
+            Log.error(f"CRUD: committed change callback failed: {e}")
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_row_changes(session: Any) -> None:
+    """回滚后丢弃记录的更改"""
+    session.info.pop("crud_row_changes", None)
@@ -1,4 +1,4 @@
-import inspect
+import linecache
 import sys
 import time
 import traceback
@@ -7,43 +7,62 @@ from typing import Any, Callable
 
 from flask import current_app as app
 
+from app.modules.metrics import get_histogram
+from app.modules.sql_monitor import current_stats
+from app.modules.tracing import current_context, span
+from config import Config
 
-class Log:
-    @staticmethod
-    def _trace_info(err_info: str) -> str:
-        stack = inspect.stack()
-        info = f"回溯消息：{err_info}\n"
-        for index, frame in enumerate(stack):
-            if index < 2:
-                continue
 
-            code = ""
-            if frame.code_context:
-                code = f"执行 {frame.code_context[-1].strip()} 时"
+class _LazyMessage:
+    """在处理器实际输出日志时才格式化的消息，多个处理器共用第一次格式化的结果"""
 
-            if index == 2:
-                info += f"函数 {frame.function} 在 {frame.filename} {frame.lineno} 行的 {code} 出现错误\n函数追踪："
-            elif index < 6:
-                info += (
-                    f"\n函数 {frame.function} 在 {frame.filename} {frame.lineno} 行调用"
-                )
+    __slots__ = ("_format", "_args", "_text")
 
-        return info
+    def __init__(self, format: Callable[..., str], *args: Any) -> None:
+        self._format = format
+        self._args = args
+        self._text: str | None = None
 
-    @staticmethod
-    def _error_traceback(e: Exception) -> str:
-        exc_type, exc_value, exc_tb = sys.exc_info()
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = self._format(*self._args)
+            self._args = ()  # 释放调用栈与回溯的引用
+        return self._text
 
-        if not (exc_type or exc_value or exc_tb):
-            return Log._trace_info(str(e))
 
-        info = ""
-        e_type = None
+class Log:
+    @staticmethod
+    def _capture_frames(depth: int) -> list[tuple[str, str, int]]:
+        """通过sys._getframe获取调用栈，仅记录函数名、文件与行号，不读取源码"""
+        frames = []
+        frame = sys._getframe(depth)
+        while frame and len(frames) < Config.LOG_TRACE_DEPTH:
+            code = frame.f_code
+            frames.append((code.co_name, code.co_filename, frame.f_lineno))
+            frame = frame.f_back
+        return frames
+
+    @staticmethod
+    def _format_trace(err_info: str, frames: list[tuple[str, str, int]]) -> str:
+        info = f"回溯消息：{err_info}\n"
+        for index, (function, filename, lineno) in enumerate(frames):
+            if index == 0:
+                code = ""
+                if line := linecache.getline(filename, lineno).strip():
+                    code = f"执行 {line} 时"
+                info += f"函数 {function} 在 {filename} {lineno} 行的 {code} 出现错误\n函数追踪："
+            else:
+                info += f"\n函数 {function} 在 {filename} {lineno} 行调用"
+        return info
 
-        if exc_type:
-            e_type = getattr(exc_type, "__name__")
+    @staticmethod
+    def _trace_info(err_info: str) -> _LazyMessage:
+        # 跳过本函数与Log中的调用者，仅在输出时读取源码并格式化
+        return _LazyMessage(Log._format_trace, err_info, Log._capture_frames(3))
 
-        info += f"错误类型：{e_type}\n"
+    @staticmethod
+    def _format_error(exc_type: type, exc_value: BaseException, exc_tb: Any) -> str:
+        info = f"错误类型：{getattr(exc_type, '__name__', None)}\n"
         info += f"错误消息：{exc_value}\n"
 
         info += "错误回溯:"
@@ -53,6 +72,15 @@ class Log:
 
         return info
 
+    @staticmethod
+    def _error_traceback(e: Exception) -> _LazyMessage:
+        exc_type, exc_value, exc_tb = sys.exc_info()
+
+        if not (exc_type or exc_value or exc_tb):
+            return Log._trace_info(str(e))
+
+        return _LazyMessage(Log._format_error, exc_type, exc_value, exc_tb)
+
     @staticmethod
     def warn(warn: Warning | str) -> None:
         """处理运行时警告信息"""
@@ -84,38 +112,57 @@ class Log:
         """
 
         def decorator(fn: Callable) -> Callable:
+            # 在装饰时确定函数名与异常时的返回方式，避免每次调用重复计算
+            name = fn.__name__
+            warn_response = when_warn.__class__.__name__ == "Response"
+            error_response = when_error.__class__.__name__ == "Response"
+            qualname = fn.__qualname__
+            histogram = get_histogram(qualname)  # 耗时与错误数记录于此
+
             @wraps(fn)
             def wrapper(*args, **kwargs) -> Any:
-                start_time = time.time()  # 记录开始时间
-                input_args = args
-                input_kwargs = kwargs
+                start_time = time.perf_counter()  # 记录开始时间
+                stats = current_stats()
+                sql_start = stats.snapshot() if stats else None
+                failed = False
 
                 if not hide_param:
                     Log.info(
-                        f"Executing: {fn.__name__} with args: {input_args} and kwargs: {input_kwargs}"
+                        f"Executing: {name} with args: {args} and kwargs: {kwargs}"
                     )
                 try:
-                    result = fn(*args, **kwargs)  # 调用原函数
+                    if current_context() is None:
+                        result = fn(*args, **kwargs)  # 调用原函数
+                    else:
+                        with span(qualname):  # 在当前追踪中创建时间段
+                            result = fn(*args, **kwargs)
                     if not hide_param:
-                        Log.info(f"{fn.__name__} returned: {result}")
+                        Log.info(f"{name} returned: {result}")
                     return result
 
                 except Warning as w:
-                    Log.warn(f"Warning in {fn.__name__}: {str(w)}")
-                    if when_warn.__class__.__name__ == "Response":
-                        return when_warn.response()
-                    return when_warn
+                    Log.warn(f"Warning in {name}: {str(w)}")
+                    return when_warn.response() if warn_response else when_warn
 
                 except Exception as e:
+                    failed = True
                     Log.error(e)
-                    if when_error.__class__.__name__ == "Response":
-                        return when_error.response()
-                    return when_error
+                    return when_error.response() if error_response else when_error
                 finally:
-                    end_time = time.time()
-                    Log.info(
-                        f"Finished: {fn.__name__} in {end_time - start_time:.4f} seconds"
-                    )
+                    elapsed = time.perf_counter() - start_time
+                    histogram.observe(elapsed, failed)
+                    # 使用惰性格式化，日志级别未启用时不产生字符串
+                    if stats:
+                        count, total_time = stats.snapshot()
+                        app.logger.info(
+                            "Finished: %s in %.4f seconds, %d queries in %.4f seconds",
+                            name,
+                            elapsed,
+                            count - sql_start[0],
+                            total_time - sql_start[1],
+                        )
+                    else:
+                        app.logger.info("Finished: %s in %.4f seconds", name, elapsed)
 
             return wrapper
 
@@ -0,0 +1,207 @@
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from functools import wraps
+from typing import Any, Callable
+
+from flask import Response as FlaskResponse
+from flask import request
+
+from config import Config
+
+from .cache import SharedSQLite
+from .response import Response
+
+
+def _estimate(
+    now: float, window: float, start: float, count: int, prev: int
+) -> tuple[float, int, int, float]:
+    """滑动窗口计数：以上一窗口计数按重叠比例加权估算当前窗口内的请求数
+    Returns:
+        (tuple[float, int, int, float]): 当前窗口的起始时间、当前窗口计数、上一窗口计数与估算值
+    """
+    current = now - now % window
+    if start != current:
+        prev = count if start == current - window else 0
+        count = 0
+    weight = 1 - (now - current) / window
+    return current, count, prev, prev * weight + count
+
+
+class RateLimiter(ABC):
+    """限流器的基类，hit在允许时计数并返回True，超出限制时返回False且不计数"""
+
+    @abstractmethod
+    def hit(self, key: str, limit: int, window: float) -> bool:
+        """
+        Args:
+            key (str): 限流的键
+            limit (int): 窗口内允许的请求数
+            window (float): 窗口秒数
+        Returns:
+            bool: 是否允许该请求
+        """
+
+
+class MemoryRateLimiter(RateLimiter):
+    """进程内的限流器，键按哈希分布至多个分段，每个分段使用各自的锁"""
+
+    def __init__(self, stripes: int = 0) -> None:
+        stripes = stripes or Config.RATE_LIMIT_STRIPES
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._buckets: list[dict[str, list]] = [{} for _ in range(stripes)]
+        self._hits = [0] * stripes
+
+    def hit(self, key: str, limit: int, window: float) -> bool:
+        index = hash(key) % len(self._locks)
+        bucket = self._buckets[index]
+        now = time.time()
+        with self._locks[index]:
+            self._hits[index] += 1
+            if self._hits[index] % 1024 == 0:  # 定期清除已过期的窗口
+                for k in [k for k, v in bucket.items() if v[3] < now]:
+                    del bucket[k]
+
+            start, count, prev, _ = bucket.get(key, (0.0, 0, 0, 0.0))
+            start, count, prev, estimated = _estimate(now, window, start, count, prev)
+            allowed = estimated < limit
+            if allowed:
+                count += 1
+            bucket[key] = [start, count, prev, start + 2 * window]
+        return allowed
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """基于WAL模式SQLite文件的限流器，同一主机的多个工作进程共享计数"""
+
+    def __init__(self, path: str = "") -> None:
+        self.db = SharedSQLite(
+            path or Config.RATE_LIMIT_STORE_PATH,
+            "CREATE TABLE IF NOT EXISTS limits ("
+            "key TEXT PRIMARY KEY, start REAL NOT NULL, count INTEGER NOT NULL, "
+            "prev INTEGER NOT NULL, expire_at REAL NOT NULL)",
+        )
+
+    def hit(self, key: str, limit: int, window: float) -> bool:
+        now = time.time()
+        with self.db.transaction() as conn:
+            if random.random() < 0.01:  # 偶尔清除已过期的窗口
+                conn.execute("DELETE FROM limits WHERE expire_at < ?", (now,))
+
+            row = conn.execute(
+                "SELECT start, count, prev FROM limits WHERE key = ?", (key,)
+            ).fetchone()
+            start, count, prev, estimated = _estimate(
+                now, window, *(row or (0.0, 0, 0))
+            )
+            allowed = estimated < limit
+            if allowed:
+                count += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO limits (key, start, count, prev, expire_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, start, count, prev, start + 2 * window),
+            )
+        return allowed
+
+
+# 可通过Config.RATE_LIMIT_STORE选择的限流器
+RATE_LIMITERS: dict[str, type[RateLimiter]] = {
+    "memory": MemoryRateLimiter,
+    "sqlite": SQLiteRateLimiter,
+}
+
+_limiter: RateLimiter | None = None
+_limiter_lock = threading.Lock()
+
+# 本进程的限流统计，{接口: {"allowed": 次数, "rejected": 次数, "rejected_by": {维度: 次数}}}
+_counters: dict[str, dict[str, Any]] = defaultdict(
+    lambda: {"allowed": 0, "rejected": 0, "rejected_by": defaultdict(int)}
+)
+_counters_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取Config.RATE_LIMIT_STORE指定的限流器"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RATE_LIMITERS[Config.RATE_LIMIT_STORE]()
+    return _limiter
+
+
+def _request_keys() -> dict[str, str]:
+    """从请求中提取各维度的值，ip之外的维度来自JSON请求体"""
+    keys = {"ip": request.remote_addr or ""}
+    if isinstance(body := request.get_json(silent=True), dict):
+        for dimension in ("username", "phone", "email"):
+            if isinstance(value := body.get(dimension), str) and value:
+                keys[dimension] = value
+    return keys
+
+
+def check_rate_limit(endpoint: str) -> str | None:
+    """按Config.RATE_LIMITS中该接口的规则对当前请求计数
+    Args:
+        endpoint (str): RATE_LIMITS中的接口名
+    Returns:
+        (str | None): 超出限制的维度，未超出时返回None
+    """
+    rules: dict[str, tuple[int, float]] = Config.RATE_LIMITS.get(endpoint, {})
+    limiter = get_rate_limiter()
+    rejected_by = None
+    for dimension, value in _request_keys().items():
+        if dimension not in rules:
+            continue
+        limit, window = rules[dimension]
+        if not limiter.hit(f"{endpoint}:{dimension}:{value}", limit, window):
+            rejected_by = dimension
+            break
+
+    with _counters_lock:
+        counter = _counters[endpoint]
+        if rejected_by:
+            counter["rejected"] += 1
+            counter["rejected_by"][rejected_by] += 1
+        else:
+            counter["allowed"] += 1
+    return rejected_by
+
+
+def rate_limit_stats() -> dict[str, Any]:
+    """返回本进程的限流统计"""
+    with _counters_lock:
+        return {
+            "store": Config.RATE_LIMIT_STORE,
+            "endpoints": {
+                endpoint: {**counter, "rejected_by": dict(counter["rejected_by"])}
+                for endpoint, counter in _counters.items()
+            },
+        }
+
+
+def rate_limit(endpoint: str) -> Callable:
+    """装饰器，在视图函数执行前按IP、账号、手机号与邮箱限流
+    Args:
+        endpoint (str): Config.RATE_LIMITS中的接口名
+    超出限制时直接返回ERR_TOO_MUCH_TIME，不会执行任何数据库或密码哈希操作。\n
+    :Example:
+    .. code-block:: python
+        @auth_bp.route("/login", methods=["POST"])
+        @rate_limit("login")
+        def login_view():
+            ...
+    """
+
+    def wrapper(fn: Callable) -> Callable:
+        @wraps(fn)
+        def decorated_view(*args, **kwargs) -> FlaskResponse | Any:
+            if Config.RATE_LIMIT_ENABLED and check_rate_limit(endpoint):
+                return Response(Response.r.ERR_TOO_MUCH_TIME, immediate=True)
+            return fn(*args, **kwargs)
+
+        return decorated_view
+
+    return wrapper
@@ -1,11 +1,73 @@
+from functools import lru_cache
 from io import BytesIO
-from typing import Any
+from itertools import islice
+from types import GeneratorType
+from typing import Any, Callable, Iterator
 
 from flask import Response as FlaskResponse
-from flask import jsonify
+from flask import current_app as app
+from flask import stream_with_context
+from sqlalchemy.exc import SQLAlchemyError
 
 from app.utils.constant import ResponseConstant as R
 from app.utils.logger import Log
+from config import Config
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖
+    orjson = None
+
+
+# 状态对象与其状态、状态码、消息的对应表，在导入时构建
+STATUS_TABLE: dict[str, tuple[R.Object, R.Code, R.Message]] = {}
+for _key, _value in R.Object.__dict__.items():
+    if not _key.startswith("_"):
+        STATUS_TABLE.setdefault(
+            _value, (_value, getattr(R.Code, _key), getattr(R.Message, _key))
+        )
+
+
+def _flask_dumps(obj: Any) -> bytes:
+    return app.json.dumps(obj).encode()
+
+
+def _orjson_dumps(obj: Any) -> bytes:
+    # 日期等类型仍交由Flask的规则转换，保持与Flask编码器一致的输出
+    return orjson.dumps(
+        obj,
+        default=app.json.default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+    )
+
+
+# 可通过Config.RESPONSE_JSON_ENCODER选择的编码器，auto时在安装了orjson的情况下使用orjson
+JSON_ENCODERS: dict[str, Callable[[Any], bytes]] = {"flask": _flask_dumps}
+if orjson is not None:
+    JSON_ENCODERS["orjson"] = _orjson_dumps
+
+
+def json_dumps(obj: Any) -> bytes:
+    """使用Config.RESPONSE_JSON_ENCODER指定的编码器将对象序列化为JSON"""
+    name = Config.RESPONSE_JSON_ENCODER
+    if name == "auto":
+        name = "orjson" if orjson is not None else "flask"
+    return JSON_ENCODERS[name](obj)
+
+
+def _error_status(error: Exception) -> R.Object:
+    """数据库错误对应ERR_SQL，其余错误对应ERR_INTERNAL"""
+    return (
+        R.Object.ERR_SQL
+        if isinstance(error, SQLAlchemyError)
+        else R.Object.ERR_INTERNAL
+    )
+
+
+@lru_cache(maxsize=256)
+def _fixed_body(message: str, status: str) -> bytes:
+    """不含数据的响应体只由消息与状态决定，序列化一次后复用"""
+    return json_dumps({"msg": message, "status": status, "data": None})
 
 
 class Response(R):
@@ -68,14 +130,7 @@ class Response(R):
     def _get_attributes(
         self, status_obj: R.Object
     ) -> tuple[R.Object, R.Code, R.Message]:
-        for key, value in R.Object.__dict__.items():
-            if value == status_obj:
-                status = status_obj
-                code = getattr(R.Code, key)
-                message = getattr(R.Message, key)
-                return status, code, message
-
-        return R.Object.ERR_INTERNAL, R.Code.ERR_INTERNAL, R.Message.ERR_INTERNAL
+        return STATUS_TABLE.get(status_obj) or STATUS_TABLE[R.Object.ERR_INTERNAL]
 
     def g_response(self) -> FlaskResponse:
         """将响应转为Flask响应体"""
@@ -99,9 +154,53 @@ class Response(R):
         if isinstance(self.data, (bytes, bytearray, BytesIO)):
             return FlaskResponse(self.data, code, mimetype=mime_type)
 
-        data = jsonify({"msg": message, "status": status, "data": self.data})
-        data.mime_type = "application/json"
-        return data
+        if isinstance(self.data, GeneratorType):
+            return self._stream_response(message, status, code)
+
+        if self.data is None and not err:
+            body = _fixed_body(message, status)
+        else:
+            body = json_dumps({"msg": message, "status": status, "data": self.data})
+        return app.response_class(body, mimetype="application/json")
+
+    def _stream_response(self, message: str, status: str, code: int) -> FlaskResponse:
+        """以流的方式输出生成器中的数据
+        返回前先序列化第一块（至多Config.ITER_CHUNK_SIZE项），此时的查询或序列化错误仍以ERR_SQL或ERR_INTERNAL响应；
+        之后的错误已无法更改响应的状态，响应体会以error字段结束。
+        """
+        try:
+            head = [
+                json_dumps(item) for item in islice(self.data, Config.ITER_CHUNK_SIZE)
+            ]
+        except Exception as e:
+            self.data.close()
+            return Response(_error_status(e), message=e).g_response()
+
+        return FlaskResponse(
+            stream_with_context(self._stream_json(message, status, head)),
+            code,
+            mimetype="application/json",
+        )
+
+    def _stream_json(
+        self, message: str, status: str, head: list[bytes]
+    ) -> Iterator[bytes]:
+        """将生成器中的数据逐项序列化为JSON数组，内存占用不随数据量增长"""
+        yield b'{"msg": %s, "status": %s, "data": [' % (
+            json_dumps(message),
+            json_dumps(status),
+        )
+        yield b",".join(head)
+        try:
+            # 第一块不足一块时生成器已耗尽，此处不会再有数据
+            for item in self.data:
+                yield b"," + json_dumps(item)
+        except Exception as e:
+            Log.error(e)
+            error = {"status": _error_status(e), "msg": str(e)}
+            yield b'], "error": %s}' % json_dumps(error)
+            return
+        yield b"]}"
 
     def response(self) -> FlaskResponse:
         """执行响应"""
@@ -2,6 +2,7 @@ from flask import Flask
 
 from .admin_dashboard import admin_bp
 from .auth import auth_bp
+from .metrics import metrics_bp
 from .report import report_bp
 from .schedule import schedule_bp
 from .static import static_bp
@@ -14,6 +15,7 @@ def register_blueprints(app: Flask) -> None:
     """注册所有蓝图至Flask中"""
     app.register_blueprint(admin_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(metrics_bp)
     app.register_blueprint(report_bp)
     app.register_blueprint(schedule_bp)
     app.register_blueprint(static_bp)
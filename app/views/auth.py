@@ -5,6 +5,7 @@ from flask import request
 from marshmallow import Schema, ValidationError, fields, validate
 
 from app.controllers.auth import login, send_verification_code
+from app.utils.rate_limit import rate_limit
 from app.utils.response import Response
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
@@ -24,6 +25,7 @@ class SendCodeSchema(Schema):
 
 
 @auth_bp.route("/login", methods=["POST"])
+@rate_limit("login")
 def login_view() -> FlaskResponse:
     """登录路由
     - 学号与密码
@@ -46,6 +48,7 @@ def login_view() -> FlaskResponse:
 
 
 @auth_bp.route("/send_code", methods=["POST"])
+@rate_limit("send_code")
 def send_code_view() -> Response:
     """发送验证码路由
     - 手机
@@ -0,0 +1,28 @@
+# 监控指标视图
+import hmac
+
+from flask import Blueprint
+from flask import Response as FlaskResponse
+from flask import request
+
+from app.controllers.metrics import metrics
+from app.utils.response import Response
+from config import Config
+
+metrics_bp = Blueprint("metrics", __name__, url_prefix="/metrics")
+
+
+@metrics_bp.route("", methods=["GET"])
+def metrics_view() -> FlaskResponse:
+    """Prometheus指标路由
+    配置了METRICS_TOKEN时，需要携带Authorization: Bearer <token>
+    """
+    try:
+        if Config.METRICS_TOKEN and not hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {Config.METRICS_TOKEN}"
+        ):
+            return Response(Response.r.AUTH_FAILED, immediate=True)
+
+        return metrics().response()
+    except Exception as e:
+        return Response(Response.r.ERR_INTERNAL, message=e, immediate=True)
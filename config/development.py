@@ -19,21 +19,106 @@ class Config:
 
     REPORT_GENERATE_DELAY_MINS = 5  # 生成日报需延后的分钟
 
-    LLM_MAX_RETRY_TIMES = 1
+    LLM_MAX_RETRY_TIMES = 2  # LLM请求失败后的最大重试次数
+    LLM_RETRY_BASE = 1  # 重试退避的基准秒数，每次重试翻倍并随机抖动
+    LLM_RETRY_MAX_DELAY = 20  # 单次退避的最长秒数，Retry-After超过该值时不再重试
+    LLM_TIMEOUT = 60  # 单次LLM请求的超时秒数
+    LLM_BREAKER_THRESHOLD = 5  # 连续失败多少次后熔断
+    LLM_BREAKER_RECOVERY = 30  # 熔断后经过多少秒放行一次试探请求
+    LLM_CONCURRENCY = 5  # 定时任务中同时进行的LLM请求数
+    LLM_CACHE_ENABLED = True  # 是否复用相同请求的LLM回复
+    LLM_CACHE_TTL = 7 * 24 * 3600  # 缓存回复的存活秒数
+    LLM_CACHE_SIZE = 2000  # 缓存的最大条目数，超出时淘汰最久未使用的回复
+
+    BULK_CHUNK_SIZE = 500  # 批量写入时每次提交的行数
+    ITER_CHUNK_SIZE = 500  # 分块读取时每块的行数
+
+    CRUD_CACHE_ENABLED = True  # 是否启用CRUD的查询缓存，模型需设置cache_lookups
+    CRUD_CACHE_SIZE = 1024  # 查询缓存的最大条目数
+    CRUD_CACHE_TTL = 60  # 查询缓存的存活秒数，其他进程的更改由共享的模型代数立即失效
+
+    LOG_DIR = os.getenv("LOG_DIR", "logs")  # app.log与slow_query.log所在的目录
+    LOG_TRACE_DEPTH = 4  # 错误日志中记录的调用栈层数
+    LOG_QUEUE_SIZE = 10000  # 日志队列的最大长度，已满时丢弃新的日志
+    LOG_GZIP_ROTATED = True  # 是否在后台压缩轮转后的日志文件
+
+    # 函数耗时直方图的桶上界，秒
+    METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    TRACE_SAMPLE_RATE = 0.1  # 未携带traceparent的请求被追踪的比例
+    TRACE_FILE = "traces.jsonl"  # file导出时写入的文件
+    TRACE_QUEUE_SIZE = 10000  # 导出队列的最大长度，已满时丢弃
+    TRACE_BATCH_SIZE = 100  # 每次导出的最大时间段数
+    TRACE_FLUSH_SECONDS = 1  # 导出前等待凑满一批的最长秒数
+
+    SQL_SLOW_QUERY_SECONDS = 0.5  # 超过该秒数的语句记录至慢查询日志
+    SQL_N_PLUS_ONE_THRESHOLD = 5  # 一次请求中同一语句执行超过该次数时视为N+1查询
+    SQL_SLOWEST_KEPT = 3  # 每次请求中保留的最慢语句数
+
+    IDENTITY_CACHE_SIZE = 4096  # 身份缓存的最大条目数
+    IDENTITY_CACHE_TTL = 300  # 身份缓存的存活秒数，变更由共享的身份版本立即失效
+
+    BCRYPT_LOG_ROUNDS = 12  # 密码哈希的cost，登录时会将不一致的哈希重新生成
+    BCRYPT_WORKERS = 2  # 计算密码哈希的进程数，为0时在请求线程中计算
+    BCRYPT_MAX_PENDING = 16  # 同时计算与等待中的哈希数上限
+    BCRYPT_QUEUE_TIMEOUT = 5  # 等待哈希计算空位的最长秒数
 
     CODE_INTERVAL = 1  # 验证码的最短发送间隔
     CODE_VALID_TIME = 10  # 验证码的有效时间
+    VERIFICATION_STORE = "memory"  # 验证码存储，memory仅限单进程，多进程部署使用sqlite
+    VERIFICATION_STORE_SIZE = 10000  # 进程内存储的最大条目数
+    VERIFICATION_AUDIT = False  # 是否将验证码的发送与验证记录写入verifications表
+
+    RATE_LIMIT_ENABLED = True  # 是否对认证接口限流
+    RATE_LIMIT_STORE = (
+        "memory"  # 限流计数的存储，memory仅限单进程，多进程部署使用sqlite
+    )
+    RATE_LIMIT_STRIPES = 16  # 进程内限流器的锁分段数
+    # 应用前的可信反向代理层数，大于0时由X-Forwarded-For取得客户端IP
+    # 默认为0，不信任客户端可伪造的转发头，仅在反向代理之后部署时设置
+    PROXY_TRUSTED_HOPS = int(os.getenv("PROXY_TRUSTED_HOPS", "0"))
+    # 各接口按维度的限流规则，{接口: {维度: (窗口内允许的请求数, 窗口秒数)}}
+    RATE_LIMITS = {
+        "login": {
+            "ip": (30, 60),
+            "username": (10, 300),
+            "phone": (10, 300),
+            "email": (10, 300),
+        },
+        "send_code": {"ip": (10, 60), "phone": (5, 3600), "email": (5, 3600)},
+    }
+
+    SMS_REGION = "ap-guangzhou"  # 短信服务的地域
+    SMS_TIMEOUT = 10  # 短信请求与等待结果的超时秒数
+    SMS_WORKERS = 2  # 发送短信的后台线程数
+    SMS_BATCH_WINDOW = 0.05  # 合并并发短信的等待秒数
+    SMS_BATCH_SIZE = 200  # 每次请求的最大号码数，即服务商的上限
 
     EMAIL_SMTP_PORT = 587  # 邮件服务器端口号
     EMAIL_SUBJECT = "点创办公自动化系统"  # 邮件主题
     EMAIL_TEXT = "您的验证码是："  # 邮件正文
+    EMAIL_STARTTLS = True  # 连接后是否启用STARTTLS
+    EMAIL_TIMEOUT = 10  # SMTP连接与发送的超时秒数
+    EMAIL_POOL_SIZE = 2  # 保留的已登录SMTP连接数
+    EMAIL_CONNECTION_IDLE = 60  # 连接空闲超过该秒数后重建，应小于服务器的空闲超时
+    EMAIL_WORKERS = 2  # 发送邮件的后台线程数
+    EMAIL_QUEUE_SIZE = 1000  # 发送队列的最大长度
+    EMAIL_BATCH_SIZE = 20  # 每次通过同一连接发送的最大邮件数
+    EMAIL_MAX_RETRY = 3  # 发送失败后的最大重试次数
+    EMAIL_RETRY_BACKOFF = 2  # 首次重试的等待秒数，之后每次加倍
 
     TIMEZONE = "Asia/Shanghai"
 
+    RESPONSE_JSON_ENCODER = "auto"  # 响应的JSON编码器，auto、orjson或flask
+
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=5)
 
     SECRET_KEY = os.getenv("SECRET_KEY")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
+    REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")  # 只读副本，可选
+    SQLALCHEMY_BINDS = {"replica": REPLICA_DATABASE_URL} if REPLICA_DATABASE_URL else {}
+    REPLICA_STICKY_SECONDS = 5  # 写入后该时间内的查询仍读取主库
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")  # 可选，默认由DATABASE_URL转换
 
     TENCENTCLOUD_SECRET_ID = os.getenv("TENCENTCLOUD_SECRET_ID")
     TENCENTCLOUD_SECRET_KEY = os.getenv("TENCENTCLOUD_SECRET_KEY")
@@ -41,13 +126,56 @@ class Config:
     SMS_SDK_APP_ID = os.getenv("SMS_SDK_APP_ID")
     SIGN_NAME = os.getenv("SIGN_NAME")
     TEMPLATE_ID = os.getenv("TEMPLATE_ID")
+    SMS_ENDPOINT = os.getenv("SMS_ENDPOINT")  # 可选，覆盖短信服务的地址
+
+    VERIFICATION_STORE_PATH = os.getenv(
+        "VERIFICATION_STORE_PATH", "verification_codes.db"
+    )  # sqlite存储的文件路径，同一主机的工作进程需指向同一文件
+
+    IDENTITY_STORE_PATH = os.getenv(
+        "IDENTITY_STORE_PATH", "identity_versions.db"
+    )  # 身份版本的文件路径，同一主机的工作进程需指向同一文件
+
+    CRUD_CACHE_STORE_PATH = os.getenv(
+        "CRUD_CACHE_STORE_PATH", "crud_cache.db"
+    )  # 查询缓存的模型代数的文件路径，同一主机的工作进程需指向同一文件
+
+    LLM_CACHE_PATH = os.getenv(
+        "LLM_CACHE_PATH", "llm_cache.db"
+    )  # LLM回复缓存的文件路径，同一主机的工作进程共享
+
+    RATE_LIMIT_STORE_PATH = os.getenv(
+        "RATE_LIMIT_STORE_PATH", "rate_limits.db"
+    )  # sqlite限流器的文件路径，同一主机的工作进程需指向同一文件
 
     EMAIL_SMTP = os.getenv("EMAIL_SMTP")
     EMAIL_ACCOUNT = os.getenv("EMAIL_ACCOUNT")
     EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # 可选，覆盖OpenAI的API地址
+
+    TRACE_EXPORTER = os.getenv(
+        "TRACE_EXPORTER", "otlp" if os.getenv("TRACE_OTLP_ENDPOINT") else ""
+    )  # 追踪的导出方式，file、otlp，为空时关闭追踪，默认仅在设置了TRACE_OTLP_ENDPOINT时以otlp导出
+    TRACE_OTLP_ENDPOINT = os.getenv(
+        "TRACE_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces"
+    )  # otlp导出时的OTLP/HTTP地址
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # 可选，设置后/metrics需要该令牌
 
     DISPOSABLE_APP_KEY = str(uuid4())
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False  # 禁用SQL警告
+
+    SQL_POOL_SIZE = WORK_NUMS + 5  # 连接池常驻连接数，线程池与web线程共用
+    SQL_POOL_MAX_OVERFLOW = 5  # 连接池允许超出的连接数
+    SQL_POOL_TIMEOUT = 30  # 等待可用连接的最长秒数
+    SQL_POOL_RECYCLE = 3600  # 连接的最长存活秒数，应小于MySQL的wait_timeout
+
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": SQL_POOL_SIZE,
+        "max_overflow": SQL_POOL_MAX_OVERFLOW,
+        "pool_timeout": SQL_POOL_TIMEOUT,
+        "pool_recycle": SQL_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
@@ -31,6 +31,10 @@ class Config:
     CODE_INTERVAL = 1  # 验证码的最短发送间隔
     CODE_VALID_TIME = 5  # 验证码的有效时间
 
+    PROXY_TRUSTED_HOPS = int(
+        os.getenv("PROXY_TRUSTED_HOPS", "1")
+    )  # 生产环境部署于一层反向代理之后
+
     EMAIL_SMTP_PORT = 587  # 邮件服务器端口号
     EMAIL_SUBJECT = "点创办公自动化系统"  # 邮件主题
     EMAIL_TEXT = "邮箱验证码有效期{1}分钟，您的验证码是：{2}"  # 邮件正文
@@ -0,0 +1,50 @@
+"""add hot path indexes
+
+Revision ID: 3f9a1c2d7b64
+Revises: 
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2d7b64'
+down_revision = None  # 仓库中的第一个迁移，此前的迁移均为各环境在本地生成
+branch_labels = None
+depends_on = None
+
+# (索引名, 表名, 列)
+INDEXES = [
+    ('ix_daily_reports_user_id_created_at', 'daily_reports', ['user_id', 'created_at']),
+    (
+        'ix_period_tasks_assignee_id_end_time_start_time',
+        'period_tasks',
+        ['assignee_id', 'end_time', 'start_time'],
+    ),
+    ('ix_verifications_type_value_code', 'verifications', ['type', 'value', 'code']),
+]
+
+
+def _existing_indexes():
+    """返回已存在的表及其索引名，新建的库中表尚未创建时跳过"""
+    inspector = sa.inspect(op.get_bind())
+    return {
+        table: {index['name'] for index in inspector.get_indexes(table)}
+        for table in inspector.get_table_names()
+    }
+
+
+def upgrade():
+    existing = _existing_indexes()
+    for name, table, columns in INDEXES:
+        if table in existing and name not in existing[table]:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    existing = _existing_indexes()
+    for name, table, _ in INDEXES:
+        if name in existing.get(table, set()):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,40 @@
+"""add llm record cached flag
+
+Revision ID: 8c2e4b7a9d13
+Revises: 3f9a1c2d7b64
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2e4b7a9d13'
+down_revision = '3f9a1c2d7b64'
+branch_labels = None
+depends_on = None
+
+
+def _llm_record_columns():
+    """返回llm_records表的列名，新建的库中表尚未创建时返回None"""
+    inspector = sa.inspect(op.get_bind())
+    if 'llm_records' not in inspector.get_table_names():
+        return None
+    return {column['name'] for column in inspector.get_columns('llm_records')}
+
+
+def upgrade():
+    columns = _llm_record_columns()
+    if columns is not None and 'cached' not in columns:
+        with op.batch_alter_table('llm_records') as batch_op:
+            batch_op.add_column(
+                sa.Column('cached', sa.Boolean(), nullable=False, server_default='0')
+            )
+
+
+def downgrade():
+    columns = _llm_record_columns()
+    if columns is not None and 'cached' in columns:
+        with op.batch_alter_table('llm_records') as batch_op:
+            batch_op.drop_column('cached')
@@ -0,0 +1,180 @@
+"""测试的公共配置
+配置在导入时读取环境变量，因此在导入应用之前将数据库与各SQLite文件指向临时目录。
+带有benchmark标记的测试为基准测试，其结果在测试结束后输出于终端摘要，可用-m "not benchmark"跳过。
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import timeit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator
+
+_TMP = tempfile.mkdtemp(prefix="dcoa-tests-")
+os.chdir(_TMP)  # 运行时生成的文件写入临时目录
+os.environ.update(
+    {
+        "DATABASE_URL": f"sqlite:///{os.path.join(_TMP, 'test.db')}",
+        "SECRET_KEY": "test-secret-key-of-thirty-two-bytes",
+        "JWT_SECRET_KEY": "test-secret-key-of-thirty-two-bytes",
+        "OPENAI_API_KEY": "test",
+        "LOG_DIR": os.path.join(_TMP, "logs"),
+        "VERIFICATION_STORE_PATH": os.path.join(_TMP, "verification_codes.db"),
+        "IDENTITY_STORE_PATH": os.path.join(_TMP, "identity_versions.db"),
+        "CRUD_CACHE_STORE_PATH": os.path.join(_TMP, "crud_cache.db"),
+        "LLM_CACHE_PATH": os.path.join(_TMP, "llm_cache.db"),
+        "RATE_LIMIT_STORE_PATH": os.path.join(_TMP, "rate_limits.db"),
+    }
+)
+
+import pytest  # noqa: E402
+from flask import Flask  # noqa: E402
+
+import app.models  # noqa: E402,F401
+from app.modules import llm  # noqa: E402
+from app.modules.jwt import jwt  # noqa: E402
+from app.modules.sql import db  # noqa: E402
+from app.utils.database import CRUD  # noqa: E402
+from app.views import register_blueprints  # noqa: E402
+from config import Config  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app() -> Flask:
+    """不执行迁移与定时任务的app，表由create_all创建"""
+    app = Flask(__name__, static_folder=None)
+    app.config.from_object(Config)
+    jwt.init_app(app)
+    db.init_app(app)
+    register_blueprints(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def app_context(app: Flask):
+    """在应用上下文中运行测试，结束后清空所有表与查询缓存"""
+    with app.app_context():
+        yield app
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        db.session.remove()
+    CRUD.invalidate_cache()
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """本地的OpenAI兼容服务，每个请求等待latency秒后回复，记录收到的请求与同时处理的最大请求数
+    faults中的故障依次用于之后的请求，如{"status": 429, "headers": {"retry-after-ms": "10"}}、{"latency": 1}
+    """
+
+    latency = 0.0
+    reply = "ok"
+    faults: list[dict] = []
+    requests: list[dict] = []
+    running = peak = 0
+    _lock = threading.Lock()
+
+    def do_POST(self) -> None:
+        cls = type(self)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with cls._lock:
+            cls.requests.append(body)
+            cls.running += 1
+            cls.peak = max(cls.peak, cls.running)
+            fault = cls.faults.pop(0) if cls.faults else {}
+        time.sleep(fault.get("latency", cls.latency))
+        with cls._lock:
+            cls.running -= 1
+        if status := fault.get("status"):
+            error = {"message": "injected", "type": "server_error", "code": None}
+            return self._send(status, {"error": error}, fault.get("headers"))
+        self._send(
+            200,
+            {
+                "id": f"chatcmpl-{len(cls.requests)}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": cls.reply},
+                        "finish_reason": "stop",
+                    }
+                ],
+            },
+        )
+
+    def _send(self, status: int, body: dict, headers: dict | None = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 64  # 默认的5在并发连接较多时会使连接等待重传
+
+
+@pytest.fixture
+def openai_server(monkeypatch: pytest.MonkeyPatch) -> Iterator[type[FakeOpenAI]]:
+    """启动本地的OpenAI兼容服务，并将Config.OPENAI_BASE_URL与同步客户端指向它"""
+    server = _Server(("127.0.0.1", 0), FakeOpenAI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FakeOpenAI.latency, FakeOpenAI.reply, FakeOpenAI.faults = 0.0, "ok", []
+    FakeOpenAI.requests, FakeOpenAI.running, FakeOpenAI.peak = [], 0, 0
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    monkeypatch.setattr(Config, "OPENAI_BASE_URL", base_url)
+    monkeypatch.setattr(llm, "client", llm.client.with_options(base_url=base_url))
+    yield FakeOpenAI
+    server.shutdown()
+    server.server_close()
+
+
+_benchmarks: list[str] = []
+
+
+class Bench:
+    """基准测试的计时与结果记录"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    @staticmethod
+    def per_call(
+        fn: Callable[[], object], number: int = 1000, repeat: int = 5
+    ) -> float:
+        """多次执行fn，返回最快一轮中每次调用的秒数"""
+        return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+    def report(self, result: str) -> None:
+        """记录一行结果"""
+        _benchmarks.append(f"{self.name}: {result}")
+
+
+@pytest.fixture
+def bench(request: pytest.FixtureRequest) -> Bench:
+    return Bench(request.node.name)
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line("markers", "benchmark: 基准测试，结果输出于终端摘要")
+
+
+def pytest_terminal_summary(terminalreporter) -> None:
+    if _benchmarks:
+        terminalreporter.section("benchmarks")
+        for line in _benchmarks:
+            terminalreporter.write_line(line)
@@ -0,0 +1,69 @@
+import asyncio
+
+from app.models.department import Department
+from app.modules.sql import db
+from app.utils.async_database import AsyncCRUD, dispose_async_engine
+
+
+def _run(coro) -> None:
+    async def main() -> None:
+        try:
+            await coro
+        finally:
+            await dispose_async_engine()
+
+    asyncio.run(main())
+
+
+def _names() -> list[str]:
+    db.session.expire_all()
+    return [d.name for d in db.session.query(Department).order_by(Department.id)]
+
+
+def test_add_query_update_delete(app_context) -> None:
+    async def scenario() -> None:
+        async with AsyncCRUD(Department, name="a") as d:
+            await d.add()
+        async with AsyncCRUD(Department) as d:
+            await d.update(await d.query_once(name="a"), name="b")
+        assert (await AsyncCRUD(Department, name="b").query_once()) is not None
+        assert await AsyncCRUD(Department).query_key() is not None
+        async with AsyncCRUD(Department, name="b") as d:
+            assert await d.delete()
+        missing = AsyncCRUD(Department, name="b")
+        assert await missing.query_once() is None
+        assert missing.status == missing.NOT_FOUND
+
+    _run(scenario())
+    assert _names() == []
+
+
+def test_error_rolls_back_without_commit(app_context) -> None:
+    async def scenario() -> None:
+        async with AsyncCRUD(Department, name="a") as d:
+            await d.add()
+            d.error = RuntimeError("failed after add")
+        assert d.session is None and not d._need_commit
+
+    _run(scenario())
+    assert _names() == []
+
+
+def test_do_not_update_discards_changes(app_context) -> None:
+    async def scenario() -> None:
+        async with AsyncCRUD(Department, name="a") as d:
+            await d.add()
+            d.do_not_update()
+
+    _run(scenario())
+    assert _names() == []
+
+
+def test_exit_without_session(app_context) -> None:
+    async def scenario() -> None:
+        crud = AsyncCRUD(Department)
+        crud._need_commit = True
+        await crud.__aexit__(None, None, None)
+        assert crud.session is None and not crud._need_commit
+
+    _run(scenario())
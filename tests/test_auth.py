@@ -0,0 +1,169 @@
+from typing import Any
+
+import sys
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token, verify_jwt_in_request
+from flask_jwt_extended.exceptions import NoAuthorizationError
+
+from app.models.member import Member, Role
+from app.modules import tracing
+from app.modules.sql import db
+from app.modules.sql_monitor import begin_scope, end_scope
+from app.utils.auth import (
+    identity_claims,
+    identity_version,
+    require_role,
+    resolve_identity,
+)
+from app.utils.database import CRUD
+from app.utils.logger import Log
+from app.utils.response import Response
+from config import Config
+
+USER_ID = "2024000001"
+
+
+@pytest.fixture
+def member(app_context) -> Member:
+    member = Member(
+        id=USER_ID, name="Kimu", major="软件工程", role=Role.member, learning="Python"
+    )
+    db.session.add(member)
+    db.session.commit()
+    return member
+
+
+def test_claims_resolve_without_database(member: Member) -> None:
+    claims = identity_claims(member)
+    token = begin_scope("test")
+    assert resolve_identity(USER_ID, claims) == ("member", USER_ID)
+    assert end_scope(token).count == 0
+
+
+def test_deleted_member_claims_are_revoked(member: Member) -> None:
+    claims = identity_claims(member)
+    db.session.delete(member)
+    db.session.commit()
+    assert resolve_identity(USER_ID, claims) is None
+
+
+def test_committed_role_change_invalidates_claims(member: Member) -> None:
+    claims = identity_claims(member)
+    with CRUD(Member, id=USER_ID) as m:
+        m.update(role=Role.admin)
+    assert identity_version(USER_ID) != claims["identity_version"]
+    assert resolve_identity(USER_ID, claims) == ("admin", USER_ID)
+
+
+def test_rollback_and_other_columns_keep_version(member: Member) -> None:
+    version = identity_version(USER_ID)
+    member.role = Role.leader
+    db.session.flush()
+    db.session.rollback()
+    with CRUD(Member, id=USER_ID) as m:
+        m.update(name="Kimura")
+    assert identity_version(USER_ID) == version
+
+
+def test_bulk_update_invalidates_changed_users(member: Member) -> None:
+    version = identity_version(USER_ID)
+    with CRUD(Member) as m:
+        m.bulk_update([{"id": USER_ID, "role": Role.subleader}])
+    assert identity_version(USER_ID) != version
+
+
+@require_role("admin", "member")
+def _view(role, user_id) -> dict:
+    return {"role": role, "user_id": user_id}
+
+
+@require_role("admin")
+def _admin_view() -> dict:
+    return {}
+
+
+@Log.track_execution(when_error=Response(Response.r.ERR_INTERNAL))
+def _failing() -> None:
+    raise RuntimeError("boom")
+
+
+@Log.track_execution()
+def _caller_frame() -> str:
+    return sys._getframe(1).f_back.f_code.co_name
+
+
+def _headers(app: Flask, user_id: str, claims: dict) -> dict[str, str]:
+    with app.test_request_context():
+        token = create_access_token(identity=user_id, additional_claims=claims)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _call(app: Flask, view, user_id: str, claims: dict) -> Any:
+    with app.test_request_context(headers=_headers(app, user_id, claims)):
+        result = view()
+        return result if isinstance(result, dict) else result.get_json()
+
+
+def test_require_role_injects_identity(app: Flask, member: Member) -> None:
+    body = _call(app, _view, USER_ID, identity_claims(member))
+    assert body == {"role": "member", "user_id": USER_ID}
+
+
+def test_require_role_rejects_other_roles(app: Flask, member: Member) -> None:
+    body = _call(app, _admin_view, USER_ID, identity_claims(member))
+    assert body["status"] == Response.r.AUTH_FAILED
+
+    body = _call(app, _view, "missing", {})
+    assert body["status"] == Response.r.ERR_NOT_FOUND
+
+
+def test_track_execution_returns_error_response(app: Flask) -> None:
+    with app.test_request_context():
+        assert _failing().get_json()["status"] == Response.r.ERR_INTERNAL
+
+
+def test_require_role_leaves_missing_token_to_jwt_handlers(app: Flask) -> None:
+    with app.test_request_context(), pytest.raises(NoAuthorizationError):
+        _view()
+
+
+def test_track_execution_is_a_single_wrapper(
+    app: Flask, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    spans = []
+    monkeypatch.setattr(tracing.exporter, "export", spans.append)
+    monkeypatch.setattr(Config, "TRACE_EXPORTER", "file")
+    with app.test_request_context():
+        assert _caller_frame() == sys._getframe().f_code.co_name
+        token = tracing.start_trace("test", "00-" + "1" * 32 + "-" + "2" * 16 + "-01")
+        assert _caller_frame() == sys._getframe().f_code.co_name
+        tracing.end_trace(token)
+    assert [s.name for s in spans] == [_caller_frame.__qualname__, "test"]
+    assert spans[0].parent_id == spans[1].context.span_id
+
+
+@pytest.mark.benchmark
+def test_decorator_overhead_benchmark(app: Flask, member: Member, bench) -> None:
+    """记录每个装饰器为每次调用增加的耗时"""
+
+    def view() -> None:
+        return None
+
+    tracked = Log.track_execution()(view)
+    guarded = require_role("member")(view)
+    headers = _headers(app, USER_ID, identity_claims(member))
+
+    with app.test_request_context(headers=headers):
+        base = bench.per_call(view, 10000)
+        track = bench.per_call(tracked, 10000) - base
+        jwt = bench.per_call(lambda: verify_jwt_in_request() or view(), 200) - base
+        role = bench.per_call(guarded, 200) - base
+
+    bench.report(f"track_execution +{track * 1e6:.2f} us/call")
+    bench.report(
+        f"require_role +{role * 1e6:.2f} us/call, "
+        f"of which JWT verification {jwt * 1e6:.2f} us"
+    )
+    assert track < 1e-4
@@ -0,0 +1,137 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+
+from app.controllers import schedule
+from app.models.daily_report import DailyReport
+from app.models.department import Department
+from app.models.member import Member, Role
+from app.models.period_task import PeriodTask
+from app.modules.sql import db
+from app.utils.database import CRUD
+from app.utils.response import Response
+from config import Config
+
+
+def _names() -> dict[int, str]:
+    return dict(db.session.query(Department.id, Department.name).all())
+
+
+def test_bulk_add_in_chunks_with_defaults(app_context) -> None:
+    with CRUD(Department, parent_id=None) as d:
+        assert d.bulk_add([{"name": f"组{i}"} for i in range(5)], chunk_size=2)
+    assert sorted(_names().values()) == [f"组{i}" for i in range(5)]
+
+
+def test_bulk_update_by_primary_key(app_context) -> None:
+    with CRUD(Department) as d:
+        d.bulk_add([{"id": i, "name": "old"} for i in range(1, 4)])
+        assert d.bulk_update([{"id": 1, "name": "a"}, {"id": 3, "name": "c"}])
+    assert _names() == {1: "a", 2: "old", 3: "c"}
+
+
+def test_failed_chunk_keeps_committed_chunks(app_context) -> None:
+    with CRUD(Department) as d:
+        rows = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}, {"id": 1, "name": "c"}]
+        assert not d.bulk_add(rows, chunk_size=2)
+        assert d.status == d.SQL_ERR
+    assert _names() == {1: "a", 2: "b"}
+
+
+def test_deferred_commit_writes_models_together(app_context) -> None:
+    with CRUD(Department) as d, CRUD(Member) as m:
+        assert d.bulk_add([{"id": 1, "name": "a"}], commit=False)
+        assert not m.bulk_add([{"id": "1", "name": None}], commit=False)
+    assert _names() == {}
+
+    with CRUD(Department) as d, CRUD(Member) as m:
+        assert d.bulk_add([{"id": 1, "name": "a"}], commit=False)
+        assert m.bulk_add(
+            [{"id": "1", "name": "", "major": "", "role": Role.member, "learning": ""}],
+            commit=False,
+        )
+    assert _names() == {1: "a"} and db.session.get(Member, "1")
+
+
+def test_daily_generation_rolls_back_failed_chunks(
+    app_context, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(Config, "ITER_CHUNK_SIZE", 1)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for task_id in ("a", "b"):
+        db.session.add(
+            PeriodTask(
+                task_id=task_id,
+                assigner_id="1",
+                assignee_id=task_id,
+                start_time=now - timedelta(days=1),
+                end_time=now + timedelta(days=1),
+                basic_task_requirements="",
+                detail_task_requirements="",
+            )
+        )
+    db.session.commit()
+
+    def summaries(items: list[tuple], handler) -> list[dict]:
+        # 任务b缺少次日任务，写入日报时违反非空约束
+        return [
+            {"completion_status": "done", "next_task": "next" if i[0] == "a" else None}
+            for i in items
+        ]
+
+    monkeypatch.setattr(schedule, "fan_out", summaries)
+    assert schedule.daily_generation().status_obj == Response.r.ERR_SQL
+
+    db.session.expire_all()
+    descriptions = dict(
+        db.session.query(PeriodTask.task_id, PeriodTask.completed_task_description)
+    )
+    assert descriptions == {"a": "done", "b": None}
+    assert [r.user_id for r in db.session.query(DailyReport)] == ["a"]
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("backend", ["sqlite", "mysql"])
+def test_commits_per_second_benchmark(backend: str, tmp_path, bench) -> None:
+    """比较逐行提交与分块批量写入的每秒提交数与每秒行数"""
+    if backend == "sqlite":
+        url = f"sqlite:///{tmp_path / 'bench.db'}"
+    elif not (url := os.getenv("BENCH_MYSQL_URL")):
+        pytest.skip("设置BENCH_MYSQL_URL以测试MySQL，如mysql+mysqldb://user:pw@host/db")
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    db.init_app(app)
+
+    rows, chunk_size = 1000, 200
+    with app.app_context():
+        Department.__table__.create(db.engine, checkfirst=True)
+        try:
+            start = time.perf_counter()
+            for i in range(rows):
+                with CRUD(Department, name=f"组{i}") as d:
+                    d.add()
+            single = time.perf_counter() - start
+            db.session.execute(Department.__table__.delete())
+            db.session.commit()
+
+            start = time.perf_counter()
+            with CRUD(Department) as d:
+                d.bulk_add([{"name": f"组{i}"} for i in range(rows)], chunk_size)
+            bulk = time.perf_counter() - start
+        finally:
+            db.session.remove()
+            Department.__table__.drop(db.engine)
+            db.engine.dispose()
+
+    bench.report(
+        f"{backend} per-row commit: {rows} commits, {rows / single:.0f} commits/s"
+    )
+    bench.report(
+        f"{backend} bulk_add chunk={chunk_size}: {rows // chunk_size} commits, "
+        f"{rows / bulk:.0f} rows/s"
+    )
+    assert bulk < single
@@ -0,0 +1,56 @@
+import pytest
+
+from app.utils.code_store import CodeStore, MemoryCodeStore, SQLiteCodeStore
+from config import Config
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request: pytest.FixtureRequest, tmp_path) -> CodeStore:
+    if request.param == "memory":
+        return MemoryCodeStore()
+    return SQLiteCodeStore(str(tmp_path / "codes.db"))
+
+
+def test_code_store_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        CodeStore()
+
+
+def test_issue_respects_interval(store: CodeStore) -> None:
+    code = store.issue("phone", "13800000000")
+    assert code and code.isdigit() and len(code) == 6
+    assert store.issue("phone", "13800000000") is None
+    assert store.issue("email", "13800000000")  # 不同的联系方式互不影响
+
+
+def test_verify_consumes_code(store: CodeStore) -> None:
+    code = store.issue("email", "a@b.c")
+    assert not store.verify("email", "a@b.c", "")
+    assert not store.verify("email", "a@b.c", "x")
+    assert store.verify("email", "a@b.c", code)
+    assert not store.verify("email", "a@b.c", code)
+    # 验证后可以立即重新发送
+    assert store.issue("email", "a@b.c")
+
+
+def test_discard_allows_resend(store: CodeStore) -> None:
+    code = store.issue("phone", "13800000000")
+    store.discard("phone", "13800000000", code)
+    assert not store.verify("phone", "13800000000", code)
+    assert store.issue("phone", "13800000000")
+
+
+def test_expired_code_is_rejected(
+    store: CodeStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    code = store.issue("email", "a@b.c")
+    monkeypatch.setattr(Config, "CODE_VALID_TIME", -1)
+    assert not store.verify("email", "a@b.c", code)
+
+
+def test_sqlite_store_is_shared(tmp_path) -> None:
+    path = str(tmp_path / "codes.db")
+    code = SQLiteCodeStore(path).issue("email", "a@b.c")
+    other = SQLiteCodeStore(path)
+    assert other.issue("email", "a@b.c") is None
+    assert other.verify("email", "a@b.c", code)
@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import text
+
+from app.models.department import Department
+from app.modules.sql import db
+from app.modules.sql_monitor import begin_scope, end_scope
+from app.utils.database import CRUD, ModelGenerations
+from config import Config
+
+
+@pytest.fixture
+def department(app_context) -> Department:
+    department = Department(id=1, name="a")
+    db.session.add(department)
+    db.session.commit()
+    CRUD.invalidate_cache()
+    return department
+
+
+def _lookup() -> tuple[Department | None, int]:
+    """查询部门1，返回结果与执行的语句数"""
+    token = begin_scope("test")
+    result = CRUD(Department, id=1).query_once()
+    return result, end_scope(token).count
+
+
+def test_hit_skips_the_database(department: Department) -> None:
+    before = CRUD.cache_stats()
+    assert _lookup()[1] == 1
+    result, count = _lookup()
+    assert count == 0 and result.name == "a"
+    stats = CRUD.cache_stats()
+    assert (stats["hits"] - before["hits"], stats["misses"] - before["misses"]) == (
+        1,
+        1,
+    )
+
+
+def test_lookups_in_context_are_not_cached(department: Department) -> None:
+    _lookup()
+    token = begin_scope("test")
+    with CRUD(Department, id=1) as d:
+        d.query_once()
+    assert end_scope(token).count == 1
+
+
+def test_expired_entries_are_missed(
+    department: Department, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(CRUD._lookup_cache, "ttl", -1)
+    _lookup()
+    assert _lookup()[1] == 1
+
+
+def test_commit_invalidates(department: Department) -> None:
+    _lookup()
+    with CRUD(Department, id=1) as d:
+        d.update(name="b")
+    result, count = _lookup()
+    assert count == 1 and result.name == "b"
+
+
+def test_rollback_keeps_cache(department: Department) -> None:
+    _lookup()
+    with CRUD(Department, id=1) as d:
+        d.update(name="b")
+        d.do_not_update()
+    assert _lookup() == (department, 0)
+
+
+def test_commit_in_another_process_invalidates(department: Department) -> None:
+    _lookup()
+    # 模拟另一工作进程：绕过本进程的会话更新数据库，再增加共享文件中的代数
+    with db.engine.begin() as connection:
+        connection.execute(text("UPDATE departments SET name = 'b'"))
+    assert _lookup() == (department, 0)
+    ModelGenerations(Config.CRUD_CACHE_STORE_PATH).bump({"Department"})
+    db.session.expire_all()  # 新的请求使用新的会话
+    result, count = _lookup()
+    assert count == 1 and result.name == "b"
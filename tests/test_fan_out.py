@@ -0,0 +1,104 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.controllers import report as report_controller
+from app.models.daily_report import DailyReport
+from app.models.member import Member, Role
+from app.models.period_task import PeriodTask
+from app.models.llm_record import LLMRecord
+from app.modules.llm import acreate_completion, fan_out
+from app.modules.sql import db
+
+
+def test_fan_out_limits_concurrency_and_keeps_order() -> None:
+    running = peak = 0
+
+    async def handler(async_client, item: int) -> int:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if item == 3:
+            raise ValueError(item)
+        return item * 2
+
+    results = fan_out(range(6), handler, limit=2)
+    assert peak == 2
+    assert results[:3] == [0, 2, 4] and results[4:] == [8, 10]
+    assert isinstance(results[3], ValueError)
+
+
+def test_wall_time_scales_with_concurrency(app_context, openai_server, bench) -> None:
+    """对本地的OpenAI兼容服务发送请求，并发数增加时总耗时相应减少"""
+    openai_server.latency = 0.1
+    count = 8
+
+    async def complete(async_client, item: int) -> str:
+        return await acreate_completion(
+            async_client, f"任务{item}", "1", "task", use_cache=False
+        )
+
+    walls = {}
+    for limit in (1, 2, 4, 8):
+        openai_server.peak = 0
+        start = time.perf_counter()
+        assert fan_out(range(count), complete, limit=limit) == ["ok"] * count
+        walls[limit] = time.perf_counter() - start
+        assert openai_server.peak == limit
+    bench.report(
+        ", ".join(f"limit={limit} {wall:.2f} s" for limit, wall in walls.items())
+    )
+
+    assert walls[1] >= count * openai_server.latency
+    assert walls[4] < walls[2] < walls[1]
+    assert walls[8] < walls[1] / 3
+    assert db.session.query(LLMRecord).count() == 4 * count  # 每个回复在完成时写回
+
+
+@pytest.fixture
+def reports(app_context) -> dict[str, str]:
+    now = datetime.now()
+    for user_id in ("1", "2"):
+        db.session.add(
+            Member(id=user_id, name=user_id, major="", role=Role.member, learning="")
+        )
+    db.session.add(
+        PeriodTask(
+            assigner_id="1",
+            assignee_id="1",
+            start_time=now - timedelta(days=1),
+            end_time=now + timedelta(days=1),
+            basic_task_requirements="",
+            detail_task_requirements="",
+        )
+    )
+    ids = {}
+    for user_id in ("1", "2"):  # 成员2没有任务，评价会失败
+        report = DailyReport(
+            user_id=user_id, daily_task="", report_text="", generating=True
+        )
+        db.session.add(report)
+        db.session.flush()
+        ids[user_id] = report.report_id
+    db.session.commit()
+    return ids
+
+
+def test_reviews_clear_generating_on_failure(
+    reports: dict[str, str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    async def review(*args, **kwargs) -> dict:
+        return {key: {"score": 5} for key in ("basic", "excess", "extra")}
+
+    monkeypatch.setattr(report_controller, "acreate_completion", review)
+    report_controller.generate_report_reviews([(i, []) for i in reports.values()])
+
+    db.session.expire_all()
+    reviewed = db.session.get(DailyReport, reports["1"])
+    failed = db.session.get(DailyReport, reports["2"])
+    assert (reviewed.generating, reviewed.basic_score) == (False, 5)
+    assert (failed.generating, failed.basic_score) == (False, None)
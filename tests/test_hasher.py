@@ -0,0 +1,133 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+import pytest
+from flask import Flask
+
+from app.controllers.auth import login
+from app.models import member as member_module
+from app.models.member import Member, Role
+from app.modules import hasher
+from app.modules.sql import db
+from app.utils.response import Response
+from config import Config
+
+USER_ID = "2024000001"
+PASSWORD = "correct horse"
+
+
+@pytest.fixture
+def pool(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """使用两个子进程的哈希进程池"""
+    monkeypatch.setattr(Config, "BCRYPT_WORKERS", 2)
+    monkeypatch.setattr(hasher, "_executor", None)
+    yield
+    hasher._executor.shutdown()
+
+
+@pytest.fixture
+def in_thread(monkeypatch: pytest.MonkeyPatch) -> None:
+    """在调用线程中计算哈希，cost为4"""
+    monkeypatch.setattr(Config, "BCRYPT_WORKERS", 0)
+    monkeypatch.setattr(Config, "BCRYPT_LOG_ROUNDS", 4)
+
+
+def _add_member(rounds: int) -> Member:
+    member = Member(id=USER_ID, name="Kimu", major="", role=Role.member, learning="")
+    member.password = hasher._generate(PASSWORD, rounds)
+    db.session.add(member)
+    db.session.commit()
+    return member
+
+
+def _login(app: Flask) -> str:
+    with app.test_request_context():
+        return login(username=USER_ID, password=PASSWORD).status_obj
+
+
+def _stored_hash() -> str:
+    db.session.expire_all()
+    return db.session.get(Member, USER_ID).password
+
+
+def test_needs_rehash_compares_cost(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(Config, "BCRYPT_LOG_ROUNDS", 5)
+    assert not hasher.needs_rehash(hasher._generate(PASSWORD, 5))
+    assert hasher.needs_rehash(hasher._generate(PASSWORD, 4))
+    assert hasher.needs_rehash("plain")
+    assert not Member(password=None).password_needs_rehash()
+
+
+def test_pool_hashes_in_worker_processes(pool: None) -> None:
+    pw_hash = hasher.generate_password_hash(PASSWORD)
+    assert not hasher.needs_rehash(pw_hash)
+    assert hasher.check_password_hash(pw_hash, PASSWORD)
+    assert not hasher.check_password_hash(pw_hash, "wrong")
+
+
+def test_full_queue_times_out(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(Config, "BCRYPT_WORKERS", 1)
+    monkeypatch.setattr(Config, "BCRYPT_QUEUE_TIMEOUT", 0.01)
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(hasher, "_slots", slots)
+    with pytest.raises(TimeoutError):
+        hasher.check_password_hash("hash", PASSWORD)
+
+
+def test_login_rehashes_with_configured_cost(
+    app: Flask, app_context, in_thread: None
+) -> None:
+    _add_member(5)
+    assert _login(app) == Response.r.OK
+    assert not hasher.needs_rehash(_stored_hash())
+
+
+def test_login_skips_rehash_when_hasher_is_busy(
+    app: Flask, app_context, in_thread: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    old_hash = _add_member(5).password
+
+    def busy(password: str) -> str:
+        raise TimeoutError("Password hashing queue is full.")
+
+    monkeypatch.setattr(member_module, "generate_password_hash", busy)
+    assert _login(app) == Response.r.OK
+    assert _stored_hash() == old_hash
+
+
+@pytest.mark.benchmark
+def test_login_benchmark(
+    app: Flask, app_context, pool: None, monkeypatch: pytest.MonkeyPatch, bench
+) -> None:
+    """以不同的cost并发登录，记录吞吐量与延迟"""
+    concurrency, logins = 4, 16
+    p50s = []
+    for rounds in (4, 6, 8):
+        monkeypatch.setattr(Config, "BCRYPT_LOG_ROUNDS", rounds)
+        _add_member(rounds)
+        _login(app)  # 预热进程池
+
+        def timed(_: int) -> float:
+            with app.app_context():
+                start = time.perf_counter()
+                assert _login(app) == Response.r.OK
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            latencies = sorted(executor.map(timed, range(logins)))
+        elapsed = time.perf_counter() - start
+
+        p50s.append(statistics.median(latencies))
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        bench.report(
+            f"cost={rounds} {logins / elapsed:.1f} logins/s, "
+            f"p50 {p50s[-1] * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms"
+        )
+        db.session.delete(db.session.get(Member, USER_ID))
+        db.session.commit()
+    assert p50s[0] < p50s[-1]
@@ -0,0 +1,160 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterator
+
+import pytest
+from alembic.config import Config as AlembicConfig
+from alembic.script import ScriptDirectory
+from flask import Flask
+from sqlalchemy import Engine, create_engine, text
+
+from app.models import _single_head
+from app.models.daily_report import DailyReport
+from app.models.department import Department
+from app.models.member import Member, Role
+from app.models.period_task import PeriodTask
+from app.models.verification import Verification, VerifyType
+from app.modules.sql import db
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+
+# (索引名, 应使用该索引的查询)
+HOT_LOOKUPS = [
+    (
+        "ix_daily_reports_user_id_created_at",
+        "SELECT * FROM daily_reports WHERE user_id = '1' "
+        "AND created_at >= '2024-01-01'",
+    ),
+    (
+        "ix_period_tasks_assignee_id_end_time_start_time",
+        "SELECT * FROM period_tasks WHERE assignee_id = '1' "
+        "AND end_time >= '2024-01-01' AND start_time <= '2024-01-02'",
+    ),
+    (
+        "ix_verifications_type_value_code",
+        "SELECT * FROM verifications WHERE type = 'email' "
+        "AND value = 'a@b.c' AND code = '123456'",
+    ),
+]
+
+
+@pytest.mark.parametrize("index, statement", HOT_LOOKUPS)
+def test_hot_lookups_use_index(app_context, index: str, statement: str) -> None:
+    plan = db.session.execute(text(f"EXPLAIN QUERY PLAN {statement}")).all()
+    assert any(f"USING INDEX {index}" in row[-1] for row in plan)
+
+
+@pytest.fixture(scope="module")
+def mysql_engine() -> Iterator[Engine]:
+    """BENCH_MYSQL_URL指向的MySQL库，创建相关的表并写入足够的行，使优化器按代价选择访问方式"""
+    if not (url := os.getenv("BENCH_MYSQL_URL")):
+        pytest.skip("设置BENCH_MYSQL_URL以测试MySQL，如mysql+mysqldb://user:pw@host/db")
+    engine = create_engine(url)
+    tables = [
+        model.__table__
+        for model in (Department, Member, DailyReport, PeriodTask, Verification)
+    ]
+    db.metadata.create_all(engine, tables=tables)
+    start = datetime(2024, 1, 1)
+    users = [str(i) for i in range(50)]
+    try:
+        with engine.begin() as connection:
+            connection.execute(
+                Member.__table__.insert(),
+                [
+                    {
+                        "id": u,
+                        "name": u,
+                        "major": "",
+                        "role": Role.member,
+                        "learning": "",
+                    }
+                    for u in users
+                ],
+            )
+            connection.execute(
+                DailyReport.__table__.insert(),
+                [
+                    {
+                        "report_id": str(uuid.uuid4()),
+                        "user_id": users[i % 50],
+                        "daily_task": "",
+                        "created_at": start + timedelta(hours=i),
+                    }
+                    for i in range(2000)
+                ],
+            )
+            connection.execute(
+                PeriodTask.__table__.insert(),
+                [
+                    {
+                        "task_id": str(uuid.uuid4()),
+                        "assigner_id": "0",
+                        "assignee_id": users[i % 50],
+                        "start_time": start + timedelta(days=i // 50),
+                        "end_time": start + timedelta(days=i // 50 + 7),
+                        "basic_task_requirements": "",
+                        "detail_task_requirements": "",
+                    }
+                    for i in range(2000)
+                ],
+            )
+            connection.execute(
+                Verification.__table__.insert(),
+                [
+                    {
+                        "request_id": str(uuid.uuid4()),
+                        "type": VerifyType.email if i % 2 else VerifyType.phone,
+                        "value": f"user{i}@example.com",
+                        "code": f"{i:06d}",
+                    }
+                    for i in range(2000)
+                ],
+            )
+            for table in tables:
+                connection.execute(text(f"ANALYZE TABLE {table.name}"))
+        yield engine
+    finally:
+        db.metadata.drop_all(engine, tables=tables)
+        engine.dispose()
+
+
+@pytest.mark.parametrize("index, statement", HOT_LOOKUPS)
+def test_hot_lookups_use_index_on_mysql(
+    mysql_engine: Engine, index: str, statement: str
+) -> None:
+    with mysql_engine.connect() as connection:
+        plan = connection.execute(text(f"EXPLAIN {statement}")).mappings().all()
+    assert plan[0]["key"] == index
+    assert plan[0]["type"] != "ALL"  # 不是全表扫描
+
+
+def test_shipped_migrations_have_single_head() -> None:
+    # 本地生成的迁移以已发布迁移的head为基础，已发布的迁移本身必须只有一个head
+    assert len(ScriptDirectory(str(MIGRATIONS)).get_heads()) == 1
+
+
+def _migrate_app(script_location: Path) -> SimpleNamespace:
+    config = AlembicConfig()
+    config.set_main_option("script_location", str(script_location))
+    migrate = SimpleNamespace(get_config=lambda: config)
+    return SimpleNamespace(extensions={"migrate": SimpleNamespace(migrate=migrate)})
+
+
+def test_multiple_heads_are_reported_not_merged(app: Flask, tmp_path: Path) -> None:
+    versions = tmp_path / "versions"
+    versions.mkdir()
+    for name in ("aaa", "bbb"):  # 两个各自为根的迁移
+        (versions / f"{name}_init.py").write_text(
+            f"revision = {name!r}\ndown_revision = None\n"
+        )
+    with app.app_context():
+        assert _single_head(_migrate_app(MIGRATIONS))
+        assert not _single_head(_migrate_app(tmp_path))
+    assert sorted(p.name for p in versions.glob("*.py")) == [
+        "aaa_init.py",
+        "bbb_init.py",
+    ]
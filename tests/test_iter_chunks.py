@@ -0,0 +1,93 @@
+import json
+from typing import Iterator
+
+import pytest
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from app.models.department import Department
+from app.modules.sql import db
+from app.utils.database import CRUD
+from app.utils.response import Response
+from config import Config
+
+
+@pytest.fixture
+def departments(app_context) -> list[str]:
+    # 名称有重复，按名称分页时需以主键区分
+    names = ["c", "a", "b", "a", "c", "b", "a"]
+    db.session.add_all(Department(name=name) for name in names)
+    db.session.commit()
+    return names
+
+
+def test_chunks_cover_all_rows_in_primary_key_order(departments: list[str]) -> None:
+    chunks = list(CRUD(Department).iter_chunks(size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    ids = [d.id for chunk in chunks for d in chunk]
+    assert ids == sorted(ids) and len(set(ids)) == len(departments)
+
+
+def test_chunks_by_non_unique_column(departments: list[str]) -> None:
+    crud = CRUD(Department)
+    rows = [
+        (d.name, d.id)
+        for chunk in crud.iter_chunks(order_by=Department.name, size=2)
+        for d in chunk
+    ]
+    assert rows == sorted(rows)
+    assert len(rows) == len(departments)
+
+
+def test_chunks_apply_filters(departments: list[str]) -> None:
+    chunks = list(CRUD(Department, name="a").iter_chunks(size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+
+
+def test_chunks_record_errors(app_context) -> None:
+    crud = CRUD(Department)
+    assert list(crud.iter_chunks(nope=1)) == []
+    assert crud.status == crud.SQL_ERR and crud.error is not None
+
+
+def _items(count: int, error: Exception | None = None) -> Iterator[dict]:
+    for index in range(count):
+        yield {"index": index}
+    if error:
+        raise error
+
+
+def _body(app: Flask, data: Iterator) -> dict:
+    with app.test_request_context():
+        response = Response(Response.r.OK, data=data).response()
+        return json.loads(b"".join(response.response))
+
+
+@pytest.fixture
+def small_chunks(app: Flask, monkeypatch: pytest.MonkeyPatch) -> Flask:
+    monkeypatch.setattr(Config, "ITER_CHUNK_SIZE", 2)
+    return app
+
+
+def test_stream_serializes_all_items(small_chunks: Flask) -> None:
+    body = _body(small_chunks, _items(5))
+    assert body["status"] == Response.r.OK
+    assert body["data"] == [{"index": i} for i in range(5)]
+    assert _body(small_chunks, _items(0))["data"] == []
+
+
+def test_error_in_first_chunk_keeps_error_status(small_chunks: Flask) -> None:
+    error = OperationalError("SELECT", {}, Exception("database is locked"))
+    body = _body(small_chunks, _items(1, error))
+    assert body["status"] == Response.r.ERR_SQL
+    assert body["data"] is None
+
+    body = _body(small_chunks, _items(1, ValueError("bad row")))
+    assert body["status"] == Response.r.ERR_INTERNAL
+
+
+def test_late_error_ends_stream_with_marker(small_chunks: Flask) -> None:
+    body = _body(small_chunks, _items(3, ValueError("bad row")))
+    assert body["status"] == Response.r.OK
+    assert body["data"] == [{"index": i} for i in range(3)]
+    assert body["error"] == {"status": Response.r.ERR_INTERNAL, "msg": "bad row"}
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+from app.modules import llm
+from app.modules.llm import CompletionCache
+from config import Config
+
+
+class Review(BaseModel):
+    score: int
+
+
+@pytest.fixture
+def cache(tmp_path) -> CompletionCache:
+    return CompletionCache(str(tmp_path / "llm_cache.db"))
+
+
+def test_key_depends_on_request_content() -> None:
+    key = CompletionCache.key("gpt-4o", "text", [b"image"], {"temperature": 0})
+    assert key == CompletionCache.key("gpt-4o", "text", [b"image"], {"temperature": 0})
+    for other in (
+        ("gpt-4", "text", [b"image"], {"temperature": 0}),
+        ("gpt-4o", "text!", [b"image"], {"temperature": 0}),
+        ("gpt-4o", "text", [b"other"], {"temperature": 0}),
+        ("gpt-4o", "text", [b"image"], {"temperature": 1}),
+    ):
+        assert CompletionCache.key(*other) != key
+
+
+def test_key_uses_response_format_schema() -> None:
+    key = CompletionCache.key("gpt-4o", "text", [], {"response_format": Review})
+    schema = {"response_format": Review.model_json_schema()}
+    assert key == CompletionCache.key("gpt-4o", "text", [], schema)
+
+
+def test_get_and_set(cache: CompletionCache) -> None:
+    assert cache.get("a") is None
+    cache.set("a", "reply")
+    cache.set("b", {"score": 1})
+    assert cache.get("a") == "reply"
+    assert cache.get("b") == {"score": 1}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"]) == (2, 1, 2)
+    assert stats["entries"] == 2 and stats["hit_rate"] == round(2 / 3, 4)
+
+
+def test_expired_replies_are_missed_and_evicted(
+    cache: CompletionCache, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache.set("a", "reply")
+    monkeypatch.setattr(Config, "LLM_CACHE_TTL", -1)
+    assert cache.get("a") is None
+    cache.set("b", "reply")
+    assert cache.stats()["evictions"] == 2  # a与刚写入的b均已过期
+
+
+def test_least_recently_used_is_evicted(
+    cache: CompletionCache, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(Config, "LLM_CACHE_SIZE", 2)
+    now = [1000.0]
+    monkeypatch.setattr(llm, "time", SimpleNamespace(time=lambda: now[0]))
+    for key in ("a", "b"):
+        now[0] += 1
+        cache.set(key, key)
+    now[0] += 1
+    cache.get("a")  # a最近被使用
+    now[0] += 1
+    cache.set("c", "c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" and cache.get("c") == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_is_shared_between_instances(tmp_path) -> None:
+    path = str(tmp_path / "llm_cache.db")
+    CompletionCache(path).set("a", "reply")
+    assert CompletionCache(path).get("a") == "reply"
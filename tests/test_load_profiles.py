@@ -0,0 +1,60 @@
+import pytest
+
+from app.models.department import Department
+from app.models.member import Member, Role
+from app.modules.sql import db
+from app.modules.sql_monitor import begin_scope, end_scope
+from app.utils.database import CRUD
+
+
+@pytest.fixture
+def member(app_context) -> str:
+    parent = Department(name="研发中心")
+    db.session.add(parent)
+    db.session.flush()
+    department = Department(name="后端组", parent_id=parent.id)
+    db.session.add(department)
+    db.session.flush()
+    db.session.add(
+        Member(
+            id="2024000001",
+            name="Kimu",
+            major="软件工程",
+            role=Role.member,
+            learning="Python",
+            department_id=department.id,
+        )
+    )
+    db.session.commit()
+    db.session.expunge_all()
+    return "2024000001"
+
+
+def _count_queries(fn) -> tuple[int, object]:
+    token = begin_scope("test")
+    try:
+        result = fn()
+    finally:
+        stats = end_scope(token)
+    return stats.count, result
+
+
+def test_profile_loads_relations_in_one_query(member: str) -> None:
+    def load() -> dict:
+        with CRUD(Member, id=member) as q:
+            return q.with_profile("profile").query_once().to_dict()
+
+    count, data = _count_queries(load)
+    assert count == 1
+    assert data["department"] == "后端组"
+    assert data["parent_department"] == "研发中心"
+
+
+def test_without_profile_relations_load_lazily(member: str) -> None:
+    def load() -> dict:
+        with CRUD(Member, id=member) as q:
+            return q.query_once().to_dict()
+
+    count, data = _count_queries(load)
+    assert count == 3
+    assert data["parent_department"] == "研发中心"
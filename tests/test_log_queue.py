@@ -0,0 +1,72 @@
+import gzip
+import logging
+import queue
+import re
+import time
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from app.modules.logger import DroppingQueueHandler, _rotating_handler
+from config import Config
+
+
+@pytest.fixture
+def logger() -> Iterator[logging.Logger]:
+    logger = logging.getLogger("tests.log_queue")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    yield logger
+    logger.handlers.clear()
+
+
+def test_full_queue_drops_and_counts(logger: logging.Logger) -> None:
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(1)
+    handler = DroppingQueueHandler(log_queue)
+    logger.addHandler(handler)
+    for i in range(3):
+        logger.info("message %d", i)  # 队列已满时立即返回
+    assert handler.dropped == 2
+    assert log_queue.get_nowait().getMessage() == "message 0"
+
+
+def test_only_mutable_args_are_formatted_early(logger: logging.Logger) -> None:
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue()
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    items = ["a"]
+    logger.info("%s in %.1f seconds", "task", 1.5)
+    logger.info("items %s", items)
+    items.append("b")  # 入队后的修改不影响日志内容
+
+    lazy, formatted = log_queue.get_nowait(), log_queue.get_nowait()
+    assert (lazy.msg, lazy.args) == ("%s in %.1f seconds", ("task", 1.5))
+    assert (formatted.msg, formatted.args) == ("items ['a']", None)
+
+
+def _line_number(line: str) -> int:
+    return int(re.search(r"line (\d+)", line).group(1))
+
+
+def test_rotated_file_is_compressed(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(Config, "LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(Config, "LOG_GZIP_ROTATED", True)
+    handler = _rotating_handler("app.log")
+    handler.maxBytes = 200
+    for i in range(10):
+        handler.emit(logging.makeLogRecord({"msg": f"line {i:02d} " + "x" * 20}))
+    handler.close()
+
+    log_dir = tmp_path / "logs"
+    rotated = log_dir / "app.log.1.gz"
+    deadline = time.monotonic() + 5
+    while not rotated.exists() or list(log_dir.glob("*.tmp")):
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+    # 连续轮转时保留最近一次轮转的文件
+    archived = gzip.decompress(rotated.read_bytes()).decode().splitlines()
+    current = (log_dir / "app.log").read_text(encoding="utf8").splitlines()
+    assert _line_number(archived[-1]) + 1 == _line_number(current[0])
+    assert sorted(p.name for p in log_dir.iterdir()) == ["app.log", "app.log.1.gz"]
@@ -0,0 +1,120 @@
+import inspect
+import logging
+from typing import Iterator
+
+import pytest
+from flask import Flask
+
+from app.utils.logger import Log
+from config import Config
+
+
+@pytest.fixture
+def logger(app: Flask, caplog: pytest.LogCaptureFixture) -> Iterator[logging.Logger]:
+    with app.app_context(), caplog.at_level(logging.INFO, logger=app.logger.name):
+        yield app.logger
+
+
+@pytest.fixture
+def format_calls(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """记录_format_trace的调用"""
+    calls = []
+    format_trace = Log._format_trace
+
+    def counting(err_info: str, frames: list) -> str:
+        calls.append(err_info)
+        return format_trace(err_info, frames)
+
+    monkeypatch.setattr(Log, "_format_trace", staticmethod(counting))
+    return calls
+
+
+def _nested(depth: int, message: str) -> None:
+    if depth:
+        return _nested(depth - 1, message)
+    Log.error(message)  # 回溯的第一帧
+
+
+def test_message_is_formatted_only_when_emitted(
+    logger: logging.Logger, caplog: pytest.LogCaptureFixture, format_calls: list[str]
+) -> None:
+    logger.setLevel(logging.CRITICAL)
+    Log.error("ignored")
+    Log.info("ignored", detail_info=True)
+    assert format_calls == []
+
+    logger.setLevel(logging.INFO)
+    Log.info("detail", detail_info=True)
+    assert caplog.messages[-1].startswith("回溯消息：detail\n")
+    assert format_calls == ["detail"]
+
+
+def test_trace_starts_at_the_caller(
+    logger: logging.Logger, caplog: pytest.LogCaptureFixture
+) -> None:
+    _nested(0, "boom")
+    lines = caplog.messages[-1].splitlines()
+    assert lines[0] == "回溯消息：boom"
+    assert lines[1].startswith(f"函数 _nested 在 {__file__}")
+    assert "执行 Log.error(message)  # 回溯的第一帧 时" in lines[1]
+    assert lines[2].startswith("函数追踪：")
+
+
+@pytest.mark.parametrize("depth", [1, 3])
+def test_trace_depth_is_capped(
+    logger: logging.Logger,
+    caplog: pytest.LogCaptureFixture,
+    monkeypatch: pytest.MonkeyPatch,
+    depth: int,
+) -> None:
+    monkeypatch.setattr(Config, "LOG_TRACE_DEPTH", depth)
+    _nested(10, "boom")
+    assert caplog.messages[-1].count("函数 _nested 在") == depth
+
+
+def test_exception_uses_its_traceback(
+    logger: logging.Logger, caplog: pytest.LogCaptureFixture
+) -> None:
+    try:
+        raise ValueError("bad value")
+    except ValueError as e:
+        Log.error(e)
+    assert caplog.messages[-1].startswith("错误类型：ValueError\n错误消息：bad value\n")
+
+
+def _stack_trace_info(err_info: str) -> str:
+    """优化前的实现：通过inspect.stack()获取调用栈并读取每一帧的源码"""
+    stack = inspect.stack()
+    info = f"回溯消息：{err_info}\n"
+    for index, frame in enumerate(stack):
+        if index < 2:
+            continue
+        code = ""
+        if frame.code_context:
+            code = f"执行 {frame.code_context[-1].strip()} 时"
+        if index == 2:
+            info += f"函数 {frame.function} 在 {frame.filename} {frame.lineno} 行的 {code} 出现错误\n函数追踪："
+        elif index < 6:
+            info += f"\n函数 {frame.function} 在 {frame.filename} {frame.lineno} 行调用"
+    return info
+
+
+@pytest.mark.benchmark
+def test_trace_info_benchmark(bench) -> None:
+    """比较每次日志调用获取调用栈的耗时"""
+
+    def old() -> str:
+        return _stack_trace_info("boom")
+
+    def new() -> str:
+        return str(Log._trace_info("boom"))
+
+    old_cost = bench.per_call(old, number=200)
+    new_cost = bench.per_call(new, number=2000)
+    skipped_cost = bench.per_call(lambda: Log._trace_info("boom"), number=2000)
+    bench.report(
+        f"inspect.stack {old_cost * 1e6:.1f} us, "
+        f"sys._getframe {new_cost * 1e6:.1f} us, "
+        f"not emitted {skipped_cost * 1e6:.1f} us"
+    )
+    assert new_cost < old_cost
@@ -0,0 +1,105 @@
+import socket
+import time
+from email import message_from_string
+from typing import Callable, Iterator
+
+import pytest
+
+from app.modules.mailer import Mailer
+from config import Config
+
+controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class Handler:
+    """本地SMTP服务的处理器，记录连接数与收到的邮件
+    reject_data次DATA以451临时错误拒绝，refused中的收件人以550拒绝
+    """
+
+    def __init__(self) -> None:
+        self.connections = 0
+        self.messages: list[tuple[list[str], str]] = []
+        self.reject_data = 0
+        self.refused: set[str] = set()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refused:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.reject_data:
+            self.reject_data -= 1
+            return "451 Try again later"
+        self.messages.append((envelope.rcpt_tos, envelope.content.decode()))
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def smtp(monkeypatch: pytest.MonkeyPatch) -> Iterator[Handler]:
+    handler = Handler()
+    with socket.socket() as sock:  # 取得空闲端口
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = controller.Controller(handler, hostname="127.0.0.1", port=port)
+    server.start()
+    monkeypatch.setattr(Config, "EMAIL_SMTP", "127.0.0.1")
+    monkeypatch.setattr(Config, "EMAIL_SMTP_PORT", port)
+    monkeypatch.setattr(Config, "EMAIL_STARTTLS", False)
+    monkeypatch.setattr(Config, "EMAIL_ACCOUNT", "oa@example.com")
+    monkeypatch.setattr(Config, "EMAIL_PASSWORD", None)
+    monkeypatch.setattr(Config, "EMAIL_WORKERS", 1)
+    monkeypatch.setattr(Config, "EMAIL_RETRY_BACKOFF", 0.01)
+    yield handler
+    server.stop()
+
+
+def _wait_for(condition: Callable[[], bool], timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_mails_are_delivered_over_one_connection(smtp: Handler) -> None:
+    mailer = Mailer()
+    for i in range(5):
+        assert mailer.send(f"user{i}@example.com", "主题", f"验证码{i}")
+    _wait_for(lambda: len(smtp.messages) == 5)
+    assert mailer.send("late@example.com", "主题", "验证码")
+    _wait_for(lambda: len(smtp.messages) == 6)
+
+    assert smtp.connections == 1  # 之后的邮件复用连接池中已登录的连接
+    rcpt, content = smtp.messages[0]
+    assert rcpt == ["user0@example.com"]
+    assert message_from_string(content)["To"] == "user0@example.com"
+    assert mailer.stats()["sent"] == 6
+    mailer.pool.close()
+
+
+def test_temporary_failure_is_retried(smtp: Handler) -> None:
+    smtp.reject_data = 1
+    mailer = Mailer()
+    mailer.send("user@example.com", "主题", "验证码")
+    _wait_for(lambda: len(smtp.messages) == 1)
+    stats = mailer.stats()
+    assert (stats["retried"], stats["sent"], stats["failed"]) == (1, 1, 0)
+    assert smtp.connections == 1  # 服务器响应的错误不会断开连接
+    mailer.pool.close()
+
+
+def test_refused_recipient_is_not_retried(smtp: Handler) -> None:
+    smtp.refused.add("nobody@example.com")
+    mailer = Mailer()
+    mailer.send("nobody@example.com", "主题", "验证码")
+    mailer.send("user@example.com", "主题", "验证码")
+    _wait_for(lambda: mailer.stats()["sent"] + mailer.stats()["failed"] == 2)
+    stats = mailer.stats()
+    assert (stats["retried"], stats["sent"], stats["failed"]) == (0, 1, 1)
+    mailer.pool.close()
@@ -0,0 +1,93 @@
+import threading
+
+from app.modules.metrics import (
+    BUCKETS,
+    Histogram,
+    get_histogram,
+    render_counter,
+    render_gauges,
+    render_histograms,
+)
+
+
+def test_render_gauges_types_counters() -> None:
+    values = {
+        "size": 3,
+        "hits": 10,
+        "checkout_count": 7,
+        "hit_rate": 0.5,
+        "state": "closed",
+        "enabled": True,
+    }
+    lines = list(
+        render_gauges("cache", values, "Cache state.", ("hits", "checkout_count"))
+    )
+    assert lines == [
+        "# HELP dcoa_cache_size Cache state.",
+        "# TYPE dcoa_cache_size gauge",
+        "dcoa_cache_size 3",
+        "# HELP dcoa_cache_hits_total Cache state.",
+        "# TYPE dcoa_cache_hits_total counter",
+        "dcoa_cache_hits_total 10",
+        "# HELP dcoa_cache_checkout_total Cache state.",
+        "# TYPE dcoa_cache_checkout_total counter",
+        "dcoa_cache_checkout_total 7",
+        "# HELP dcoa_cache_hit_rate Cache state.",
+        "# TYPE dcoa_cache_hit_rate gauge",
+        "dcoa_cache_hit_rate 0.5",
+    ]
+
+
+def test_render_counter_escapes_labels() -> None:
+    lines = list(
+        render_counter(
+            "rate_limit_rejected",
+            "Rejected requests.",
+            [({"endpoint": 'lo"gin', "dimension": "ip"}, 2)],
+        )
+    )
+    assert lines == [
+        "# HELP dcoa_rate_limit_rejected_total Rejected requests.",
+        "# TYPE dcoa_rate_limit_rejected_total counter",
+        'dcoa_rate_limit_rejected_total{endpoint="lo\\"gin",dimension="ip"} 2',
+    ]
+
+
+def test_histogram_merges_thread_shards() -> None:
+    histogram = Histogram("test")
+
+    def observe() -> None:
+        for _ in range(100):
+            histogram.observe(0.001)
+        histogram.observe(100, error=True)
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    histogram.observe(0.001)  # 合并已结束线程的分片
+
+    counts, total, errors = histogram.snapshot()
+    assert sum(counts) == 405 and errors == 4
+    assert counts[0] == 401 and counts[-1] == 4
+    assert abs(total - (401 * 0.001 + 400)) < 1e-6
+    assert histogram.stats()["p50"] <= BUCKETS[0]
+
+
+def test_quantile_interpolates_within_bucket() -> None:
+    counts = [0] * len(BUCKETS)
+    counts[1] = 10  # (0.005, 0.01]
+    assert Histogram.quantile(counts, 0.5) == BUCKETS[0] + (BUCKETS[1] - BUCKETS[0]) / 2
+    assert Histogram.quantile([0] * len(BUCKETS), 0.99) == 0.0
+
+
+def test_render_histograms_is_cumulative() -> None:
+    histogram = get_histogram("tests.render")
+    histogram.observe(0.001)
+    histogram.observe(0.02)
+    lines = [line for line in render_histograms() if 'function="tests.render"' in line]
+    buckets = [line for line in lines if "_bucket" in line]
+    assert buckets[0].endswith(" 1") and buckets[-1].endswith(" 2")
+    assert 'dcoa_function_duration_seconds_count{function="tests.render"} 2' in lines
+    assert 'dcoa_function_errors_total{function="tests.render"} 0' in lines
@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Iterator
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+from app.modules.sql import StatQueuePool, db
+
+
+@pytest.fixture
+def engine(tmp_path, request: pytest.FixtureRequest) -> Iterator[Engine]:
+    """只有一个连接且不允许溢出的连接池，等待超时可由参数指定"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=StatQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=getattr(request, "param", 0.05),
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_checkout_without_waiting(engine: Engine) -> None:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        stats = engine.pool.stats()
+        assert (stats["checked_out"], stats["checkout_count"]) == (1, 1)
+    with engine.connect():
+        pass
+    stats = engine.pool.stats()
+    assert stats["checked_out"] == 0 and stats["checkout_count"] == 2
+    assert stats["wait_count"] == 0 and stats["wait_time"] == 0
+
+
+@pytest.mark.parametrize("engine", [5], indirect=True)
+def test_exhausted_pool_records_waits(engine: Engine) -> None:
+    held = engine.connect()
+
+    def release() -> None:
+        time.sleep(0.1)
+        held.close()
+
+    threading.Thread(target=release).start()
+    with engine.connect():  # 等待另一线程归还连接
+        pass
+    stats = engine.pool.stats()
+    assert stats["checkout_count"] == 2 and stats["wait_count"] == 1
+    assert 0.09 <= stats["wait_time"] == stats["max_wait_time"] < 5
+
+
+def test_timed_out_checkout_is_counted(engine: Engine) -> None:
+    with engine.connect():
+        with pytest.raises(Exception, match="QueuePool limit"):
+            engine.connect()
+    stats = engine.pool.stats()
+    assert stats["wait_count"] == 1 and stats["wait_time"] >= 0.05
+
+
+def test_metrics_expose_pool_stats(app: Flask) -> None:
+    with app.app_context():
+        assert isinstance(db.engine.pool, StatQueuePool)
+    body = app.test_client().get("/metrics").get_data(as_text=True)
+    lines = body.splitlines()
+    assert "# TYPE dcoa_db_pool_checkout_total counter" in lines
+    assert "# TYPE dcoa_db_pool_wait_total counter" in lines
+    assert any(line.startswith("dcoa_db_pool_checked_out ") for line in lines)
+    assert any(line.startswith("dcoa_db_pool_wait_time_total ") for line in lines)
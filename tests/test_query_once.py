@@ -0,0 +1,61 @@
+from typing import Iterator
+
+import pytest
+from sqlalchemy import event
+
+from app.models.department import Department
+from app.modules.sql import db
+from app.utils.database import CRUD
+from config import Config
+
+
+@pytest.fixture
+def statements(app_context, monkeypatch: pytest.MonkeyPatch) -> Iterator[list[str]]:
+    """记录执行的语句，不经过查询缓存"""
+    monkeypatch.setattr(Config, "CRUD_CACHE_ENABLED", False)
+    db.session.add_all([Department(id=1, name="a"), Department(id=2, name="a")])
+    db.session.commit()
+    executed: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        executed.append(statement)
+
+    event.listen(db.engine, "after_cursor_execute", record)
+    yield executed
+    event.remove(db.engine, "after_cursor_execute", record)
+
+
+def test_query_key_costs_two_round_trips(statements: list[str]) -> None:
+    assert CRUD(Department, id=1).query_key().first().name == "a"
+    assert len(statements) == 2
+
+
+def test_query_once_costs_one_round_trip(statements: list[str]) -> None:
+    saved = CRUD.saved_round_trips()
+    assert CRUD(Department, id=1).query_once().name == "a"
+    assert len(CRUD(Department, name="a").query_once(mode="all")) == 2
+    assert CRUD(Department, name="a").query_once(mode="scalar") == 1
+    assert len(statements) == 3
+    assert CRUD.saved_round_trips() - saved == 3
+
+
+def test_query_once_records_not_found(statements: list[str]) -> None:
+    crud = CRUD(Department, id=3)
+    assert crud.query_once() is None and crud.status == crud.NOT_FOUND
+    assert crud.query_once(mode="all") == []
+    assert len(statements) == 2
+
+
+def test_update_and_delete_query_once(statements: list[str]) -> None:
+    with CRUD(Department, id=1) as d:
+        d.update(name="b")
+    with CRUD(Department, id=2) as d:
+        d.delete()
+    # 删除时加载关联的语句除外，每次操作仅查找一次条目
+    lookups = [
+        s
+        for s in statements
+        if s.startswith("SELECT") and "WHERE departments.id = ?" in s
+    ]
+    assert len(lookups) == 2
+    assert dict(db.session.query(Department.id, Department.name)) == {1: "b"}
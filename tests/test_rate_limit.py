@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from app.utils import rate_limit
+from app.utils.rate_limit import (
+    MemoryRateLimiter,
+    RateLimiter,
+    SQLiteRateLimiter,
+    _estimate,
+    check_rate_limit,
+)
+from config import Config
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """可调整的时间，起点位于60秒窗口的开始"""
+    now = [960_000.0]
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def limiter(request: pytest.FixtureRequest, tmp_path) -> RateLimiter:
+    if request.param == "memory":
+        return MemoryRateLimiter(stripes=4)
+    return SQLiteRateLimiter(str(tmp_path / "limits.db"))
+
+
+def test_rate_limiter_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        RateLimiter()
+
+
+def test_estimate_weights_previous_window() -> None:
+    # 进入新窗口一半时，上一窗口的计数按一半计入
+    assert _estimate(150.0, 100.0, 0.0, 10, 0) == (100.0, 0, 10, 5.0)
+    # 相隔超过一个窗口时不再计入
+    assert _estimate(250.0, 100.0, 0.0, 10, 0) == (200.0, 0, 0, 0.0)
+
+
+def test_limit_per_key(limiter: RateLimiter, clock: list[float]) -> None:
+    assert [limiter.hit("a", 3, 60) for _ in range(4)] == [True, True, True, False]
+    assert limiter.hit("b", 3, 60)
+
+
+def test_rejected_hits_are_not_counted(
+    limiter: RateLimiter, clock: list[float]
+) -> None:
+    for _ in range(5):
+        limiter.hit("a", 2, 60)
+    # 下一窗口过半时，上一窗口只计入了允许的2次
+    clock[0] += 90
+    assert limiter.hit("a", 2, 60)
+    assert not limiter.hit("a", 2, 60)
+
+
+def test_window_slides(limiter: RateLimiter, clock: list[float]) -> None:
+    for _ in range(2):
+        assert limiter.hit("a", 2, 60)
+    clock[0] += 60
+    assert not limiter.hit("a", 2, 60)
+    clock[0] += 59
+    assert limiter.hit("a", 2, 60)
+
+
+def test_check_rate_limit_by_dimension(
+    app: Flask, monkeypatch: pytest.MonkeyPatch, clock: list[float]
+) -> None:
+    monkeypatch.setattr(rate_limit, "_limiter", MemoryRateLimiter())
+    monkeypatch.setitem(
+        Config.RATE_LIMITS, "test", {"ip": (3, 60), "username": (1, 60)}
+    )
+
+    def check(ip: str, username: str) -> str | None:
+        with app.test_request_context(
+            json={"username": username}, environ_base={"REMOTE_ADDR": ip}
+        ):
+            return check_rate_limit("test")
+
+    assert check("1.1.1.1", "a") is None
+    assert check("1.1.1.1", "a") == "username"
+    assert check("1.1.1.1", "b") is None
+    assert check("1.1.1.1", "c") == "ip"
+    assert check("2.2.2.2", "c") is None
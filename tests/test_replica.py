@@ -0,0 +1,86 @@
+import time
+from typing import Iterator
+
+import pytest
+from flask import Flask
+
+from app.models.department import Department
+from app.modules.sql import db
+from app.utils.database import CRUD, init_replica_routing
+from config import Config
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Flask]:
+    """以两个SQLite文件分别作为主库与只读副本的app，两者中的部门1名称不同"""
+    monkeypatch.setattr(Config, "CRUD_CACHE_ENABLED", False)
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'primary.db'}"
+    app.config["SQLALCHEMY_BINDS"] = {"replica": f"sqlite:///{tmp_path / 'replica.db'}"}
+    db.init_app(app)
+    init_replica_routing(app)
+
+    @app.post("/write")
+    def write() -> dict:
+        with CRUD(Department, id=1) as d:
+            d.update(name="written")
+        return {"name": CRUD(Department, id=1).query_once().name}
+
+    @app.get("/read")
+    def read() -> dict:
+        return {"name": CRUD(Department, id=1).query_once().name}
+
+    with app.app_context():
+        for bind, name in ((None, "primary"), ("replica", "replica")):
+            engine = db.engines[bind]
+            db.metadata.create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(
+                    Department.__table__.insert().values(id=1, name=name)
+                )
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _name(app: Flask, **kwargs) -> str:
+    with app.app_context():
+        return CRUD(Department, id=1).query_once(**kwargs).name
+
+
+def test_reads_outside_context_use_replica(app: Flask) -> None:
+    assert _name(app) == "replica"
+    with app.app_context(), CRUD(Department, id=1) as d:
+        assert d.query_once().name == "primary"
+
+
+def test_read_your_writes_across_requests(app: Flask) -> None:
+    client = app.test_client()
+    assert client.get("/read").json["name"] == "replica"
+
+    response = client.post("/write")
+    assert response.json["name"] == "written"  # 同一请求中的读取
+    assert CRUD.STICKY_COOKIE in response.headers["Set-Cookie"]
+    # cookie由客户端携带，由任一工作进程处理的请求均读取主库
+    assert client.get("/read").json["name"] == "written"
+
+    assert app.test_client().get("/read").json["name"] == "replica"
+
+
+def test_expired_cookie_reads_replica(app: Flask) -> None:
+    client = app.test_client()
+    client.set_cookie(CRUD.STICKY_COOKIE, f"{time.time() - 1:.3f}")
+    assert client.get("/read").json["name"] == "replica"
+    client.set_cookie(CRUD.STICKY_COOKIE, "invalid")
+    assert client.get("/read").json["name"] == "replica"
+
+
+def test_writes_outside_requests_stick_to_their_context(app: Flask) -> None:
+    with app.app_context():
+        with CRUD(Department) as d:
+            d.bulk_update([{"id": 1, "name": "written"}])
+        chunks = list(CRUD(Department).iter_chunks())
+        assert [d.name for chunk in chunks for d in chunk] == ["written"]
+    assert _name(app) == "replica"  # 其他任务不受影响
@@ -0,0 +1,124 @@
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from flask import Flask, jsonify
+
+from app.utils import response
+from app.utils.constant import ResponseConstant as R
+from app.utils.response import JSON_ENCODERS, Response, _fixed_body
+from config import Config
+
+orjson = pytest.importorskip("orjson")
+
+
+def _body(app: Flask, *args, **kwargs) -> dict:
+    with app.app_context():
+        return json.loads(Response(*args, **kwargs).g_response().get_data())
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"b": 1, "a": [1, 2.5, None, True], "s": "中文"},
+        {"naive": datetime(2024, 1, 2, 3, 4, 5), "day": date(2024, 1, 2)},
+        {"aware": datetime(2024, 1, 2, tzinfo=timezone.utc)},
+        {1: "int", 2.5: "float"},
+        {"uuid": uuid.UUID(int=1), "decimal": Decimal("1.5")},
+    ],
+)
+def test_encoders_agree(app: Flask, data: dict) -> None:
+    # 两者的空白与键的顺序不同，解析后的内容一致
+    with app.app_context():
+        flask_body, orjson_body = (
+            json.loads(JSON_ENCODERS[name](data)) for name in ("flask", "orjson")
+        )
+    assert flask_body == orjson_body
+
+
+@pytest.mark.parametrize("encoder", ["flask", "orjson"])
+def test_encoder_is_selected_by_config(
+    app: Flask, encoder: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(Config, "RESPONSE_JSON_ENCODER", encoder)
+    with app.app_context():
+        body = response.json_dumps({"a": 1})
+    assert body == (b'{"a": 1}' if encoder == "flask" else b'{"a":1}')
+
+
+def test_fixed_body_is_reused(app: Flask) -> None:
+    _body(app, Response.r.AUTH_FAILED)
+    before = _fixed_body.cache_info().hits
+    assert _body(app, Response.r.AUTH_FAILED) == {
+        "msg": R.Message.AUTH_FAILED,
+        "status": R.Object.AUTH_FAILED,
+        "data": None,
+    }
+    assert _fixed_body.cache_info().hits == before + 1
+    # 带数据或错误的响应不使用缓存
+    assert _body(app, Response.r.OK, data=[1])["data"] == [1]
+    assert _body(app, Response.r.ERR_SQL, message=ValueError("boom"))["msg"] == "boom"
+    assert _fixed_body.cache_info().hits == before + 1
+
+
+def test_unknown_status_falls_back_to_internal_error(app: Flask) -> None:
+    body = _body(app, "NOT.A.STATUS")
+    assert (body["status"], body["msg"]) == (
+        R.Object.ERR_INTERNAL,
+        R.Message.ERR_INTERNAL,
+    )
+    assert Response()._get_attributes("NOT.A.STATUS") == (
+        R.Object.ERR_INTERNAL,
+        R.Code.ERR_INTERNAL,
+        R.Message.ERR_INTERNAL,
+    )
+
+
+def _linear_response(status_obj: str, data) -> bytes:
+    """优化前的实现：逐项遍历状态对象查找状态，再经jsonify序列化"""
+    for key, value in R.Object.__dict__.items():
+        if value == status_obj:
+            message = getattr(R.Message, key)
+            break
+    return jsonify({"msg": message, "status": status_obj, "data": data}).get_data()
+
+
+@pytest.mark.benchmark
+def test_response_cost_benchmark(
+    app: Flask, monkeypatch: pytest.MonkeyPatch, bench
+) -> None:
+    """比较不同大小的数据下每个响应的耗时"""
+    now = datetime(2024, 1, 2, 3, 4, 5)
+    payloads = {
+        "fixed": None,
+        "small": {"id": "2024000001", "name": "Kimu", "created_at": now},
+        "large": [
+            {"id": i, "title": f"任务{i}", "done": i % 2 == 0, "deadline": now}
+            for i in range(2000)
+        ],
+    }
+    with app.app_context():
+        for size, data in payloads.items():
+            number = 20 if size == "large" else 2000
+            baseline = bench.per_call(
+                lambda: _linear_response(R.Object.OK, data), number=number
+            )
+            results = []
+            for encoder in ("flask", "orjson"):
+                monkeypatch.setattr(Config, "RESPONSE_JSON_ENCODER", encoder)
+                results.append(
+                    bench.per_call(
+                        lambda: Response(Response.r.OK, data=data)
+                        .g_response()
+                        .get_data(),
+                        number=number,
+                    )
+                )
+            bench.report(
+                f"{size}: linear+jsonify {baseline * 1e6:.1f} us, "
+                f"flask {results[0] * 1e6:.1f} us, orjson {results[1] * 1e6:.1f} us"
+            )
+            if size == "large":
+                assert results[1] < results[0]
@@ -0,0 +1,246 @@
+import asyncio
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.llm_record import LLMRecord
+from app.modules import llm, retry
+from app.modules.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, retry_after
+from app.modules.sql import db
+from config import Config
+
+
+class ServiceError(Exception):
+    """带有响应头的服务错误"""
+
+    def __init__(self, headers: dict | None = None) -> None:
+        super().__init__("service error")
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class Flaky:
+    """前failures次调用抛出错误，之后返回ok"""
+
+    def __init__(self, failures: int, error: Exception | None = None) -> None:
+        self.failures = failures
+        self.error = error or ServiceError()
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return "ok"
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(Config, "LLM_MAX_RETRY_TIMES", 2)
+    monkeypatch.setattr(Config, "LLM_RETRY_BASE", 0)
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    now = [100.0]
+    monkeypatch.setattr(
+        retry, "time", SimpleNamespace(monotonic=lambda: now[0], sleep=lambda _: None)
+    )
+    return now
+
+
+def test_retries_until_success() -> None:
+    policy = RetryPolicy((ServiceError,), "test")
+    fn = Flaky(2)
+    assert policy.call(fn) == "ok" and fn.calls == 3
+    assert policy.stats() == {"calls": 1, "retries": 2, "failures": 0}
+
+
+def test_gives_up_after_max_retries() -> None:
+    policy = RetryPolicy((ServiceError,), "test")
+    fn = Flaky(5)
+    with pytest.raises(ServiceError):
+        policy.call(fn)
+    assert fn.calls == 3
+    assert policy.stats()["failures"] == 1
+
+
+def test_other_errors_are_not_retried() -> None:
+    policy = RetryPolicy((ServiceError,), "test")
+    fn = Flaky(1, KeyError("bad request"))
+    with pytest.raises(KeyError):
+        policy.call(fn)
+    assert fn.calls == 1
+
+
+def test_delay_follows_retry_after(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(Config, "LLM_RETRY_BASE", 1)
+    monkeypatch.setattr(Config, "LLM_RETRY_MAX_DELAY", 20)
+    policy = RetryPolicy((ServiceError,), "test")
+    assert policy.delay(0, ServiceError({"retry-after-ms": "1500"})) == 1.5
+    assert policy.delay(0, ServiceError({"retry-after": "3"})) == 3
+    assert policy.delay(0, ServiceError({"retry-after": "60"})) is None  # 超过上限
+    assert 0 <= policy.delay(1, ServiceError()) <= 2
+    assert policy.delay(2, ServiceError()) is None
+
+
+def test_retry_after_http_date() -> None:
+    error = ServiceError({"retry-after": formatdate(usegmt=True)})
+    assert -2 < retry_after(error) <= 0
+    assert retry_after(ServiceError({"retry-after": "soon"})) is None
+    assert retry_after(ValueError()) is None
+
+
+def test_breaker_opens_and_recovers(clock: list[float]) -> None:
+    breaker = CircuitBreaker("test", threshold=2, recovery=10)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock[0] += 10
+    breaker.before_call()  # 半开状态下仅放行一次试探
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.stats() == {
+        "state": "closed",
+        "open": 0,
+        "failures": 0,
+        "trips": 1,
+        "rejected": 2,
+    }
+
+
+def test_failed_probe_reopens(clock: list[float]) -> None:
+    breaker = CircuitBreaker("test", threshold=1, recovery=10)
+    breaker.before_call()
+    breaker.record_failure()
+    clock[0] += 10
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.stats()["trips"] == 2
+
+
+def test_policy_trips_breaker_only_on_service_errors(clock: list[float]) -> None:
+    breaker = CircuitBreaker("test", threshold=2, recovery=10)
+    policy = RetryPolicy((ServiceError, ValueError), "test", breaker, (ServiceError,))
+    with pytest.raises(ValueError):
+        policy.call(Flaky(5, ValueError("unparsable reply")))
+    assert breaker.state == "closed"
+
+    fn = Flaky(5)
+    with pytest.raises(CircuitOpenError):  # 重试中熔断器打开，不再发出第三次调用
+        policy.call(fn)
+    assert breaker.state == "open" and fn.calls == 2
+    assert policy.stats()["breaker_rejected"] == 1
+
+
+def test_acall_retries() -> None:
+    policy = RetryPolicy((ServiceError,), "test")
+    fn = Flaky(1)
+
+    async def call() -> str:
+        return fn()
+
+    assert asyncio.run(policy.acall(call)) == "ok" and fn.calls == 2
+
+
+def test_cancelled_probe_releases_breaker(clock: list[float]) -> None:
+    breaker = CircuitBreaker("test", threshold=1, recovery=10)
+    breaker.before_call()
+    breaker.record_failure()
+    clock[0] += 10
+    policy = RetryPolicy((ServiceError,), "test", breaker)
+
+    async def cancelled() -> None:
+        raise asyncio.CancelledError
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(policy.acall(cancelled))
+    breaker.before_call()  # 试探名额已释放
+    assert breaker.state == "half_open"
+
+
+@pytest.fixture
+def llm_policy(monkeypatch: pytest.MonkeyPatch) -> CircuitBreaker:
+    """为llm模块使用新的重试策略与阈值为3的熔断器"""
+    breaker = CircuitBreaker("openai", threshold=3, recovery=60)
+    policy = RetryPolicy(
+        llm.SERVICE_ERRORS + (llm.EmptyReplyError,),
+        "openai",
+        breaker,
+        trip_on=llm.SERVICE_ERRORS,
+    )
+    monkeypatch.setattr(llm, "breaker", breaker)
+    monkeypatch.setattr(llm, "retry_policy", policy)
+    return breaker
+
+
+def _complete() -> str | dict:
+    return llm.create_completion("总结", "1", "task", use_cache=False, temperature=0.3)
+
+
+def _records() -> list[str]:
+    return [record.received_text for record in db.session.query(LLMRecord)]
+
+
+def test_completion_retries_429_and_500(
+    app_context, openai_server, llm_policy: CircuitBreaker
+) -> None:
+    openai_server.faults = [
+        {"status": 429, "headers": {"retry-after-ms": "100"}},
+        {"status": 500},
+    ]
+    start = time.perf_counter()
+    assert _complete() == "ok"
+    assert time.perf_counter() - start >= 0.1  # 按Retry-After等待
+    assert len(openai_server.requests) == 3
+    first = openai_server.requests[0]
+    assert first["temperature"] == 0.3  # 重试保留所有参数
+    assert all(body == first for body in openai_server.requests)
+    assert _records() == ["ok"]
+    assert llm_policy.state == "closed"
+
+
+def test_timeout_is_retried(
+    app_context, openai_server, llm_policy: CircuitBreaker, monkeypatch
+) -> None:
+    monkeypatch.setattr(llm, "client", llm.client.with_options(timeout=0.2))
+    openai_server.faults = [{"latency": 1}]
+    assert _complete() == "ok"
+    assert len(openai_server.requests) == 2
+
+
+def test_failures_are_recorded_and_trip_the_breaker(
+    app_context, openai_server, llm_policy: CircuitBreaker
+) -> None:
+    openai_server.faults = [{"status": 500}] * 5
+    assert _complete() == ""  # 重试2次后放弃，此时连续失败3次，熔断器打开
+    assert llm_policy.state == "open"
+    assert len(openai_server.requests) == 3
+
+    start = time.perf_counter()
+    assert _complete() == ""
+    assert time.perf_counter() - start < 0.1  # 熔断时立即失败，不发出请求
+    assert len(openai_server.requests) == 3
+    assert _records() == ["", ""]  # 失败的调用以空回复记录
+
+
+def test_async_completion_retries(
+    app_context, openai_server, llm_policy: CircuitBreaker
+) -> None:
+    openai_server.faults = [{"status": 503}]
+
+    async def complete(async_client, item: int) -> str:
+        return await llm.acreate_completion(
+            async_client, "总结", "1", "task", use_cache=False
+        )
+
+    assert llm.fan_out([0], complete) == ["ok"]
+    assert len(openai_server.requests) == 2
+    assert _records() == ["ok"]
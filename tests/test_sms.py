@@ -0,0 +1,132 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+from tencentcloud.common.exception.tencent_cloud_sdk_exception import (
+    TencentCloudSDKException,
+)
+
+from app.modules import sms
+from app.modules.sms import SmsDispatcher, normalize_phone
+from config import Config
+
+
+class FakeSmsEndpoint(BaseHTTPRequestHandler):
+    """本地的短信服务，记录SendSms请求，号码以9结尾时返回超出限制，fail为真时返回错误"""
+
+    requests: list[dict] = []
+    fail = False
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append(body)
+        if type(self).fail:
+            response = {"Error": {"Code": "InternalError", "Message": "down"}}
+        else:
+            response = {
+                "SendStatusSet": [
+                    {
+                        "PhoneNumber": number,
+                        "Code": (
+                            "LimitExceeded.PhoneNumberDailyLimit"
+                            if number.endswith("9")
+                            else "Ok"
+                        ),
+                    }
+                    for number in body["PhoneNumberSet"]
+                ]
+            }
+        data = json.dumps({"Response": {**response, "RequestId": "test"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def endpoint(monkeypatch: pytest.MonkeyPatch) -> Iterator[type[FakeSmsEndpoint]]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSmsEndpoint)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FakeSmsEndpoint.requests = []
+    FakeSmsEndpoint.fail = False
+    monkeypatch.setattr(
+        Config, "SMS_ENDPOINT", f"http://127.0.0.1:{server.server_port}"
+    )
+    monkeypatch.setattr(Config, "TENCENTCLOUD_SECRET_ID", "id")
+    monkeypatch.setattr(Config, "TENCENTCLOUD_SECRET_KEY", "key")
+    monkeypatch.setattr(Config, "SMS_WORKERS", 1)
+    monkeypatch.setattr(Config, "SMS_BATCH_WINDOW", 0.2)
+    monkeypatch.setattr(sms, "_client", None)  # 以本地地址重新创建客户端
+    yield FakeSmsEndpoint
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize(
+    "phone, number",
+    [
+        ("13800000000", "+8613800000000"),
+        ("138 0000-0000", "+8613800000000"),
+        ("+8613800000000", "+8613800000000"),
+        ("008613800000000", "+8613800000000"),
+        ("+1 (555) 0100", "+15550100"),
+    ],
+)
+def test_normalize_phone(phone: str, number: str) -> None:
+    assert normalize_phone(phone) == number
+
+
+def test_concurrent_sends_are_merged(endpoint: type[FakeSmsEndpoint]) -> None:
+    dispatcher = SmsDispatcher()
+    # 后缀相同的号码不会被混淆
+    phones = ["13800000000", "+8513800000009", "0086 138 0000 0009", "13800000001"]
+    params = [["通知"], ["通知"], ["通知"], ["123456"]]
+    with ThreadPoolExecutor(len(phones)) as executor:
+        statuses = list(executor.map(dispatcher.send, phones, params))
+
+    assert statuses == [
+        "Ok",
+        "LimitExceeded.PhoneNumberDailyLimit",
+        "LimitExceeded.PhoneNumberDailyLimit",
+        "Ok",
+    ]
+    # 参数相同的三条短信合并为一次请求
+    sets = sorted(
+        (r["TemplateParamSet"], sorted(r["PhoneNumberSet"])) for r in endpoint.requests
+    )
+    assert sets == [
+        (["123456"], ["+8613800000001"]),
+        (["通知"], ["+8513800000009", "+8613800000000", "+8613800000009"]),
+    ]
+    assert dispatcher.stats() == {
+        "requests": 2,
+        "messages": 4,
+        "errors": 0,
+        "pending": 0,
+    }
+
+
+def test_batches_respect_request_limit(
+    endpoint: type[FakeSmsEndpoint], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(Config, "SMS_BATCH_SIZE", 2)
+    dispatcher = SmsDispatcher()
+    phones = [f"1380000000{i}" for i in range(5)]
+    with ThreadPoolExecutor(len(phones)) as executor:
+        list(executor.map(dispatcher.send, phones, [["通知"]] * len(phones)))
+    assert sorted(len(r["PhoneNumberSet"]) for r in endpoint.requests) == [1, 2, 2]
+
+
+def test_send_failure_is_raised(endpoint: type[FakeSmsEndpoint]) -> None:
+    endpoint.fail = True
+    dispatcher = SmsDispatcher()
+    with pytest.raises(TencentCloudSDKException):
+        dispatcher.send("13800000000", ["123456"])
+    assert dispatcher.stats()["errors"] == 1
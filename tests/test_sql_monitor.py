@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.modules.sql import db
+from app.modules.sql_monitor import begin_scope, end_scope
+from config import Config
+
+
+def test_failed_statement_does_not_leak_start_time(app_context) -> None:
+    connection = db.session.connection()
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing_table"))
+        db.session.rollback()
+        connection = db.session.connection()
+    connection.execute(text("SELECT 1"))
+    assert connection.info.get("sql_query_start") == []
+
+
+def test_scope_detects_repeated_statements(app_context, monkeypatch) -> None:
+    monkeypatch.setattr(Config, "SQL_N_PLUS_ONE_THRESHOLD", 2)
+    token = begin_scope("test")
+    for i in range(3):
+        db.session.execute(text("SELECT :i"), {"i": i})
+    stats = end_scope(token)
+    assert stats.count == 3
+    assert [times for _, times in stats.n_plus_one()] == [3]
@@ -0,0 +1,187 @@
+import json
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+
+from app.modules import pool, tracing
+from app.modules.tracing import (
+    Span,
+    SpanExporter,
+    current_context,
+    end_trace,
+    span,
+    start_trace,
+)
+from config import Config
+
+TRACEPARENT = "00-" + "1" * 32 + "-" + "2" * 16 + "-01"
+
+
+@pytest.fixture
+def spans(monkeypatch: pytest.MonkeyPatch) -> list[Span]:
+    """记录结束的时间段而不导出"""
+    spans: list[Span] = []
+    monkeypatch.setattr(tracing.exporter, "export", spans.append)
+    monkeypatch.setattr(Config, "TRACE_EXPORTER", "file")
+    return spans
+
+
+def _wait_for(condition: Callable[[], bool], timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_spans_nest_under_the_trace(spans: list[Span]) -> None:
+    with span("untraced") as untraced:
+        assert untraced is None  # 没有追踪时不创建时间段
+
+    token = start_trace("GET /report", TRACEPARENT)
+    with span("controller") as outer:
+        with pytest.raises(ValueError), span("crud", model="Report"):
+            raise ValueError("boom")
+    end_trace(token)
+    assert current_context() is None
+
+    crud, controller, root = spans
+    assert root.context.trace_id == "1" * 32 and root.parent_id == "2" * 16
+    assert controller is outer and controller.parent_id == root.context.span_id
+    assert crud.parent_id == controller.context.span_id
+    assert crud.attributes == {"model": "Report"}
+    assert crud.error == "ValueError: boom" and controller.error is None
+
+
+def test_unsampled_parent_is_not_traced(spans: list[Span]) -> None:
+    assert start_trace("GET /report", TRACEPARENT[:-2] + "00") is None
+
+
+def test_submit_task_continues_the_trace(
+    spans: list[Span], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    futures: list[Future] = []
+    # 不经过调度器，立即将任务提交至线程池
+    monkeypatch.setattr(
+        pool.scheduler,
+        "add_job",
+        lambda id, func, trigger: futures.append(func()),
+    )
+    seen = {}
+
+    def job() -> None:
+        seen["thread"] = threading.current_thread()
+        seen["context"] = current_context()
+
+    token = start_trace("POST /report/create_report", TRACEPARENT)
+    pool.submit_task(job)
+    end_trace(token)
+    futures[0].result(timeout=5)
+
+    root, job_span, submit = sorted(spans, key=lambda s: s.name)
+    assert seen["thread"] is not threading.current_thread()
+    assert seen["context"] is job_span.context
+    assert job_span.name == "job job" and submit.name == "submit_task"
+    assert job_span.context.trace_id == root.context.trace_id
+    assert job_span.parent_id == submit.parent_id == root.context.span_id
+
+
+def _make_spans(count: int) -> list[Span]:
+    spans = []
+    for i in range(count):
+        item = Span(f"span{i}", "1" * 32, "2" * 16, index=i)
+        item.end = item.start + 1000
+        spans.append(item)
+    return spans
+
+
+@pytest.fixture
+def fast_flush(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(Config, "TRACE_FLUSH_SECONDS", 0.01)
+
+
+def test_file_exporter_writes_json_lines(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, fast_flush: None
+) -> None:
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(Config, "TRACE_EXPORTER", "file")
+    monkeypatch.setattr(Config, "TRACE_FILE", str(path))
+    exporter = SpanExporter()
+    for item in _make_spans(3):
+        exporter.export(item)
+    _wait_for(lambda: exporter.stats()["exported"] == 3)
+
+    lines = [json.loads(line) for line in path.read_text("utf8").splitlines()]
+    assert [line["name"] for line in lines] == ["span0", "span1", "span2"]
+    assert lines[0]["parent_id"] == "2" * 16
+    assert lines[0]["attributes"] == {"index": 0}
+
+
+class FakeCollector(BaseHTTPRequestHandler):
+    """本地的OTLP/HTTP收集器，记录收到的请求，fail为真时返回500"""
+
+    bodies: list[dict] = []
+    fail = False
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).bodies.append(body)
+        self.send_response(500 if type(self).fail else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def collector(
+    monkeypatch: pytest.MonkeyPatch, fast_flush: None
+) -> Iterator[type[FakeCollector]]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCollector)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FakeCollector.bodies = []
+    FakeCollector.fail = False
+    monkeypatch.setattr(Config, "TRACE_EXPORTER", "otlp")
+    monkeypatch.setattr(
+        Config,
+        "TRACE_OTLP_ENDPOINT",
+        f"http://127.0.0.1:{server.server_port}/v1/traces",
+    )
+    yield FakeCollector
+    server.shutdown()
+    server.server_close()
+
+
+def test_otlp_exporter_posts_batches(collector: type[FakeCollector]) -> None:
+    exporter = SpanExporter()
+    items = _make_spans(2)
+    items[1].error = "ValueError: boom"
+    for item in items:
+        exporter.export(item)
+    _wait_for(lambda: exporter.stats()["exported"] == 2)
+
+    resource_spans = [body["resourceSpans"][0] for body in collector.bodies]
+    assert resource_spans[0]["resource"]["attributes"][0]["value"] == {
+        "stringValue": "dcoa"
+    }
+    first, second = (
+        item for spans in resource_spans for item in spans["scopeSpans"][0]["spans"]
+    )
+    assert first["traceId"] == "1" * 32 and first["parentSpanId"] == "2" * 16
+    assert first["attributes"] == [{"key": "index", "value": {"stringValue": "0"}}]
+    assert first["status"] == {"code": 1}
+    assert second["status"] == {"code": 2, "message": "ValueError: boom"}
+
+
+def test_failed_export_is_counted_as_dropped(collector: type[FakeCollector]) -> None:
+    collector.fail = True
+    exporter = SpanExporter()
+    for item in _make_spans(2):
+        exporter.export(item)
+    _wait_for(lambda: exporter.stats()["dropped"] == 2)
+    assert exporter.stats()["exported"] == 0